@@ -0,0 +1,189 @@
+"""
+Detect changes in scraped help articles between scraper runs.
+
+Keeps a content hash and a SimHash fingerprint per article URL and classifies
+each article as new, changed, near-identical, unchanged or removed. The change
+manifest tells the training data step which examples need to be rebuilt.
+"""
+
+import hashlib
+import json
+import re
+import time
+from pathlib import Path
+
+OUTPUT_DIR = Path(__file__).parent.parent / 'outputs'
+FINGERPRINTS_FILE = OUTPUT_DIR / 'article_fingerprints.json'
+MANIFEST_FILE = OUTPUT_DIR / 'article_changes.json'
+
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3
+# Articles within this many differing SimHash bits are treated as cosmetic edits
+NEAR_IDENTICAL_DISTANCE = 3
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+def normalize_text(text):
+    """Lowercase and collapse whitespace so formatting-only edits hash the same."""
+    return ' '.join(text.lower().split())
+
+def content_hash(title, content):
+    """SHA-256 of the normalized title and content."""
+    normalized = normalize_text(title) + '\n' + normalize_text(content)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+def simhash(text, shingle_size=SHINGLE_SIZE):
+    """
+    Compute a 64-bit SimHash over word shingles.
+
+    Similar texts produce fingerprints with a small Hamming distance, so small
+    edits can be told apart from real rewrites without keeping old content.
+    """
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    if len(tokens) < shingle_size:
+        shingles = [' '.join(tokens)] if tokens else []
+    else:
+        shingles = [' '.join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)]
+
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        digest = hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest()
+        value = int.from_bytes(digest, 'big')
+        for bit in range(SIMHASH_BITS):
+            if value >> bit & 1:
+                weights[bit] += 1
+            else:
+                weights[bit] -= 1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+def hamming_distance(a, b):
+    """Number of differing bits between two fingerprints."""
+    return bin(a ^ b).count('1')
+
+def fingerprint_article(article):
+    """Build the stored fingerprint record for a scraped article."""
+    title = article.get('title', '')
+    content = article.get('content', '')
+    return {
+        'title': title,
+        'content_hash': content_hash(title, content),
+        'simhash': f"{simhash(title + ' ' + content):016x}",
+        'updated_at': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+def load_fingerprints(path=FINGERPRINTS_FILE):
+    """Load fingerprints from the previous run (empty on the first run)."""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_fingerprints(fingerprints, path=FINGERPRINTS_FILE):
+    """Save fingerprints for the next run."""
+    path = Path(path)
+    path.parent.mkdir(exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(fingerprints, f, indent=2, ensure_ascii=False)
+
+def detect_article_changes(articles, previous, failed_urls=(), near_identical_distance=NEAR_IDENTICAL_DISTANCE):
+    """
+    Classify scraped articles against the fingerprints of the previous run.
+
+    Near-identical articles keep their previous fingerprint, so a series of
+    small edits still adds up to a "changed" result once it drifts far enough.
+    Previously known URLs that failed to scrape this run are carried over
+    rather than reported as removed.
+
+    Args:
+        articles: List of successfully scraped article dicts (url, title, content)
+        previous: Fingerprints dict from load_fingerprints()
+        failed_urls: URLs that were attempted this run but could not be fetched
+        near_identical_distance: Max SimHash bit distance for a cosmetic edit
+
+    Returns:
+        (manifest, fingerprints) - the change manifest and the fingerprints to save
+    """
+    changes = {
+        'new': [],
+        'changed': [],
+        'near_identical': [],
+        'unchanged': [],
+        'removed': []
+    }
+    fingerprints = {}
+
+    for article in articles:
+        url = article['url']
+        current = fingerprint_article(article)
+        old = previous.get(url)
+
+        if old is None:
+            changes['new'].append(url)
+            fingerprints[url] = current
+        elif old['content_hash'] == current['content_hash']:
+            changes['unchanged'].append(url)
+            fingerprints[url] = old
+        elif hamming_distance(int(old['simhash'], 16), int(current['simhash'], 16)) <= near_identical_distance:
+            changes['near_identical'].append(url)
+            fingerprints[url] = old
+        else:
+            changes['changed'].append(url)
+            fingerprints[url] = current
+
+    failed = set(failed_urls)
+    for url, old in previous.items():
+        if url in fingerprints:
+            continue
+        if url in failed:
+            fingerprints[url] = old
+        else:
+            changes['removed'].append(url)
+
+    manifest = {
+        'generated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'summary': {status: len(urls) for status, urls in changes.items()},
+        'articles': changes,
+        # Training examples for these URLs must be regenerated...
+        'rebuild': changes['new'] + changes['changed'],
+        # ...and examples for these URLs dropped
+        'drop': changes['removed']
+    }
+    return manifest, fingerprints
+
+def save_manifest(manifest, path=MANIFEST_FILE):
+    """Write the change manifest as JSON."""
+    path = Path(path)
+    path.parent.mkdir(exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+def print_change_summary(manifest):
+    """Print a short summary of a change manifest."""
+    summary = manifest['summary']
+    print("Article changes since last run:")
+    print(f"  🆕 New:            {summary['new']}")
+    print(f"  ✏️  Changed:        {summary['changed']}")
+    print(f"  ≈  Near-identical: {summary['near_identical']}")
+    print(f"  ✓  Unchanged:      {summary['unchanged']}")
+    print(f"  🗑  Removed:        {summary['removed']}")
+    print(f"  → {len(manifest['rebuild'])} articles to rebuild, {len(manifest['drop'])} to drop")
+
+if __name__ == "__main__":
+    # Re-check a saved raw scrape against the stored fingerprints without scraping again
+    raw_file = OUTPUT_DIR / 'help_articles_raw.json'
+    if not raw_file.exists():
+        print(f"❌ No scraped articles found at {raw_file}")
+        print("Run scrape_help_articles.py first.")
+        exit(1)
+
+    with open(raw_file, 'r', encoding='utf-8') as f:
+        scraped = [a for a in json.load(f) if a.get('success')]
+
+    manifest, _ = detect_article_changes(scraped, load_fingerprints())
+    print_change_summary(manifest)
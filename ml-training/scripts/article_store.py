@@ -0,0 +1,311 @@
+"""
+Full-text searchable store for scraped and manual help articles.
+
+Articles live in a SQLite database with an FTS5 index over title and content,
+plus category and intent columns, so scripts can run ranked keyword lookups
+instead of reloading and scanning the flat JSON files.
+
+Usage:
+    python article_store.py import ../outputs/help_articles_raw.json ../data/processed/help_articles_manual.json
+    python article_store.py search "quick replies"
+    python article_store.py search "catalog" --category selling_products_and_services
+"""
+
+import json
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from article_change_detection import content_hash
+from scrape_help_articles import map_article_to_intent
+from scrape_whatsapp_urls import categorize_articles
+
+DEFAULT_DB = Path(__file__).parent.parent / 'outputs' / 'articles.db'
+
+# Categories are stored in the help center section vocabulary of categorize_articles
+CATEGORIES = set(categorize_articles([]))
+# Manual articles are filed under intent names (scrape_help_articles) or section titles (scrape_help_urls)
+MANUAL_CATEGORIES = {
+    'labels': 'connecting_with_customers',
+    'messages': 'connecting_with_customers',
+    'automation': 'connecting_with_customers',
+    'analytics': 'connecting_with_customers',
+    'catalog': 'selling_products_and_services',
+    'advertise': 'selling_products_and_services',
+    'payment': 'selling_products_and_services',
+    'business_profile': 'setting_up_account',
+    'development': 'whatsapp_business_platform',
+    'setting_up_an_account': 'setting_up_account',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL DEFAULT '',
+    category TEXT,
+    intents TEXT,
+    source TEXT,
+    content_hash TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_articles_category ON articles(category);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+    title, content,
+    content='articles', content_rowid='id',
+    tokenize='porter unicode61'
+);
+
+-- Keep the external-content FTS index in sync with the articles table
+CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    INSERT INTO articles_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+END;
+"""
+
+UPSERT_SQL = """
+INSERT INTO articles (url, title, content, category, intents, source, content_hash, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(url) DO UPDATE SET
+    title = excluded.title,
+    content = excluded.content,
+    category = excluded.category,
+    intents = excluded.intents,
+    source = excluded.source,
+    content_hash = excluded.content_hash,
+    updated_at = excluded.updated_at
+WHERE articles.content_hash IS NOT excluded.content_hash
+   OR articles.category IS NOT excluded.category
+   OR articles.intents IS NOT excluded.intents
+"""
+
+# bm25() weights for (title, content) - title matches count for more
+BM25_WEIGHTS = (5.0, 1.0)
+
+def article_key(article):
+    """Stable key for an article: its URL, or a slug of the title for manual entries."""
+    if article.get('url'):
+        return article['url']
+    slug = re.sub(r'[^a-z0-9]+', '-', article['title'].lower()).strip('-')
+    return f"manual:{slug}"
+
+def load_articles_file(path):
+    """
+    Load articles from any of the JSON layouts the scrapers produce.
+
+    Handles plain article lists (help_articles_raw.json, help_articles_manual.json),
+    bookmarklet exports ({"scraped_articles": [...]}) and categorized exports
+    ({"category": [...]}). Failed scrapes are skipped.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    if isinstance(data, dict):
+        if 'scraped_articles' in data:
+            data = data['scraped_articles']
+        else:
+            data = [article for items in data.values() if isinstance(items, list) for article in items]
+
+    return [article for article in data if article.get('title') and article.get('success', True)]
+
+def normalize_category(category):
+    """Map a manual category onto CATEGORIES; None if it has no equivalent."""
+    key = re.sub(r'[^a-z0-9]+', '_', category.lower()).strip('_')
+    return key if key in CATEGORIES else MANUAL_CATEGORIES.get(key)
+
+def index_fields(article):
+    """
+    Work out the category and intents to store for an article.
+
+    A manual category is mapped onto the categorize_articles sections (so
+    --category filters match scraped and manual articles alike) and, if it is
+    an intent name, kept among the intents.
+    """
+    title = article['title']
+    content = article.get('content', '')
+
+    intents = article.get('intent') or ', '.join(map_article_to_intent(title, content))
+
+    manual = article.get('category')
+    category = normalize_category(manual) if manual else None
+    if manual and manual.lower() in MANUAL_CATEGORIES and manual not in intents.split(', '):
+        intents = ', '.join([manual] + [intent for intent in intents.split(', ') if intent != 'General'])
+    if not category:
+        categorized = categorize_articles([article])
+        category = next(name for name, items in categorized.items() if items)
+
+    return category, intents
+
+class ArticleStore:
+    def __init__(self, db_path=DEFAULT_DB):
+        """Open (and create if needed) the article database."""
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def upsert_articles(self, articles, source=None):
+        """
+        Insert or update articles in a single transaction.
+
+        Rows whose content hash, category and intents are unchanged are left
+        untouched, so re-importing the same file does not rewrite the FTS index.
+
+        Returns:
+            Number of rows inserted or updated
+        """
+        now = time.strftime('%Y-%m-%d %H:%M:%S')
+        rows = []
+        for article in articles:
+            title = article['title']
+            content = article.get('content', '')
+            category, intents = index_fields(article)
+            rows.append((
+                article_key(article), title, content, category, intents,
+                source or article.get('source'), content_hash(title, content), now
+            ))
+
+        with self.conn:
+            cursor = self.conn.executemany(UPSERT_SQL, rows)
+        return cursor.rowcount
+
+    def import_file(self, path):
+        """Import a scraped or manual articles JSON file."""
+        articles = load_articles_file(path)
+        return self.upsert_articles(articles, source=Path(path).name), len(articles)
+
+    def search(self, query, limit=10, category=None, intent=None, raw=False):
+        """
+        Ranked keyword search over title and content.
+
+        Args:
+            query: Keywords to match (all must appear), or an FTS5 expression if raw=True
+            limit: Maximum number of results
+            category: Only return articles in this category (manual names like "Catalog" are mapped)
+            intent: Only return articles tagged with this intent
+            raw: Pass the query to FTS5 unchanged
+
+        Returns:
+            List of dicts with url, title, category, intents, score and snippet
+        """
+        match = query if raw else to_fts_query(query)
+        if not match:
+            return []
+
+        sql = [
+            "SELECT a.url, a.title, a.category, a.intents,",
+            f"       bm25(articles_fts, {BM25_WEIGHTS[0]}, {BM25_WEIGHTS[1]}) AS score,",
+            "       snippet(articles_fts, 1, '[', ']', '…', 12) AS snippet",
+            "FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid",
+            "WHERE articles_fts MATCH ?",
+        ]
+        params = [match]
+        if category:
+            sql.append("AND a.category = ?")
+            params.append(normalize_category(category) or category)
+        if intent:
+            sql.append("AND (',' || REPLACE(a.intents, ' ', '') || ',') LIKE ?")
+            params.append(f"%,{intent.replace(' ', '')},%")
+        sql.append("ORDER BY score LIMIT ?")
+        params.append(limit)
+
+        return [dict(row) for row in self.conn.execute('\n'.join(sql), params)]
+
+    def get(self, url):
+        """Fetch a single article by URL (or manual key)."""
+        row = self.conn.execute('SELECT * FROM articles WHERE url = ?', (url,)).fetchone()
+        return dict(row) if row else None
+
+    def count(self):
+        return self.conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+
+    def category_counts(self):
+        """Number of articles per category."""
+        rows = self.conn.execute(
+            'SELECT category, COUNT(*) FROM articles GROUP BY category ORDER BY COUNT(*) DESC'
+        )
+        return dict(rows.fetchall())
+
+def to_fts_query(text):
+    """Turn free text into an FTS5 query that requires every word, ignoring FTS syntax."""
+    words = re.findall(r'\w+', text)
+    return ' '.join(f'"{word}"' for word in words)
+
+def main(argv):
+    if len(argv) < 2 or argv[1] not in ('import', 'search', 'stats'):
+        print("Usage:")
+        print("  python article_store.py import <articles.json> [...]")
+        print("  python article_store.py search <query> [--category NAME] [--intent NAME] [--limit N]")
+        print("  python article_store.py stats")
+        return 1
+
+    with ArticleStore() as store:
+        if argv[1] == 'import':
+            for path in argv[2:]:
+                try:
+                    changed, total = store.import_file(path)
+                    print(f"✓ {path}: {total} articles ({changed} new or updated)")
+                except FileNotFoundError:
+                    print(f"✗ File not found: {path}")
+            print(f"\nStore now holds {store.count()} articles: {store.db_path}")
+
+        elif argv[1] == 'search':
+            args = argv[2:]
+            options = {'--category': None, '--intent': None, '--limit': '10'}
+            words = []
+            i = 0
+            while i < len(args):
+                if args[i] in options and i + 1 < len(args):
+                    options[args[i]] = args[i + 1]
+                    i += 2
+                else:
+                    words.append(args[i])
+                    i += 1
+
+            start = time.perf_counter()
+            results = store.search(
+                ' '.join(words),
+                limit=int(options['--limit']),
+                category=options['--category'],
+                intent=options['--intent']
+            )
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            print(f"{len(results)} results in {elapsed_ms:.1f} ms\n")
+            for result in results:
+                print(f"• {result['title']}  [{result['category']} | {result['intents']}]")
+                print(f"  {result['url']}")
+                if result['snippet']:
+                    print(f"  {result['snippet']}")
+
+        else:
+            print(f"Articles: {store.count()}")
+            for category, count in store.category_counts().items():
+                print(f"  {category}: {count}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,153 @@
+"""
+Pooled asyncio HTTP client for the evaluation tools, built on aiohttp.
+
+For tools that keep hundreds of requests in flight: connections are reused
+across requests, the number of open connections is bounded, and response
+bodies can be consumed incrementally as they arrive. With HTTP_CASSETTE set,
+requests are recorded to or replayed from a cassette (http_cassette.py).
+"""
+
+import asyncio
+import json
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from http_cassette import CassetteMiss, active_cassette
+
+DEFAULT_CONNECTIONS = 10
+DEFAULT_TIMEOUT = 60
+
+class HTTPClientError(Exception):
+    """Raised when a connection fails or the server sends something that isn't HTTP."""
+
+class AsyncResponse:
+    def __init__(self, response):
+        self.response = response
+        self.status = response.status
+        self.reason = response.reason or ''
+        self.headers = {name.lower(): value for name, value in response.headers.items()}  # Lower-cased header names
+        self.consumed = False
+
+    async def iter_chunks(self):
+        """
+        Yield body bytes as they arrive. The connection goes back to the pool
+        once the body has been read to the end; stopping early closes it.
+        """
+        if self.consumed:
+            raise HTTPClientError("Response body was already read")
+        self.consumed = True
+        finished = False
+        try:
+            async for chunk in self.response.content.iter_any():
+                yield chunk
+            finished = True
+        except asyncio.TimeoutError:
+            raise
+        except aiohttp.ClientError as e:
+            raise HTTPClientError(f"Reading the response failed: {e!r}")
+        finally:
+            if finished:
+                self.response.release()
+            else:
+                self.response.close()
+
+    async def read(self):
+        """Read the whole body."""
+        return b''.join([chunk async for chunk in self.iter_chunks()])
+
+    async def json(self):
+        return json.loads(await self.read() or b'null')
+
+    async def text(self):
+        return (await self.read()).decode('utf-8', errors='replace')
+
+class AsyncHTTPClient:
+    def __init__(self, base_url, headers=None, max_connections=DEFAULT_CONNECTIONS, timeout=DEFAULT_TIMEOUT):
+        """
+        Args:
+            base_url: Scheme, host and optional path prefix, e.g. https://api.llama-api.com or http://127.0.0.1:8768/v1
+            headers: Headers sent with every request
+            max_connections: Upper bound on open connections (and so on requests in flight)
+            timeout: Seconds allowed for connecting and between reads
+        """
+        parts = urlsplit(base_url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL scheme: {base_url}")
+        self.base_url = base_url.rstrip('/')
+        self.headers = {'Accept-Encoding': 'identity', **(headers or {})}  # Compression would hold back streamed tokens
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.session = None  # Created on first use, inside the running event loop
+        self.stats = {'opened': 0, 'reused': 0}
+        self.cassette = active_cassette()
+
+    def open_session(self):
+        if self.session is None:
+            trace = aiohttp.TraceConfig()
+            trace.on_connection_create_end.append(self.count('opened'))
+            trace.on_connection_reuseconn.append(self.count('reused'))
+            self.session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=0),
+                timeout=aiohttp.ClientTimeout(total=None, connect=self.timeout, sock_read=self.timeout),
+                auto_decompress=False,
+                trace_configs=[trace]
+            )
+        return self.session
+
+    def count(self, stat):
+        async def on_event(_session, _context, _params):
+            self.stats[stat] += 1
+        return on_event
+
+    async def request(self, method, path, json_body=None, data=None, headers=None):
+        """
+        Send a request and read the response head.
+
+        The body is not read yet: use read()/json()/text() or iter_chunks() on
+        the returned response, which also hands the connection back to the pool.
+
+        Returns:
+            AsyncResponse
+        """
+        method = method.upper()
+        headers = dict(headers or {})
+        if json_body is not None:
+            data = json.dumps(json_body).encode('utf-8')
+            headers.setdefault('Content-Type', 'application/json')
+        url = f"{self.base_url}{path}"
+        if not self.cassette:
+            return await self.send(method, url, data or b'', headers)
+
+        try:
+            return await self.cassette.play_async(method, url, data,
+                                                  lambda: self.send(method, url, data or b'', headers))
+        except CassetteMiss as e:
+            raise HTTPClientError(str(e))
+
+    async def send(self, method, url, data, headers):
+        """Send the request on a pooled connection and wait for the response head."""
+        try:
+            response = await self.open_session().request(method, url, data=data, headers=headers)
+        except asyncio.TimeoutError:
+            raise
+        except aiohttp.ClientError as e:
+            raise HTTPClientError(f"Request to {url} failed: {e!r}")
+        return AsyncResponse(response)
+
+    async def get(self, path, headers=None):
+        return await self.request('GET', path, headers=headers)
+
+    async def post(self, path, json_body=None, data=None, headers=None):
+        return await self.request('POST', path, json_body=json_body, data=data, headers=headers)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
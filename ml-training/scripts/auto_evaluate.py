@@ -0,0 +1,303 @@
+"""
+Evaluate a newly fine-tuned model against the previous best as soon as its job finishes.
+
+The candidate and the baseline are asked the same test queries concurrently
+(the golden set from build_golden_set.py if it has been built, else
+test_fine_tuned_model.TEST_QUERIES, or a JSONL file of queries). Their
+answers are stored side by side in outputs/evaluations/, together with a
+summary per model: answer rate, latency, length and links that are not in
+the verified help center mapping. The baseline is the model recorded in
+outputs/evaluations/best_model.json, or the job's base model for the first
+fine-tune. A candidate that does not regress becomes the new best.
+
+AutoEvaluator plugs into JobMonitor.on_complete, so job_monitor.py and
+webhook_receiver.py start an evaluation whenever a job succeeds.
+
+Usage:
+    python auto_evaluate.py ft:llama3.1-8b:whatsapp-business-assistant-v1:abc123
+    python auto_evaluate.py --job ftjob-abc                  # model and base model from the job registry
+    python auto_evaluate.py <model> --baseline llama3.1-8b --queries ../data/eval_queries.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from build_golden_set import GOLDEN_SET_FILE
+from embed_urls_in_responses import TOPIC_URL_MAPPING
+from fine_tuning_client import create_session
+from job_registry import JobRegistry
+from test_fine_tuned_model import TEST_QUERIES, query_model
+
+load_dotenv(Path(__file__).parent.parent / '.env')
+
+EVAL_DIR = Path(__file__).parent.parent / 'outputs' / 'evaluations'
+BEST_MODEL_FILE = EVAL_DIR / 'best_model.json'
+DEFAULT_WORKERS = 8
+EVAL_TEMPERATURE = 0.0      # Keep answers as repeatable as the API allows
+ANSWER_RATE_TOLERANCE = 0.05
+LATENCY_TOLERANCE = 1.5     # Candidate may be at most this many times slower...
+LATENCY_MIN_DELTA = 0.5     # ...unless it is less than this many seconds slower
+
+URL_PATTERN = re.compile(r'https?://[^\s)\]>"\']+')
+KNOWN_URLS = {url.rstrip('/.').split('://', 1)[1] for topic in TOPIC_URL_MAPPING.values() for url in topic['urls']}
+
+def load_queries(path=None):
+    """
+    Test queries from a JSONL file ({"query": ...} or a chat example's user turns); without
+    one, the golden set if it has been built, else the built-in set.
+    """
+    if not path and not GOLDEN_SET_FILE.exists():
+        return list(TEST_QUERIES)
+    path = path or GOLDEN_SET_FILE
+    queries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            if isinstance(data, str):
+                queries.append(data)
+            elif data.get('query'):
+                queries.append(data['query'])
+            else:
+                queries.extend(m['content'] for m in data.get('messages', []) if m.get('role') == 'user')
+    return queries
+
+def check_answer(result):
+    """Add simple per-answer checks: length and links outside the verified mapping."""
+    content = result.get('content') or ''
+    urls = [url.rstrip('/.,') for url in URL_PATTERN.findall(content)]
+    return dict(
+        result,
+        words=len(content.split()),
+        urls=urls,
+        unknown_urls=[url for url in urls if url.split('://', 1)[-1] not in KNOWN_URLS]
+    )
+
+def summarize(answers):
+    """Aggregate one model's checked answers."""
+    answered = [a for a in answers if a['content']]
+    latencies = sorted(a['latency'] for a in answered)
+    return {
+        'queries': len(answers),
+        'answered': len(answered),
+        'answer_rate': round(len(answered) / len(answers), 3) if answers else 0,
+        'errors': len(answers) - len(answered),
+        'mean_latency': round(sum(latencies) / len(latencies), 3) if latencies else None,
+        'median_latency': round(latencies[len(latencies) // 2], 3) if latencies else None,
+        'mean_words': round(sum(a['words'] for a in answered) / len(answered), 1) if answered else 0,
+        'answers_with_links': sum(1 for a in answered if a['urls']),
+        'unknown_urls': sum(len(a['unknown_urls']) for a in answered)
+    }
+
+def find_regressions(candidate, baseline):
+    """Reasons the candidate is worse than the baseline (empty list: no regression)."""
+    reasons = []
+    if candidate['answer_rate'] < baseline['answer_rate'] - ANSWER_RATE_TOLERANCE:
+        reasons.append(f"answer rate {candidate['answer_rate']:.0%} < {baseline['answer_rate']:.0%}")
+    if candidate['unknown_urls'] > baseline['unknown_urls']:
+        reasons.append(f"unverified links {candidate['unknown_urls']} > {baseline['unknown_urls']}")
+    if (candidate['mean_latency'] and baseline['mean_latency']
+            and candidate['mean_latency'] > baseline['mean_latency'] * LATENCY_TOLERANCE
+            and candidate['mean_latency'] - baseline['mean_latency'] > LATENCY_MIN_DELTA):
+        reasons.append(f"mean latency {candidate['mean_latency']:.2f}s > "
+                       f"{LATENCY_TOLERANCE:g}x {baseline['mean_latency']:.2f}s")
+    return reasons
+
+def load_best(path=BEST_MODEL_FILE):
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def save_best(best, path=BEST_MODEL_FILE):
+    """Write the best-model record atomically."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_suffix('.tmp')
+    with open(temp_path, 'w') as f:
+        json.dump(best, f, indent=2)
+    temp_path.replace(path)
+
+def evaluate_models(candidate, baseline, queries, max_workers=DEFAULT_WORKERS, api_key=None, base_url=None):
+    """
+    Ask both models every query concurrently over one pooled session.
+
+    Returns:
+        Evaluation dict with side-by-side answers, per-model summaries and regressions
+    """
+    session = create_session(api_key or os.getenv('LLAMA_API_KEY'), pool_size=max_workers)
+    models = {'candidate': candidate, 'baseline': baseline}
+    started = time.perf_counter()
+
+    def ask(role, query):
+        return check_answer(query_model(models[role], query, api_key=api_key, base_url=base_url,
+                                        session=session, temperature=EVAL_TEMPERATURE))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [{role: executor.submit(ask, role, query) for role in models} for query in queries]
+        rows = [dict({role: future.result() for role, future in row.items()}, query=query)
+                for query, row in zip(queries, futures)]
+
+    summaries = {role: summarize([row[role] for row in rows]) for role in models}
+    return {
+        'candidate': candidate,
+        'baseline': baseline,
+        'evaluated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'seconds': round(time.perf_counter() - started, 2),
+        'summary': summaries,
+        'regressions': find_regressions(summaries['candidate'], summaries['baseline']),
+        'results': rows
+    }
+
+def save_evaluation(evaluation, eval_dir=EVAL_DIR):
+    """Write the evaluation to outputs/evaluations/<timestamp>-<model>.json; returns the path."""
+    eval_dir.mkdir(parents=True, exist_ok=True)
+    slug = re.sub(r'[^A-Za-z0-9._-]+', '_', evaluation['candidate'])[-80:]
+    stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}"
+    path = eval_dir / f"{stem}.json"
+    number = 1
+    while path.exists():
+        number += 1
+        path = eval_dir / f"{stem}-{number}.json"
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(evaluation, f, indent=2, ensure_ascii=False)
+    return path
+
+def print_evaluation(evaluation):
+    candidate, baseline = evaluation['summary']['candidate'], evaluation['summary']['baseline']
+    print("\n" + "=" * 70)
+    print("Evaluation")
+    print("=" * 70)
+    print(f"Candidate: {evaluation['candidate']}")
+    print(f"Baseline:  {evaluation['baseline']}")
+    print(f"\n{'':<20} {'Candidate':>12} {'Baseline':>12}")
+    print("-" * 46)
+    for key, label in (('answer_rate', 'Answer rate'), ('mean_latency', 'Mean latency (s)'),
+                       ('median_latency', 'Median latency (s)'), ('mean_words', 'Mean words'),
+                       ('answers_with_links', 'Answers with links'), ('unknown_urls', 'Unverified links')):
+        values = [summary[key] for summary in (candidate, baseline)]
+        print(f"{label:<20}" + ''.join(f" {'-' if v is None else v:>12}" for v in values))
+
+    if evaluation['regressions']:
+        print(f"\n❌ Regression: {'; '.join(evaluation['regressions'])}")
+    else:
+        print(f"\n✓ No regression ({evaluation['seconds']}s, {candidate['queries']} queries per model)")
+
+class AutoEvaluator:
+    def __init__(self, registry=None, queries=None, max_workers=DEFAULT_WORKERS, best_file=BEST_MODEL_FILE,
+                 eval_dir=EVAL_DIR, base_url=None, promote=True):
+        """
+        Args:
+            registry: JobRegistry; evaluation results are recorded on the job
+            queries: Test queries (default: load_queries())
+            max_workers: Concurrent chat requests per evaluation
+            best_file: Best-model record used as the baseline and updated on promotion
+            eval_dir: Where evaluation reports are written
+            base_url: Chat API base URL (default: LLAMA_API_URL)
+            promote: Make candidates that don't regress the new best
+        """
+        self.registry = registry or JobRegistry()
+        self.queries = queries or load_queries()
+        self.max_workers = max_workers
+        self.best_file = best_file
+        self.eval_dir = eval_dir
+        self.base_url = base_url
+        self.promote = promote
+        self.tasks = {}
+
+    def on_complete(self, record):
+        """
+        JobMonitor completion hook. Starts the evaluation in the background so a
+        slow evaluation never holds up polling or a webhook response.
+        """
+        model = record.get('fine_tuned_model')
+        if record['status'] != 'succeeded' or not model:
+            return
+        if record.get('evaluation') or record['job_id'] in self.tasks:
+            return
+        print(f"[{time.strftime('%H:%M:%S')}] 🧪 Evaluating {model}...")
+        self.tasks[record['job_id']] = asyncio.create_task(self.evaluate_job(record))
+
+    async def evaluate_job(self, record):
+        try:
+            return await asyncio.to_thread(self.evaluate, record['fine_tuned_model'], record.get('model'),
+                                           record['job_id'])
+        except Exception as e:
+            print(f"  ⚠️  Evaluation of {record['fine_tuned_model']} failed: {e}")
+
+    def evaluate(self, model, base_model=None, job_id=None, baseline=None):
+        """
+        Evaluate `model` against `baseline` (default: the current best, else `base_model`),
+        save the report, record it on the job and promote the model if it did not regress.
+
+        Returns:
+            (evaluation dict, report path)
+        """
+        best = load_best(self.best_file)
+        baseline = baseline or (best or {}).get('model') or base_model or os.getenv('MODEL_NAME', 'llama3.1-8b')
+
+        evaluation = evaluate_models(model, baseline, self.queries, self.max_workers, base_url=self.base_url)
+        evaluation['job_id'] = job_id
+        promoted = self.promote and not evaluation['regressions']
+        evaluation['promoted'] = promoted
+        path = save_evaluation(evaluation, self.eval_dir)
+
+        if promoted:
+            save_best({
+                'model': model,
+                'job_id': job_id,
+                'previous': baseline,
+                'report': str(path),
+                'summary': evaluation['summary']['candidate'],
+                'promoted_at': evaluation['evaluated_at']
+            }, self.best_file)
+        if job_id:
+            self.registry.update(job_id, evaluation=str(path), regressions=evaluation['regressions'] or [],
+                                 promoted=promoted)
+
+        print_evaluation(evaluation)
+        print(f"{'🏆 New best model' if promoted else '↻ Best model unchanged'}")
+        print(f"✓ Report: {path}")
+        return evaluation, path
+
+    async def drain(self):
+        """Wait for evaluations still running (call before the event loop exits)."""
+        if self.tasks:
+            await asyncio.gather(*self.tasks.values())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare a fine-tuned model against the previous best")
+    parser.add_argument('model', nargs='?', help="Model to evaluate (default: FINE_TUNED_MODEL_ID)")
+    parser.add_argument('--job', help="Take the model and base model from this job in the registry")
+    parser.add_argument('--baseline', help="Model to compare against (default: current best, else the base model)")
+    parser.add_argument('--queries', help="JSONL file of test queries (default: the golden set, if built)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--no-promote', action='store_true', help="Don't update best_model.json")
+    args = parser.parse_args()
+
+    registry = JobRegistry()
+    model, base_model = args.model or os.getenv('FINE_TUNED_MODEL_ID'), None
+    if args.job:
+        record = registry.get(args.job)
+        if not record or not record.get('fine_tuned_model'):
+            print(f"❌ Job {args.job} has no fine-tuned model in outputs/job_registry.json")
+            exit(1)
+        model, base_model = record['fine_tuned_model'], record.get('model')
+
+    if not model:
+        print("❌ No model given")
+        print("Usage: python auto_evaluate.py <model> | --job <job_id>")
+        exit(1)
+
+    evaluator = AutoEvaluator(registry, load_queries(args.queries), args.workers, promote=not args.no_promote)
+    evaluator.evaluate(model, base_model, args.job, args.baseline)
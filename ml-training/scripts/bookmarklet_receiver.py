@@ -0,0 +1,311 @@
+"""
+Local receiver for the browser bookmarklet scraper.
+
+Instead of copy-pasting bookmarklet output into files, run this script and let
+the bookmarklet POST its results to http://127.0.0.1:8765/articles. Articles
+are deduplicated by normalized URL and content hash, acknowledged right away,
+and written in batches (one transaction or one append per batch) to the
+article store or a JSONL file.
+
+Usage:
+    python bookmarklet_receiver.py                       # write to outputs/articles.db
+    python bookmarklet_receiver.py --jsonl ../outputs/bookmarklet_articles.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit
+
+from article_change_detection import content_hash
+from local_http import HTTPError, HTTPResponse, json_response, start_server
+
+DEFAULT_PORT = 8765
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_FLUSH_INTERVAL = 2.0  # Seconds a partial batch may wait before it is written
+WRITE_ATTEMPTS = 3            # Tries per batch before its articles are given up on (and accepted again)
+WRITE_RETRY_DELAY = 1.0
+
+# The bookmarklet runs on faq.whatsapp.com, so the receiver must allow cross-origin POSTs
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'POST, GET, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type',
+    'Access-Control-Allow-Private-Network': 'true',
+}
+
+def normalize_url(url):
+    """Drop query strings, fragments and trailing slashes so the same article dedupes."""
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit(('https', parts.netloc.lower(), path, '', ''))
+
+def parse_payload(payload):
+    """
+    Extract article dicts from any bookmarklet payload.
+
+    Accepts the URL-list export ({"scraped_articles": [...]}), a single article
+    ({"url", "title", "content"}) or a plain list of articles.
+    """
+    if isinstance(payload, dict) and 'scraped_articles' in payload:
+        items = payload['scraped_articles']
+    elif isinstance(payload, dict):
+        items = [payload]
+    elif isinstance(payload, list):
+        items = payload
+    else:
+        raise HTTPError(400, "Expected a JSON object or list")
+
+    articles = []
+    for item in items:
+        if not isinstance(item, dict) or not item.get('url') or not item.get('title'):
+            continue
+        articles.append({
+            'url': normalize_url(item['url']),
+            'title': item['title'].strip(),
+            'content': (item.get('content') or '').strip(),
+            'success': True
+        })
+    return articles
+
+class ArticleStoreSink:
+    """Writes batches into the SQLite article store, one transaction per batch."""
+
+    def __init__(self, db_path=None):
+        from article_store import ArticleStore, DEFAULT_DB
+        self.store = ArticleStore(db_path or DEFAULT_DB)
+        self.description = str(self.store.db_path)
+
+    def known_hashes(self):
+        rows = self.store.conn.execute('SELECT url, content_hash FROM articles')
+        return dict(rows.fetchall())
+
+    def write_batch(self, articles):
+        self.store.upsert_articles(articles, source='bookmarklet')
+
+    def close(self):
+        self.store.close()
+
+class JSONLSink:
+    """Appends batches to a JSONL file, one write and fsync per batch."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.description = str(self.path)
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def known_hashes(self):
+        hashes = {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    article = json.loads(line)
+                    hashes[article['url']] = content_hash(article['title'], article.get('content', ''))
+        return hashes
+
+    def write_batch(self, articles):
+        self.file.write(''.join(json.dumps(a, ensure_ascii=False) + '\n' for a in articles))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+class BookmarkletReceiver:
+    def __init__(self, sink_factory, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        """
+        Args:
+            sink_factory: Callable creating the sink; runs on the writer thread
+            batch_size: Write as soon as this many articles are queued
+            flush_interval: Max seconds before a partial batch is written
+        """
+        self.sink_factory = sink_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        # SQLite connections are tied to the thread that created them,
+        # so every sink call goes through one dedicated writer thread
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='receiver-writer')
+        self.queue = asyncio.Queue()
+        # Hashes of written articles; queued ones are tracked separately until their batch is written
+        self.url_hashes = {}
+        self.content_hashes = set()
+        self.pending_urls = {}
+        self.pending_content = set()
+        self.sink = None
+        self.stats = {'received': 0, 'accepted': 0, 'duplicates': 0, 'written': 0, 'batches': 0, 'failed': 0}
+
+    async def run_in_writer(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def open(self):
+        self.sink = await self.run_in_writer(self.sink_factory)
+        self.url_hashes = await self.run_in_writer(self.sink.known_hashes)
+        self.content_hashes = set(self.url_hashes.values())
+        self.writer_task = asyncio.create_task(self.write_batches())
+
+    async def close(self):
+        await self.queue.put(None)
+        await self.writer_task
+        await self.run_in_writer(self.sink.close)
+        self.executor.shutdown()
+
+    def accept(self, articles):
+        """Deduplicate and enqueue articles; returns (accepted, duplicates)."""
+        accepted = 0
+        duplicates = 0
+        for article in articles:
+            digest = content_hash(article['title'], article['content'])
+            if digest in (self.url_hashes.get(article['url']), self.pending_urls.get(article['url'])):
+                duplicates += 1
+                continue
+            # Same non-empty content under a different URL is the same article
+            if article['content'] and (digest in self.content_hashes or digest in self.pending_content):
+                duplicates += 1
+                continue
+
+            self.pending_urls[article['url']] = digest
+            if article['content']:
+                self.pending_content.add(digest)
+            self.queue.put_nowait(article)
+            accepted += 1
+
+        self.stats['received'] += len(articles)
+        self.stats['accepted'] += accepted
+        self.stats['duplicates'] += duplicates
+        return accepted, duplicates
+
+    def settle(self, batch, written):
+        """Move a batch's hashes out of pending; only written articles count as known from then on."""
+        for article in batch:
+            digest = content_hash(article['title'], article['content'])
+            if self.pending_urls.get(article['url']) == digest:
+                del self.pending_urls[article['url']]
+            self.pending_content.discard(digest)
+            if written:
+                self.url_hashes[article['url']] = digest
+                self.content_hashes.add(digest)
+
+    async def write_batch(self, batch):
+        """Write one batch, retrying; a batch that can't be written is forgotten so a resend is accepted."""
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            try:
+                await self.run_in_writer(self.sink.write_batch, batch)
+            except Exception as e:
+                if attempt < WRITE_ATTEMPTS:
+                    print(f"  ⚠️  Failed to write batch of {len(batch)} ({e}), retrying...")
+                    await asyncio.sleep(WRITE_RETRY_DELAY * 2 ** (attempt - 1))
+                    continue
+                self.settle(batch, written=False)
+                self.stats['failed'] += len(batch)
+                print(f"  ❌ Failed to write batch of {len(batch)}: {e} (send these articles again)")
+                return
+            self.settle(batch, written=True)
+            self.stats['written'] += len(batch)
+            self.stats['batches'] += 1
+            print(f"  💾 Wrote batch of {len(batch)} ({self.stats['written']} total)")
+            return
+
+    async def write_batches(self):
+        """Group-commit queued articles: wait for one, then gather more until full or timed out."""
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            article = await self.queue.get()
+            if article is None:
+                break
+
+            batch = [article]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    article = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if article is None:
+                    closing = True
+                    break
+                batch.append(article)
+
+            await self.write_batch(batch)
+
+    async def handle(self, request):
+        if request.method == 'OPTIONS':
+            return HTTPResponse(204, headers=CORS_HEADERS)
+
+        if request.method == 'GET' and request.path == '/status':
+            status = dict(self.stats, queued=self.queue.qsize(), sink=self.sink.description)
+            return json_response(status, headers=CORS_HEADERS)
+
+        if request.method == 'POST' and request.path == '/articles':
+            # The bookmarklet may send text/plain to skip the CORS preflight
+            articles = parse_payload(request.json())
+            accepted, duplicates = self.accept(articles)
+            print(f"📥 {len(articles)} received, {accepted} new, {duplicates} duplicates")
+            return json_response(
+                {'accepted': accepted, 'duplicates': duplicates, 'queued': self.queue.qsize()},
+                status=202, headers=CORS_HEADERS
+            )
+
+        raise HTTPError(404)
+
+async def serve(receiver, host, port):
+    await receiver.open()
+    server, port = await start_server(receiver.handle, host, port)
+
+    print("=" * 70)
+    print("Bookmarklet receiver running")
+    print("=" * 70)
+    print(f"  POST http://{host}:{port}/articles")
+    print(f"  GET  http://{host}:{port}/status")
+    print(f"  Writing to: {receiver.sink.description}")
+    print(f"  Already known: {len(receiver.url_hashes)} articles")
+    print("\nPress Ctrl+C to stop.\n")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    started = time.time()
+    try:
+        await stop.wait()
+    finally:
+        await server.stop()
+        await receiver.close()
+
+    stats = receiver.stats
+    print(f"\n✓ Stopped after {time.time() - started:.0f}s")
+    print(f"  Received: {stats['received']}, new: {stats['accepted']}, duplicates: {stats['duplicates']}")
+    print(f"  Written: {stats['written']} in {stats['batches']} batches"
+          + (f", failed: {stats['failed']}" if stats['failed'] else ""))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Receive bookmarklet scraper results over HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--jsonl', help="Append to this JSONL file instead of the article store")
+    parser.add_argument('--db', help="Article store database path (default: outputs/articles.db)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--flush-interval', type=float, default=DEFAULT_FLUSH_INTERVAL)
+    args = parser.parse_args()
+
+    if args.jsonl:
+        sink_factory = lambda: JSONLSink(args.jsonl)
+    else:
+        sink_factory = lambda: ArticleStoreSink(args.db)
+
+    receiver = BookmarkletReceiver(sink_factory, args.batch_size, args.flush_interval)
+    asyncio.run(serve(receiver, args.host, args.port))
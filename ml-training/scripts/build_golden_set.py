@@ -0,0 +1,307 @@
+"""
+Build a fixed-size, topic-balanced evaluation set from training or log JSONL.
+
+Every source file is read once, line by line. Each query goes into a
+per-stratum reservoir (Algorithm R), so every stratum keeps a uniform random
+sample of its queries no matter how large the corpus is; memory is bounded
+by strata x size records. At the end the set is split as evenly across
+strata as their sizes allow, with the share of small strata going to the
+rest.
+
+Strata are either
+    topic   the feature a query is about (score_responses.detect_topic, the
+            same keywords the URL tagger uses), or the answer's topic when
+            the query names none
+    intent  the intent label from csv_to_jsonl.py output ("Simplified: ...")
+            or an "intent" field
+
+Queries that appear in any --exclude file (normally the training data) are
+left out: user turns are hashed after lowercasing and collapsing whitespace,
+so the benchmark never asks the model something it was trained on.
+Duplicates within the sources are dropped as they enter a reservoir.
+
+Source lines can be chat examples ({"messages": [...]}, the last user turn
+is the query and the answer after it the reference), prompts or logs
+({"query"/"prompt": ..., "content"/"response": ...}) or instruction records
+({"instruction", "input", "output"}).
+
+The output is a prompt file evaluation_harness.py and auto_evaluate.py
+read directly (id, query, topic, stratum, reference, source), plus a
+manifest with per-stratum counts.
+
+Usage:
+    python build_golden_set.py ../data/logs/assistant.jsonl --exclude ../data/training/training_data_complete.jsonl
+    python build_golden_set.py a.jsonl b.jsonl --size 1000 --strata intent --seed 7
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import time
+from collections import Counter
+from pathlib import Path
+
+from score_responses import detect_topic
+
+GOLDEN_SET_FILE = Path(__file__).parent.parent / 'data' / 'eval' / 'golden_set.jsonl'
+DEFAULT_SIZE = 500
+MIN_QUERY_WORDS = 2
+STRATA = ('topic', 'intent')
+
+INTENT_LINE = re.compile(r'^(?:Simplified(?: Category)?|Intent):\s*(.+?)\s*$', re.MULTILINE)
+
+def query_hash(text):
+    """Hash of a query with case and whitespace normalized (8 bytes, as an int to keep sets small)."""
+    normalized = ' '.join(text.lower().split())
+    return int.from_bytes(hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).digest(), 'big')
+
+def user_turns(data):
+    """Every user-authored text in a record."""
+    if data.get('messages'):
+        return [m['content'] for m in data['messages']
+                if m.get('role') == 'user' and isinstance(m.get('content'), str)]
+    text = data.get('query') or data.get('prompt') or data.get('input') or data.get('instruction')
+    return [text] if isinstance(text, str) else []
+
+def extract(data):
+    """
+    (query, reference answer, intent label) of one source record.
+
+    Raises:
+        ValueError when the record has no query
+    """
+    reference = None
+    if data.get('messages'):
+        messages = data['messages']
+        last_user = max((i for i, m in enumerate(messages) if m.get('role') == 'user'), default=None)
+        if last_user is None:
+            raise ValueError("No user turn")
+        query = messages[last_user].get('content')
+        reference = next((m.get('content') for m in messages[last_user + 1:] if m.get('role') == 'assistant'), None)
+    else:
+        query = data.get('query') or data.get('prompt') or data.get('input') or data.get('instruction')
+        reference = data.get('content') or data.get('response') or data.get('output')
+    if not isinstance(query, str) or not query.strip():
+        raise ValueError("No query")
+
+    intent = data.get('intent') or data.get('simplified_intent_str')
+    if not intent and isinstance(reference, str):
+        # csv_to_jsonl answers are "Intent: ...\nSimplified: ..."; the last label is the coarsest
+        labels = INTENT_LINE.findall(reference)
+        intent = labels[-1] if labels else None
+    return query.strip(), reference, intent
+
+def stratum_of(query, reference, intent, strata):
+    if strata == 'intent':
+        return intent or 'unlabelled'
+    topic = detect_topic(query.lower())
+    if topic == 'general' and isinstance(reference, str):
+        topic = detect_topic(reference.lower())
+    return topic
+
+def iter_records(path):
+    """(line number, record) of every readable line; bad lines are counted by the caller."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError:
+                yield number, None
+                continue
+            yield number, data if isinstance(data, dict) else None
+
+def load_exclusions(paths):
+    """Hashes of every user turn in the given files (normally the training data)."""
+    hashes = set()
+    for path in paths or []:
+        for _, data in iter_records(path):
+            if data:
+                hashes.update(query_hash(text) for text in user_turns(data))
+    return hashes
+
+class Reservoir:
+    """Uniform sample of up to `capacity` items from a stream of unknown length (Algorithm R)."""
+
+    def __init__(self, capacity, rng):
+        self.capacity = capacity
+        self.rng = rng
+        self.items = []
+        self.hashes = set()
+        self.seen = 0
+
+    def offer(self, key, item):
+        """Consider one item; duplicates of a sampled item are ignored."""
+        if key in self.hashes:
+            return
+        self.seen += 1
+        if len(self.items) < self.capacity:
+            self.items.append((key, item))
+            self.hashes.add(key)
+            return
+        slot = self.rng.randrange(self.seen)
+        if slot < self.capacity:
+            self.hashes.discard(self.items[slot][0])
+            self.items[slot] = (key, item)
+            self.hashes.add(key)
+
+    def sample(self, count):
+        """`count` items in random order (the reservoir itself isn't shuffled)."""
+        items = [item for _, item in self.items]
+        self.rng.shuffle(items)
+        return items[:count]
+
+def allocate(available, size):
+    """
+    Split `size` as evenly as possible over strata with `available` items each;
+    what a small stratum can't fill goes to the others.
+
+    Returns:
+        Dict of stratum -> count
+    """
+    allocation = dict.fromkeys(available, 0)
+    remaining = size
+    open_strata = sorted(available, key=lambda stratum: available[stratum])
+    while remaining > 0 and open_strata:
+        share = max(1, remaining // len(open_strata))
+        for stratum in list(open_strata):
+            take = min(share, available[stratum] - allocation[stratum], remaining)
+            allocation[stratum] += take
+            remaining -= take
+            if allocation[stratum] >= available[stratum]:
+                open_strata.remove(stratum)
+            if not remaining:
+                break
+    return allocation
+
+def build_golden_set(sources, size=DEFAULT_SIZE, strata='topic', exclude=None, per_stratum=None, seed=0,
+                     min_words=MIN_QUERY_WORDS):
+    """
+    Sample an evaluation set in one pass over the sources.
+
+    Args:
+        sources: JSONL files to sample from
+        size: Total queries (ignored with per_stratum)
+        strata: 'topic' or 'intent'
+        exclude: JSONL files whose user turns must not appear in the set
+        per_stratum: Fixed number of queries per stratum instead of a balanced total
+        seed: Random seed; the same inputs and seed give the same set
+        min_words: Shorter queries are skipped
+
+    Returns:
+        (list of golden set records, manifest dict)
+    """
+    rng = random.Random(seed)
+    excluded_hashes = load_exclusions(exclude)
+    capacity = per_stratum or size
+    reservoirs = {}
+    counts = Counter()
+
+    for path in sources:
+        for number, data in iter_records(path):
+            counts['lines'] += 1
+            try:
+                query, reference, intent = extract(data) if data else (None, None, None)
+            except (ValueError, AttributeError, TypeError):
+                query = None
+            if not query:
+                counts['unreadable'] += 1
+                continue
+            if len(query.split()) < min_words:
+                counts['too_short'] += 1
+                continue
+            key = query_hash(query)
+            if key in excluded_hashes:
+                counts['excluded'] += 1
+                continue
+            stratum = stratum_of(query, reference, intent, strata)
+            if stratum not in reservoirs:
+                reservoirs[stratum] = Reservoir(capacity, rng)
+            reservoirs[stratum].offer(key, {
+                'query': query, 'reference': reference, 'intent': intent, 'source': f"{path}:{number}"
+            })
+
+    available = {stratum: len(reservoir.items) for stratum, reservoir in reservoirs.items()}
+    allocation = ({stratum: min(per_stratum, n) for stratum, n in available.items()} if per_stratum
+                  else allocate(available, size))
+
+    records = []
+    for stratum in sorted(reservoirs):
+        for item in reservoirs[stratum].sample(allocation[stratum]):
+            topic = stratum if strata == 'topic' else detect_topic(item['query'].lower())
+            records.append(dict(query=item['query'], topic=topic, stratum=stratum, intent=item['intent'],
+                                reference=item['reference'], source=item['source']))
+    rng.shuffle(records)
+    for number, record in enumerate(records, 1):
+        record['id'] = f"golden-{number:05d}"
+
+    manifest = {
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'sources': [str(path) for path in sources],
+        'exclude': [str(path) for path in exclude or []],
+        'excluded_queries': len(excluded_hashes),
+        'strata': strata,
+        'size': len(records),
+        'requested_size': None if per_stratum else size,
+        'per_stratum': per_stratum,
+        'seed': seed,
+        'lines': dict(counts),
+        'by_stratum': {stratum: {'seen': reservoirs[stratum].seen, 'selected': allocation[stratum]}
+                       for stratum in sorted(reservoirs, key=lambda s: -reservoirs[s].seen)}
+    }
+    return records, manifest
+
+def save_golden_set(records, manifest, output_path=GOLDEN_SET_FILE):
+    """Write the set and its manifest (<name>.manifest.json) atomically."""
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = output_path.with_suffix('.tmp')
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    temp_path.replace(output_path)
+    with open(output_path.with_suffix('.manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+def print_manifest(manifest):
+    lines = manifest['lines']
+    print(f"\nRead {lines.get('lines', 0):,} lines: {lines.get('excluded', 0):,} in the training data, "
+          f"{lines.get('too_short', 0):,} too short, {lines.get('unreadable', 0):,} without a query")
+    print(f"\n{manifest['strata'].capitalize():<32}{'Seen':>12}{'Selected':>10}")
+    print("-" * 54)
+    for stratum, counts in manifest['by_stratum'].items():
+        print(f"{stratum[:31]:<32}{counts['seen']:>12,}{counts['selected']:>10,}")
+    print("-" * 54)
+    print(f"{'Total':<32}{sum(c['seen'] for c in manifest['by_stratum'].values()):>12,}{manifest['size']:>10,}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sample a topic-balanced evaluation set from JSONL files")
+    parser.add_argument('sources', nargs='+', help="Training or log JSONL files to sample from")
+    parser.add_argument('--exclude', nargs='+', default=[], help="JSONL files whose queries must not be used")
+    parser.add_argument('--size', type=int, default=DEFAULT_SIZE)
+    parser.add_argument('--per-stratum', type=int, help="Fixed queries per stratum instead of --size")
+    parser.add_argument('--strata', choices=STRATA, default='topic')
+    parser.add_argument('--min-words', type=int, default=MIN_QUERY_WORDS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=str(GOLDEN_SET_FILE))
+    args = parser.parse_args()
+
+    missing = [path for path in args.sources + args.exclude if not Path(path).exists()]
+    if missing:
+        print(f"❌ Not found: {', '.join(missing)}")
+        exit(1)
+
+    started = time.perf_counter()
+    records, manifest = build_golden_set(args.sources, args.size, args.strata, args.exclude, args.per_stratum,
+                                         args.seed, args.min_words)
+    print_manifest(manifest)
+    if not records:
+        print("❌ Nothing to sample")
+        exit(1)
+    save_golden_set(records, manifest, args.output)
+    print(f"\n✓ {len(records):,} queries in {time.perf_counter() - started:.1f}s: {args.output}")
+    if not args.per_stratum and len(records) < args.size:
+        print(f"⚠️  Only {len(records):,} distinct queries were available (asked for {args.size:,})")
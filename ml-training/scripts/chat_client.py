@@ -0,0 +1,321 @@
+"""
+Async chat completions client for llama-api.com and OpenAI-compatible servers.
+
+Built on async_http.AsyncHTTPClient (aiohttp), so many requests share a
+bounded pool of keep-alive connections. Streamed answers are parsed incrementally
+(sse.SSEParser) and exposed as an async iterator of content deltas:
+
+    stream = await client.stream(model, messages)
+    async for delta in stream:
+        print(delta, end='', flush=True)
+    stream.result()   # content, usage and timings
+
+complete() wraps that for batch use. It returns a result dict with the answer
+and its timings instead of raising, which is what the evaluation tools need
+when thousands of requests are in flight and some of them fail. With a
+response_cache.ResponseCache, complete() answers repeated requests from the
+cache (result['cached'] is True, timings are those of the original call).
+Every answer fetched from the API is recorded by usage_accounting.py.
+
+    latency            seconds from sending the request to the last byte
+    ttft               seconds to the first content token (streaming only)
+    itl_mean/p95/max   gaps between consecutive content tokens (streaming only)
+    tokens_per_second  completion tokens / generation time
+
+Usage:
+    python chat_client.py "How do I create a product catalog?" --model <model>
+    python chat_client.py "How do I set an away message?" --model mock --base-url http://127.0.0.1:8768
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from async_http import DEFAULT_CONNECTIONS, DEFAULT_TIMEOUT, AsyncHTTPClient, HTTPClientError
+from response_cache import cache_request
+from sse import SSEParser
+from test_fine_tuned_model import SYSTEM_PROMPT
+from usage_accounting import active_usage_log
+
+load_dotenv(Path(__file__).parent.parent / '.env')
+
+CHAT_PATH = '/chat/completions'
+TIMING_FIELDS = ('ttft', 'itl_mean', 'itl_p95', 'itl_max')
+
+class ChatError(Exception):
+    """Raised by ChatClient.stream when a request fails."""
+
+    def __init__(self, message, error_type, status=None):
+        super().__init__(message)
+        self.error_type = error_type
+        self.status = status
+
+def error_result(model, error, error_type, started, status=None):
+    result = {
+        'model': model, 'content': None, 'error': error, 'error_type': error_type, 'status': status,
+        'latency': round(time.perf_counter() - started, 4),
+        'prompt_tokens': None, 'completion_tokens': None, 'tokens_per_second': None, 'finish_reason': None
+    }
+    result.update(dict.fromkeys(TIMING_FIELDS))
+    return result
+
+class StreamTimings:
+    """When each content token arrived, relative to sending the request."""
+
+    def __init__(self, started):
+        self.started = started
+        self.first_token = None
+        self.last_token = None
+        self.gaps = []
+
+    def token(self, now):
+        if self.first_token is None:
+            self.first_token = now
+        else:
+            self.gaps.append(now - self.last_token)
+        self.last_token = now
+
+    def summary(self):
+        gaps = sorted(self.gaps)
+        return {
+            'ttft': round(self.first_token - self.started, 4) if self.first_token is not None else None,
+            'itl_mean': round(sum(gaps) / len(gaps), 4) if gaps else None,
+            'itl_p95': round(gaps[min(len(gaps) - 1, int(len(gaps) * 0.95))], 4) if gaps else None,
+            'itl_max': round(gaps[-1], 4) if gaps else None
+        }
+
+class ChatStream:
+    """Async iterator over the content deltas of one completion."""
+
+    def __init__(self, response, started):
+        self.response = response
+        self.timings = StreamTimings(started)
+        self.parts = []
+        self.deltas = 0
+        self.usage = {}
+        self.finish_reason = None
+        self.iterator = None
+
+    def __aiter__(self):
+        if self.iterator is None:
+            self.iterator = self.iter_deltas()
+        return self.iterator
+
+    async def iter_deltas(self):
+        try:
+            if not self.response.headers.get('content-type', '').startswith('text/event-stream'):
+                # The server ignored "stream": the whole answer is one delta
+                data = await self.response.json()
+                self.timings.token(time.perf_counter())
+                for content in self.handle_event(data):
+                    yield content
+                return
+
+            parser = SSEParser()
+            async for chunk in self.response.iter_chunks():
+                now = time.perf_counter()  # Every delta in this chunk arrived now
+                for event in parser.feed(chunk):
+                    if event.data == b'[DONE]':
+                        continue
+                    for content in self.handle_event(json.loads(event.data)):
+                        self.timings.token(now)
+                        yield content
+        except asyncio.TimeoutError:
+            raise ChatError("Timed out", 'timeout')
+        except (HTTPClientError, OSError) as e:
+            raise ChatError(str(e), 'connection')
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+            raise ChatError(f"Unexpected response: {e!r}", 'bad_response', 200)
+
+    def handle_event(self, data):
+        """Content pieces in one chunk (streamed) or completion (non-streamed) body."""
+        self.usage = data.get('usage') or self.usage
+        pieces = []
+        for choice in data.get('choices') or []:
+            message = choice.get('delta') or choice.get('message') or {}
+            if message.get('content'):
+                pieces.append(message['content'])
+            self.finish_reason = choice.get('finish_reason') or self.finish_reason
+        self.parts.extend(pieces)
+        self.deltas += len(pieces)
+        return pieces
+
+    async def aclose(self):
+        """Stop early; the connection is closed rather than reused."""
+        if self.iterator is not None:
+            await self.iterator.aclose()
+
+    def result(self):
+        """Content, token counts and timings of what has been received so far."""
+        content = ''.join(self.parts)
+        return dict(
+            content=content,
+            prompt_tokens=self.usage.get('prompt_tokens'),
+            completion_tokens=self.usage.get('completion_tokens') or self.deltas,
+            finish_reason=self.finish_reason,
+            **self.timings.summary()
+        )
+
+class ChatClient:
+    def __init__(self, base_url=None, api_key=None, max_connections=DEFAULT_CONNECTIONS, timeout=DEFAULT_TIMEOUT,
+                 cache=None):
+        """
+        Args:
+            base_url: API base URL (default: LLAMA_API_URL or https://api.llama-api.com)
+            api_key: Bearer token (default: LLAMA_API_KEY)
+            max_connections: Requests that may be in flight at once
+            timeout: Seconds allowed for connecting and between reads
+            cache: Optional ResponseCache used by complete()
+        """
+        self.cache = cache
+        self.usage = active_usage_log()
+        self.base_url = (base_url or os.getenv('LLAMA_API_URL', 'https://api.llama-api.com')).rstrip('/')
+        api_key = api_key or os.getenv('LLAMA_API_KEY')
+        headers = {'Authorization': f"Bearer {api_key}"} if api_key else {}
+        self.http = AsyncHTTPClient(self.base_url, headers, max_connections, timeout)
+
+    async def stream(self, model, messages, max_tokens=500, temperature=0.7, stream=True, started=None, **params):
+        """
+        Send a chat completion request and return its answer as a ChatStream.
+
+        Args:
+            model: Model id
+            messages: Chat messages
+            max_tokens, temperature: Sampling settings (None: not sent); extra keyword arguments are sent as-is
+            stream: Ask for server-sent events; without, the answer arrives as one delta
+            started: perf_counter() value timings are measured from (default: now)
+
+        Raises:
+            ChatError on connection failures, timeouts and non-200 responses
+        """
+        body = dict(params, model=model, messages=messages)
+        if max_tokens is not None:
+            body['max_tokens'] = max_tokens
+        if temperature is not None:
+            body['temperature'] = temperature
+        if stream:
+            body['stream'] = True
+            body.setdefault('stream_options', {'include_usage': True})
+
+        started = started or time.perf_counter()
+        try:
+            response = await self.http.post(
+                CHAT_PATH, json_body=body, headers={'Accept': 'text/event-stream' if stream else 'application/json'}
+            )
+            if response.status != 200:
+                text = await response.text()
+                raise ChatError(f"{response.status}: {text[:300]}", f"http_{response.status}", response.status)
+        except asyncio.TimeoutError:
+            raise ChatError("Timed out", 'timeout')
+        except (HTTPClientError, OSError) as e:
+            raise ChatError(str(e), 'connection')
+        return ChatStream(response, started)
+
+    async def complete(self, model, messages, max_tokens=500, temperature=0.7, stream=True, started=None, **params):
+        """
+        Send one chat completion request and wait for the whole answer.
+
+        Args:
+            Same as stream(); streaming is what makes ttft and the inter-token gaps measurable.
+            A load test passes the time a request was due as `started`, so queueing counts as latency
+
+        Returns:
+            Result dict: content, error, error_type, status, latency, ttft, itl_mean, itl_p95,
+            itl_max, prompt_tokens, completion_tokens, tokens_per_second, finish_reason, cached
+        """
+        started = started or time.perf_counter()
+        request = None
+        if self.cache:
+            request = cache_request(self.base_url, model, messages,
+                                    dict(params, max_tokens=max_tokens, temperature=temperature))
+            record = self.cache.get(request)
+            if record:
+                return dict({'model': model}, **record, error=None, error_type=None, status=200, cached=True)
+            if self.cache.offline:
+                return error_result(model, "Not in the response cache (offline)", 'cache_miss', started)
+
+        try:
+            chat_stream = await self.stream(model, messages, max_tokens, temperature, stream, started, **params)
+            async for _ in chat_stream:
+                pass
+        except ChatError as e:
+            result = error_result(model, str(e), e.error_type, started, e.status)
+            if self.usage:
+                self.usage.record_chat(model, messages, result, self.base_url)
+            return result
+
+        result = chat_stream.result()
+        if not stream:
+            result.update(dict.fromkeys(TIMING_FIELDS))
+        latency = time.perf_counter() - started
+        generation = latency - result['ttft'] if result['ttft'] is not None else latency
+        tokens = result['completion_tokens']
+        result = dict(
+            {'model': model},
+            **result,
+            error=None,
+            error_type=None,
+            status=200,
+            latency=round(latency, 4),
+            tokens_per_second=round(tokens / generation, 2) if tokens and generation > 0 else None,
+            cached=False
+        )
+        if self.cache:
+            self.cache.put(request, result)
+        if self.usage:
+            self.usage.record_chat(model, messages, result, self.base_url)
+        return result
+
+    async def close(self):
+        await self.http.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+async def main(args):
+    messages = [{'role': 'user', 'content': args.query}]
+    if not args.no_system_prompt:
+        messages.insert(0, {'role': 'system', 'content': SYSTEM_PROMPT})
+
+    async with ChatClient(args.base_url) as client:
+        try:
+            chat_stream = await client.stream(args.model, messages, args.max_tokens, args.temperature)
+            print("🤖 ", end='', flush=True)
+            async for delta in chat_stream:
+                print(delta, end='', flush=True)
+        except ChatError as e:
+            print(f"\n❌ {e}")
+            exit(1)
+
+    result = chat_stream.result()
+    duration = time.perf_counter() - chat_stream.timings.started
+    if client.usage:
+        client.usage.record_chat(args.model, messages, dict(result, latency=duration, status=200), client.base_url)
+    print(f"\n\nTime to first token: {result['ttft'] if result['ttft'] is not None else '-'}s")
+    if result['itl_mean'] is not None:
+        print(f"Inter-token gaps:    mean {result['itl_mean'] * 1000:.1f} ms, "
+              f"p95 {result['itl_p95'] * 1000:.1f} ms, max {result['itl_max'] * 1000:.1f} ms")
+    print(f"Total:               {duration:.3f}s, {result['completion_tokens']} tokens")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream one chat completion and show its timings")
+    parser.add_argument('query')
+    parser.add_argument('--model', default=os.getenv('FINE_TUNED_MODEL_ID'))
+    parser.add_argument('--base-url', help="API base URL (default: LLAMA_API_URL)")
+    parser.add_argument('--max-tokens', type=int, default=500)
+    parser.add_argument('--temperature', type=float, default=0.7)
+    parser.add_argument('--no-system-prompt', action='store_true')
+    args = parser.parse_args()
+
+    if not args.model:
+        print("❌ No model given (--model or FINE_TUNED_MODEL_ID)")
+        exit(1)
+    asyncio.run(main(args))
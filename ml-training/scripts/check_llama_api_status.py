@@ -5,10 +5,11 @@ Check fine-tuning job status on llama-api.com
 import os
 import sys
 import json
-import requests
 from dotenv import load_dotenv
 from pathlib import Path
 
+from fine_tuning_client import create_session
+
 # Load environment variables
 load_dotenv(Path(__file__).parent.parent / '.env')
 
@@ -39,7 +40,7 @@ def check_status(job_id=None):
     try:
         headers = {"Authorization": f"Bearer {api_key}"}
 
-        response = requests.get(
+        response = create_session().get(
             f"{base_url}/fine-tuning/jobs/{job_id}",
             headers=headers,
             timeout=30
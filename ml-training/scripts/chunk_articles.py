@@ -0,0 +1,209 @@
+"""
+Split help articles into passages that fit a token budget.
+
+Passages break on heading and paragraph boundaries, can overlap by a few
+paragraphs, and carry stable ids (article id + passage index) so the same
+article always produces the same passage ids. Articles are processed one at a
+time and written straight to JSONL, so long inputs never sit in memory.
+
+Usage:
+    python chunk_articles.py ../data/processed/help_articles_manual.json ../data/training/help_passages.jsonl
+    python chunk_articles.py ../outputs/help_articles_raw.json passages.jsonl --max-tokens 256 --overlap 32
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import re
+
+DEFAULT_MAX_TOKENS = 512
+DEFAULT_OVERLAP_TOKENS = 64
+CHARS_PER_TOKEN = 4  # Rough average for Llama tokenizers on English text
+
+HEADING_PATTERN = re.compile(r'^#{1,6}\s+\S')
+SENTENCE_PATTERN = re.compile(r'(?<=[.!?])\s+')
+
+def estimate_tokens(text):
+    """Cheap token estimate; pass a real tokenizer's counter to the chunker for exact budgets."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def article_id(article):
+    """Stable 12-character id derived from the article URL (or title for manual articles)."""
+    key = article.get('url') or article['title']
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+
+def split_blocks(content):
+    """Yield (heading, paragraph, is_heading) for each paragraph, tracking the current heading."""
+    heading = None
+    for block in re.split(r'\n\s*\n', content):
+        block = block.strip()
+        if not block:
+            continue
+        if HEADING_PATTERN.match(block):
+            heading = block
+            yield heading, block, True
+        else:
+            yield heading, block, False
+
+def split_oversized(text, max_tokens, count_tokens):
+    """Split a single paragraph that exceeds the budget by sentences, then by words."""
+    pieces = []
+    current = ''
+    for sentence in SENTENCE_PATTERN.split(text):
+        if count_tokens(sentence) > max_tokens:
+            for word in sentence.split():
+                candidate = f"{current} {word}" if current else word
+                if current and count_tokens(candidate) > max_tokens:
+                    pieces.append(current)
+                    current = word
+                else:
+                    current = candidate
+            continue
+
+        candidate = f"{current} {sentence}" if current else sentence
+        if current and count_tokens(candidate) > max_tokens:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = candidate
+
+    if current:
+        pieces.append(current)
+    return pieces
+
+def iter_passages(article, max_tokens=DEFAULT_MAX_TOKENS, overlap_tokens=DEFAULT_OVERLAP_TOKENS,
+                  count_tokens=estimate_tokens):
+    """
+    Yield passages of an article, each under max_tokens.
+
+    A heading always starts a new passage. Passages that continue a section
+    repeat its heading so they stand on their own, and start with up to
+    overlap_tokens worth of trailing paragraphs from the previous passage.
+
+    Args:
+        article: Article dict with title, content and optionally url
+        max_tokens: Token budget per passage
+        overlap_tokens: Budget for paragraphs repeated from the previous passage
+        count_tokens: Function returning the token count of a string
+
+    Yields:
+        Dicts with passage_id, article_id, index, title, url, heading, text, tokens
+    """
+    if overlap_tokens >= max_tokens:
+        raise ValueError("overlap_tokens must be smaller than max_tokens")
+
+    base_id = article_id(article)
+    index = 0
+    paragraphs = []  # Paragraphs in the passage being built
+    size = 0
+    passage_heading = None
+
+    def make_passage():
+        return {
+            'passage_id': f"{base_id}-{index:03d}",
+            'article_id': base_id,
+            'index': index,
+            'title': article['title'],
+            'url': article.get('url'),
+            'heading': passage_heading,
+            'text': '\n\n'.join(paragraphs),
+            'tokens': size
+        }
+
+    for heading, block, is_heading in split_blocks(article.get('content', '')):
+        units = [block]
+        if count_tokens(block) > max_tokens:
+            # Leave room for the repeated section heading
+            budget = max_tokens - (count_tokens(heading) if heading and not is_heading else 0)
+            units = split_oversized(block, max(budget, 1), count_tokens)
+
+        for unit in units:
+            unit_tokens = count_tokens(unit)
+            fits = size + unit_tokens <= max_tokens
+
+            if paragraphs and (is_heading or not fits):
+                yield make_passage()
+                index += 1
+
+                previous = paragraphs
+                paragraphs = []
+                size = 0
+                passage_heading = heading
+                if heading and not is_heading and count_tokens(heading) + unit_tokens <= max_tokens:
+                    paragraphs.append(heading)
+                    size += count_tokens(heading)
+
+                if not is_heading:
+                    # Overlap: repeat trailing paragraphs, never the heading itself
+                    budget = min(overlap_tokens, max_tokens - size - unit_tokens)
+                    carried = []
+                    for paragraph in reversed(previous):
+                        paragraph_tokens = count_tokens(paragraph)
+                        if paragraph == heading or paragraph_tokens > budget:
+                            break
+                        carried.insert(0, paragraph)
+                        budget -= paragraph_tokens
+                    paragraphs.extend(carried)
+                    size += sum(count_tokens(paragraph) for paragraph in carried)
+
+            if not paragraphs:
+                passage_heading = heading
+            paragraphs.append(unit)
+            size += unit_tokens
+
+    if paragraphs:
+        yield make_passage()
+
+def iter_passage_articles(articles, max_tokens=DEFAULT_MAX_TOKENS, overlap_tokens=DEFAULT_OVERLAP_TOKENS,
+                          count_tokens=estimate_tokens):
+    """
+    Yield one article-like dict per passage, ready for the existing JSONL converters.
+
+    Each dict keeps the source article's fields, replaces 'content' with the
+    passage text and adds 'passage_id'.
+    """
+    for article in articles:
+        for passage in iter_passages(article, max_tokens, overlap_tokens, count_tokens):
+            passage_article = dict(article)
+            passage_article['content'] = passage['text']
+            passage_article['passage_id'] = passage['passage_id']
+            yield passage_article
+
+def write_passages_jsonl(articles, output_file, max_tokens=DEFAULT_MAX_TOKENS,
+                         overlap_tokens=DEFAULT_OVERLAP_TOKENS, count_tokens=estimate_tokens):
+    """
+    Stream passages for an iterable of articles straight into a JSONL file.
+
+    Returns:
+        (article_count, passage_count)
+    """
+    article_count = 0
+    passage_count = 0
+    with open(output_file, 'w', encoding='utf-8') as f:
+        for article in articles:
+            article_count += 1
+            for passage in iter_passages(article, max_tokens, overlap_tokens, count_tokens):
+                f.write(json.dumps(passage, ensure_ascii=False) + '\n')
+                passage_count += 1
+    return article_count, passage_count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split help articles into token-bounded passages")
+    parser.add_argument('input_json', help="Articles JSON (scraped or manual format)")
+    parser.add_argument('output_jsonl', help="Passages output file")
+    parser.add_argument('--max-tokens', type=int, default=DEFAULT_MAX_TOKENS)
+    parser.add_argument('--overlap', type=int, default=DEFAULT_OVERLAP_TOKENS)
+    args = parser.parse_args()
+
+    with open(args.input_json, 'r', encoding='utf-8') as f:
+        source = json.load(f)
+
+    articles = (a for a in source if a.get('title') and a.get('content') and a.get('success', True))
+    article_count, passage_count = write_passages_jsonl(
+        articles, args.output_jsonl, args.max_tokens, args.overlap
+    )
+
+    print(f"✓ Split {article_count} articles into {passage_count} passages")
+    print(f"  Budget: {args.max_tokens} tokens, overlap: {args.overlap} tokens")
+    print(f"  Output: {args.output_jsonl}")
@@ -0,0 +1,359 @@
+"""
+Compare two or more models side by side on the same prompt set.
+
+Every prompt is sent to all models at once, so each model answers under the
+same load, and a fixed number of prompts are in flight. Answers go through
+chat_client.ChatClient with the response cache (response_cache.py): prompts
+a model has already answered with the same settings cost no API call, so a
+comparison re-run after a new fine-tune only asks the new model.
+
+Each answer is scored offline with score_responses.ResponseScorer. Because
+every model answered the same prompts, the models are compared pairwise
+against the baseline (the first model) on per-prompt differences:
+
+    answered        share of prompts answered without an error
+    score           mean of the score_responses checks (0-1)
+    hallucinations  answers without links outside the allowed articles
+    expected link   answers linking an article for their topic
+    on topic        answers that mention the query's feature
+    length          answers of an acceptable length
+    latency, ttft   seconds, over prompts both models answered
+
+For each metric the mean difference gets a paired bootstrap confidence
+interval (prompts resampled with replacement) and a two-sided p-value; a
+difference counts as significant when the interval excludes zero and at
+least MIN_PAIRS prompts have a value from both models (with fewer, a handful
+of identical pairs gives a zero-width interval). Wins, ties
+and losses on the per-prompt score are reported as well. Latencies of cached
+answers are the ones measured when they were fetched; the report says how
+many there were.
+
+The answers go to outputs/evaluations/comparisons/<time>-<models>.jsonl and
+the statistics to a .json file next to it.
+
+Usage:
+    python compare_models.py llama3.1-8b ft:llama3.1-8b:whatsapp-business-assistant-v1:abc123
+    python compare_models.py <baseline> <candidate> <candidate2> --prompts prompts.jsonl --concurrency 16
+    python compare_models.py <baseline> <candidate> --offline          # cached answers only
+
+    # Offline against the mock server
+    python mock_chat_server.py &
+    python compare_models.py mock-a mock-b --base-url http://127.0.0.1:8768
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from chat_client import ChatClient
+from evaluation_harness import distribution, load_prompts, percentile, reserve_path
+from response_cache import ResponseCache
+from score_responses import SYSTEM_PROMPT_FILE, ResponseScorer, ScoreAggregate, load_allowed_articles
+
+load_dotenv(Path(__file__).parent.parent / '.env')
+
+COMPARE_DIR = Path(__file__).parent.parent / 'outputs' / 'evaluations' / 'comparisons'
+DEFAULT_CONCURRENCY = 16
+DEFAULT_RESAMPLES = 2000
+CONFIDENCE = 0.95
+MIN_PAIRS = 20              # Fewer pairs than this never count as a significant difference
+COMPARE_TEMPERATURE = 0.0   # Keep answers as repeatable as the API allows (and the cache useful)
+PROGRESS_EVERY = 100
+
+# (key, label, higher is better); the check keys are score_responses.CHECKS
+METRICS = (
+    ('answered', 'Answered', True),
+    ('score', 'Quality score', True),
+    ('no_hallucinated_urls', 'No hallucinated link', True),
+    ('expected_link', 'Expected link', True),
+    ('on_topic', 'On topic', True),
+    ('length_ok', 'Length OK', True),
+    ('latency', 'Latency (s)', False),
+    ('ttft', 'TTFT (s)', False),
+)
+
+def metric_value(answer, key):
+    """One prompt's value of a metric for one model (None: not applicable or no answer)."""
+    if key == 'answered':
+        return 0 if answer['error'] else 1
+    if key in ('latency', 'ttft'):
+        return None if answer['error'] else answer.get(key)
+    value = answer['scores'].get(key)
+    return int(value) if isinstance(value, bool) else value
+
+def paired_bootstrap(differences, resamples=DEFAULT_RESAMPLES, confidence=CONFIDENCE, rng=None):
+    """
+    Bootstrap the mean of per-prompt differences.
+
+    Args:
+        differences: candidate - baseline for every prompt both have a value for
+        resamples: Bootstrap samples
+        confidence: Width of the percentile interval
+        rng: random.Random (default: seeded with 0, so reports are reproducible)
+
+    Returns:
+        Dict of n, mean, ci_low, ci_high, p_value and significant (interval excludes zero
+        and at least MIN_PAIRS pairs); None when there are no pairs
+    """
+    n = len(differences)
+    if not n:
+        return None
+    rng = rng or random.Random(0)
+    means = sorted(sum(rng.choices(differences, k=n)) / n for _ in range(resamples))
+    tail = (1 - confidence) / 2 * 100
+    low, high = percentile(means, tail), percentile(means, 100 - tail)
+    # Two-sided: how often a resample lands on the other side of zero
+    below = sum(1 for mean in means if mean <= 0)
+    above = sum(1 for mean in means if mean >= 0)
+    return {
+        'n': n,
+        'mean': round(sum(differences) / n, 4),
+        'ci_low': round(low, 4),
+        'ci_high': round(high, 4),
+        'p_value': round(min(1.0, 2 * min(below, above) / resamples), 4),
+        'significant': n >= MIN_PAIRS and (low > 0 or high < 0)
+    }
+
+def compare_pair(rows, baseline, candidate, resamples=DEFAULT_RESAMPLES, confidence=CONFIDENCE, seed=0):
+    """
+    Paired statistics of `candidate` against `baseline` over the comparison rows.
+
+    Returns:
+        Dict of metric key -> bootstrap result (plus 'verdict': better/worse/same, or
+        too_few below MIN_PAIRS pairs),
+        and 'score_record' with per-prompt wins, ties and losses
+    """
+    rng = random.Random(seed)
+    comparison = {}
+    for key, _, higher_is_better in METRICS:
+        differences = []
+        for row in rows:
+            a = metric_value(row['answers'][candidate], key)
+            b = metric_value(row['answers'][baseline], key)
+            if a is not None and b is not None:
+                differences.append(a - b)
+        result = paired_bootstrap(differences, resamples, confidence, rng)
+        if result and result['n'] < MIN_PAIRS:
+            result['verdict'] = 'too_few'
+        elif result:
+            improved = result['ci_low'] > 0 if higher_is_better else result['ci_high'] < 0
+            result['verdict'] = ('better' if improved else 'worse') if result['significant'] else 'same'
+        comparison[key] = result
+
+    record = {'wins': 0, 'ties': 0, 'losses': 0}
+    for row in rows:
+        a = row['answers'][candidate]['scores'].get('score')
+        b = row['answers'][baseline]['scores'].get('score')
+        a, b = a or 0, b or 0  # A failed answer scores 0 here
+        record['wins' if a > b else 'losses' if a < b else 'ties'] += 1
+    comparison['score_record'] = record
+    return comparison
+
+class ModelComparison:
+    def __init__(self, client, models, scorer, concurrency=DEFAULT_CONCURRENCY, max_tokens=500,
+                 temperature=COMPARE_TEMPERATURE, stream=True):
+        """
+        Args:
+            client: ChatClient (its pool should allow concurrency x len(models) connections)
+            models: Model ids; the first is the baseline
+            scorer: ResponseScorer
+            concurrency: Prompts in flight at once (each is sent to every model)
+            max_tokens, temperature: Sampling settings, the same for every model
+            stream: Stream answers, which is what makes time-to-first-token measurable
+        """
+        self.client = client
+        self.models = models
+        self.scorer = scorer
+        self.concurrency = concurrency
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.stream = stream
+
+    async def ask(self, model, prompt, query):
+        result = await self.client.complete(model, prompt['messages'], self.max_tokens, self.temperature,
+                                            stream=self.stream)
+        result = dict(result, id=prompt['id'], topic=prompt.get('topic'), query=query)
+        result['scores'] = self.scorer.score(result)
+        return result
+
+    async def compare(self, prompt):
+        query = next((m['content'] for m in reversed(prompt['messages']) if m.get('role') == 'user'), None)
+        answers = await asyncio.gather(*(self.ask(model, prompt, query) for model in self.models))
+        return {'id': prompt['id'], 'query': query, 'answers': dict(zip(self.models, answers))}
+
+    async def run(self, prompts, output_path=None):
+        """
+        Ask every model every prompt.
+
+        Returns:
+            List of rows: id, query and answers (model -> result dict with its scores)
+        """
+        rows = []
+        prompts = iter(prompts)
+        output = open(output_path, 'w', encoding='utf-8') if output_path else None
+        started = time.perf_counter()
+
+        async def worker():
+            # Workers share one iterator; next() never yields to the event loop, so no prompt is sent twice
+            for prompt in prompts:
+                row = await self.compare(prompt)
+                rows.append(row)
+                if output:
+                    output.write(json.dumps(row, ensure_ascii=False) + '\n')
+                if len(rows) % PROGRESS_EVERY == 0:
+                    print(f"  {len(rows):,} prompts, {len(rows) / (time.perf_counter() - started):.1f}/s")
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            if output:
+                output.close()
+        return rows
+
+def summarize_model(rows, model, allowed=None):
+    """Scores, latency and cache use of one model's answers."""
+    aggregate = ScoreAggregate()
+    answers = [row['answers'][model] for row in rows]
+    for answer in answers:
+        aggregate.add(answer['scores'])
+    answered = [answer for answer in answers if not answer['error']]
+    return dict(
+        aggregate.summary(allowed)['overall'],
+        cached=sum(1 for answer in answers if answer.get('cached')),
+        latency=distribution(answer['latency'] for answer in answered),
+        ttft=distribution(answer['ttft'] for answer in answered),
+        completion_tokens=sum(answer['completion_tokens'] or 0 for answer in answered)
+    )
+
+def build_report(rows, models, allowed=None, resamples=DEFAULT_RESAMPLES, confidence=CONFIDENCE, seed=0):
+    """Per-model summaries and paired comparisons of every model against the first."""
+    baseline = models[0]
+    return {
+        'baseline': baseline,
+        'models': models,
+        'prompts': len(rows),
+        'confidence': confidence,
+        'resamples': resamples,
+        'min_pairs': MIN_PAIRS,
+        'summary': {model: summarize_model(rows, model, allowed) for model in models},
+        'comparisons': {model: compare_pair(rows, baseline, model, resamples, confidence, seed)
+                        for model in models[1:]}
+    }
+
+def comparison_path(models, compare_dir=COMPARE_DIR):
+    """outputs/evaluations/comparisons/<timestamp>-<model>-vs-<model>.jsonl (see evaluation_harness.reserve_path)"""
+    slug = re.sub(r'[^A-Za-z0-9._-]+', '_', '-vs-'.join(model.split(':')[-1] for model in models))[-100:]
+    return reserve_path(compare_dir, slug)
+
+def print_report(report):
+    models = report['models']
+    width = max(12, *(min(len(model), 40) + 2 for model in models))
+    print("\n" + "=" * 90)
+    print(f"Model comparison: {report['prompts']:,} prompts, baseline {report['baseline']}")
+    print("=" * 90)
+    print(f"{'Model':<{width}}{'Answered':>10}{'Score':>8}{'Halluc.':>9}{'No link':>9}{'Off-topic':>11}"
+          f"{'Latency p50':>13}{'p95':>8}")
+    print("-" * (width + 68))
+
+    def pct(value):
+        return f"{value:.1%}" if value is not None else '-'
+
+    for model in models:
+        stats = report['summary'][model]
+        latency = stats['latency'] or {}
+        answered = (stats['responses'] - stats['errors']) / stats['responses'] if stats['responses'] else None
+        print(f"{model[-(width - 2):]:<{width}}{pct(answered):>10}"
+              f"{stats['mean_score'] if stats['mean_score'] is not None else '-':>8}"
+              f"{pct(stats['hallucination_rate']):>9}{pct(stats['missing_link_rate']):>9}"
+              f"{pct(stats['off_topic_rate']):>11}{latency.get('p50', '-'):>13}{latency.get('p95', '-'):>8}")
+
+    level = f"{report['confidence']:.0%}"
+    for model, comparison in report['comparisons'].items():
+        record = comparison['score_record']
+        print(f"\n{model} vs {report['baseline']} (mean difference, {level} CI, "
+              f"{report['resamples']:,} bootstrap resamples)")
+        print(f"  {'':<22}{'Diff':>9}{'CI':>22}{'p':>8}{'Pairs':>8}")
+        for key, label, _ in METRICS:
+            result = comparison[key]
+            if not result:
+                print(f"  {label:<22}{'-':>9}")
+                continue
+            mark = {'better': '✓ better', 'worse': '❌ worse', 'same': '',
+                    'too_few': f"too few pairs (<{MIN_PAIRS}) to judge"}[result['verdict']]
+            interval = f"[{result['ci_low']:+.4f}, {result['ci_high']:+.4f}]"
+            print(f"  {label:<22}{result['mean']:>+9.4f}{interval:>22}{result['p_value']:>8.3f}"
+                  f"{result['n']:>8,}  {mark}".rstrip())
+        print(f"  Per-prompt score: {record['wins']:,} wins, {record['ties']:,} ties, {record['losses']:,} losses")
+
+    cached = {model: stats['cached'] for model, stats in report['summary'].items() if stats['cached']}
+    if cached:
+        print("\n↻ Cached answers (their latencies are from when they were fetched): "
+              + ', '.join(f"{model}: {count:,}" for model, count in cached.items()))
+
+async def main(args, cache):
+    scorer = ResponseScorer(load_allowed_articles(args.system_prompt))
+    async with ChatClient(args.base_url, max_connections=args.concurrency * len(args.models),
+                          timeout=args.timeout, cache=cache) as client:
+        comparison = ModelComparison(client, args.models, scorer, args.concurrency, args.max_tokens,
+                                     args.temperature, stream=not args.no_stream)
+        output_path = Path(args.output) if args.output else comparison_path(args.models)
+        print(f"Comparing {', '.join(args.models)} at {client.base_url}, "
+              f"{args.concurrency} prompts in flight...")
+        started = time.perf_counter()
+        rows = await comparison.run(load_prompts(args.prompts, args.limit), output_path)
+        seconds = time.perf_counter() - started
+
+    if not rows:
+        print("❌ No prompts")
+        exit(1)
+    report = build_report(rows, args.models, scorer.allowed, args.resamples, args.confidence, args.seed)
+    report.update(prompts_file=args.prompts, temperature=args.temperature, seconds=round(seconds, 2),
+                  cache=dict(cache.stats, mode=cache.mode))
+    print_report(report)
+    print(cache.summary())
+    with open(output_path.with_suffix('.json'), 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"✓ Answers: {output_path}")
+    print(f"✓ Report:  {output_path.with_suffix('.json')}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare models on the same prompts with paired bootstrap tests")
+    parser.add_argument('models', nargs='+', help="Model ids; the first is the baseline")
+    parser.add_argument('--prompts',
+                        help="JSONL prompt file (default: the golden set, else the built-in test queries)")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help="Prompts in flight at once")
+    parser.add_argument('--limit', type=int, help="Only the first N prompts")
+    parser.add_argument('--max-tokens', type=int, default=500)
+    parser.add_argument('--temperature', type=float, default=COMPARE_TEMPERATURE)
+    parser.add_argument('--no-stream', action='store_true', help="Use non-streaming responses (no TTFT)")
+    parser.add_argument('--resamples', type=int, default=DEFAULT_RESAMPLES)
+    parser.add_argument('--confidence', type=float, default=CONFIDENCE)
+    parser.add_argument('--seed', type=int, default=0, help="Bootstrap seed")
+    parser.add_argument('--system-prompt', default=str(SYSTEM_PROMPT_FILE),
+                        help="File the allowed article URLs are read from")
+    parser.add_argument('--base-url', help="API base URL (default: LLAMA_API_URL)")
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--output',
+                        help="Answers JSONL (default: outputs/evaluations/comparisons/<time>-<models>.jsonl)")
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument('--no-cache', action='store_true', help="Don't read or write the response cache")
+    cache_group.add_argument('--refresh-cache', action='store_true', help="Re-query every prompt and update the cache")
+    cache_group.add_argument('--offline', action='store_true', help="Only use cached answers; never call the API")
+    args = parser.parse_args()
+
+    if len(args.models) < 2 or len(set(args.models)) != len(args.models):
+        print("❌ Give at least two different models; the first is the baseline")
+        exit(1)
+
+    mode = 'bypass' if args.no_cache else 'refresh' if args.refresh_cache else 'offline' if args.offline else 'use'
+    with ResponseCache(mode=mode) as cache:
+        try:
+            asyncio.run(main(args, cache))
+        except KeyboardInterrupt:
+            print("\nStopped.")
@@ -6,40 +6,52 @@ Removes ALL metadata and ensures only {"messages": [...]} format
 import json
 from pathlib import Path
 
-def create_clean_file(input_file, output_file):
-    """Create 100% clean file with no metadata."""
-
-    input_path = Path(input_file)
-    output_path = Path(output_file)
-
-    print(f"Creating clean file from: {input_file}")
-
-    count = 0
-    cleaned = 0
-
-    with open(input_path, 'r', encoding='utf-8') as infile, \
-         open(output_path, 'w', encoding='utf-8') as outfile:
-
+def iter_clean_examples(input_file, stats=None):
+    """
+    Yield clean {"messages": [...]} examples from a JSONL file.
+
+    Lets the upload stream examples directly instead of reading back a
+    written file. Pass a dict as `stats` to collect processed/cleaned/errors
+    counts.
+    """
+    stats = stats if stats is not None else {}
+    stats.update(processed=0, cleaned=0, errors=0)
+
+    with open(input_file, 'r', encoding='utf-8') as infile:
         for line_num, line in enumerate(infile, 1):
             try:
                 data = json.loads(line)
 
                 # Create ONLY messages key, removing everything else
                 clean_data = {"messages": data["messages"]}
+            except Exception as e:
+                print(f"❌ Error on line {line_num}: {e}")
+                stats['errors'] += 1
+                continue
 
-                # Count if we removed metadata
-                if 'metadata' in data:
-                    cleaned += 1
+            # Count if we removed metadata
+            if 'metadata' in data:
+                stats['cleaned'] += 1
 
-                # Write clean JSON
-                outfile.write(json.dumps(clean_data, ensure_ascii=False) + '\n')
-                count += 1
+            stats['processed'] += 1
+            yield clean_data
 
-            except Exception as e:
-                print(f"❌ Error on line {line_num}: {e}")
+def create_clean_file(input_file, output_file):
+    """Create 100% clean file with no metadata."""
+
+    output_path = Path(output_file)
+
+    print(f"Creating clean file from: {input_file}")
+
+    stats = {}
+    with open(output_path, 'w', encoding='utf-8') as outfile:
+        for clean_data in iter_clean_examples(input_file, stats):
+            # Write clean JSON
+            outfile.write(json.dumps(clean_data, ensure_ascii=False) + '\n')
 
+    count = stats['processed']
     print(f"\n✓ Processed {count} examples")
-    print(f"✓ Removed metadata from {cleaned} examples")
+    print(f"✓ Removed metadata from {stats['cleaned']} examples")
     print(f"✓ Output: {output_file}")
 
     return count
@@ -60,3 +72,4 @@ if __name__ == "__main__":
     print(f"\nFile: final_training_data.jsonl")
     print(f"Examples: {count:,}")
     print("\n📤 Upload this file to llama-api.com")
+    print("   (or skip the file: python fine_tune_llama_api_beta.py --stream ../data/training/llama_api_ready_v2.jsonl)")
@@ -0,0 +1,293 @@
+"""
+Diff two versions of a training JSONL file by example content.
+
+Every example is hashed in a canonical form: key order and whitespace are
+ignored, so reformatting doesn't count as a change. Examples are matched
+on the user side of the conversation:
+
+    added     - prompt only in the new file
+    removed   - prompt only in the old file
+    modified  - same prompt, different content (system prompt, response or other fields)
+
+Counts are also broken down per topic (embed_urls_in_responses.determine_topic).
+
+Each file is read once. Records are hash-partitioned into temporary files,
+and partitions are compared one at a time, so memory stays bounded for
+multi-million-line files.
+
+Usage:
+    python diff_training_data.py ../data/training/llama_api_ready.jsonl ../data/training/llama_api_ready_v2.jsonl
+    python diff_training_data.py old.jsonl new.jsonl --samples 5 --report outputs/diffs/v1_v2.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from embed_urls_in_responses import determine_topic
+
+DEFAULT_PARTITIONS = 64
+PARTITION_TARGET_BYTES = 64 * 1024 * 1024  # Aim for partitions of about this much input
+# Every partition of one side is open at once; stay well under the file descriptor limit (1024 by default)
+MAX_OPEN_PARTITIONS = 512
+DIFF_DIR = Path(__file__).parent.parent / 'outputs' / 'diffs'
+
+def normalize(value):
+    """Collapse whitespace in every string and leave structure alone."""
+    if isinstance(value, str):
+        return ' '.join(value.split())
+    if isinstance(value, list):
+        return [normalize(item) for item in value]
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items()}
+    return value
+
+def digest(value):
+    canonical = json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:20]
+
+def fingerprint_example(data):
+    """
+    Hash one example.
+
+    Returns:
+        Dict with the prompt key (user turns), hashes of the whole example, the
+        system prompt and the assistant turns, and the response topic
+    """
+    data = normalize(data)
+    messages = data.get('messages') or []
+    by_role = defaultdict(list)
+    for message in messages:
+        if isinstance(message, dict):
+            by_role[message.get('role')].append(message.get('content'))
+
+    response = ' '.join(content for content in by_role['assistant'] if isinstance(content, str))
+    return {
+        'prompt': digest(by_role['user']),
+        'full': digest(data),
+        'system': digest(by_role['system']),
+        'response': digest(by_role['assistant']),
+        'topic': determine_topic(response) if response else 'general'
+    }
+
+def max_partitions():
+    """MAX_OPEN_PARTITIONS, or half the process's open-file limit if that is lower."""
+    try:
+        import resource
+        soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    except (ImportError, ValueError, OSError):  # No resource module on Windows
+        return MAX_OPEN_PARTITIONS
+    if soft == resource.RLIM_INFINITY:
+        return MAX_OPEN_PARTITIONS
+    return max(1, min(MAX_OPEN_PARTITIONS, soft // 2))
+
+def choose_partitions(*paths):
+    """Enough partitions for about PARTITION_TARGET_BYTES each, up to max_partitions() (beyond that they grow)."""
+    total = sum(os.path.getsize(path) for path in paths)
+    return min(max_partitions(), max(DEFAULT_PARTITIONS, -(-total // PARTITION_TARGET_BYTES)))
+
+def partition_file(path, temp_dir, side, partitions):
+    """
+    Stream a JSONL file into hash partitions.
+
+    Each partition line is: prompt, full, system, response, topic, line number.
+
+    Returns:
+        (examples, invalid line numbers, Counter of topics)
+    """
+    handles = [open(Path(temp_dir) / f"{side}-{i:04d}.tsv", 'w', encoding='utf-8') for i in range(partitions)]
+    examples = 0
+    invalid = []
+    topics = Counter()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = fingerprint_example(json.loads(line))
+                except (json.JSONDecodeError, AttributeError, TypeError):
+                    invalid.append(line_number)
+                    continue
+                examples += 1
+                topics[record['topic']] += 1
+                bucket = int(record['prompt'][:8], 16) % partitions
+                handles[bucket].write(
+                    f"{record['prompt']}\t{record['full']}\t{record['system']}\t{record['response']}\t"
+                    f"{record['topic']}\t{line_number}\n"
+                )
+    finally:
+        for handle in handles:
+            handle.close()
+    return examples, invalid, topics
+
+def read_partition(path):
+    """Group a partition's records by prompt key."""
+    groups = defaultdict(list)
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            prompt, full, system, response, topic, line_number = line.rstrip('\n').split('\t')
+            groups[prompt].append((full, system, response, topic, int(line_number)))
+    return groups
+
+def change_kind(old, new):
+    """What differs between two examples with the same prompt."""
+    kinds = []
+    if old[1] != new[1]:
+        kinds.append('system')
+    if old[2] != new[2]:
+        kinds.append('response')
+    return '+'.join(kinds) or 'other'
+
+class DiffReport:
+    def __init__(self, samples=3):
+        self.samples = samples
+        self.counts = Counter()
+        self.topics = defaultdict(Counter)
+        self.modification_kinds = Counter()
+        self.examples = defaultdict(list)
+
+    def add(self, category, topic, sample):
+        self.counts[category] += 1
+        self.topics[topic][category] += 1
+        if len(self.examples[category]) < self.samples:
+            self.examples[category].append(sample)
+
+    def compare_group(self, old_records, new_records):
+        """
+        Compare all examples sharing one prompt key, as multisets: identical
+        content cancels out, leftover pairs are modifications, the rest are
+        adds or removes.
+        """
+        new_by_hash = defaultdict(list)
+        for record in new_records:
+            new_by_hash[record[0]].append(record)
+
+        leftover_old = []
+        for record in old_records:
+            if new_by_hash.get(record[0]):
+                new_by_hash[record[0]].pop()
+                self.counts['unchanged'] += 1
+                self.topics[record[3]]['unchanged'] += 1
+            else:
+                leftover_old.append(record)
+        leftover_new = [record for records in new_by_hash.values() for record in records]
+
+        for old, new in zip(leftover_old, leftover_new):
+            kind = change_kind(old, new)
+            self.modification_kinds[kind] += 1
+            if old[3] != new[3]:
+                self.topics[old[3]]['moved_out'] += 1
+                self.topics[new[3]]['moved_in'] += 1
+            self.add('modified', new[3], {'old_line': old[4], 'new_line': new[4], 'changed': kind})
+
+        pairs = min(len(leftover_old), len(leftover_new))
+        for old in leftover_old[pairs:]:
+            self.add('removed', old[3], {'old_line': old[4]})
+        for new in leftover_new[pairs:]:
+            self.add('added', new[3], {'new_line': new[4]})
+
+def diff_files(old_path, new_path, samples=3, partitions=None):
+    """
+    Diff two training files.
+
+    Returns:
+        Report dict (counts, per-topic deltas, modification kinds, sample line numbers)
+    """
+    partitions = min(partitions or choose_partitions(old_path, new_path), max_partitions())
+    report = DiffReport(samples)
+    started = time.time()
+
+    with tempfile.TemporaryDirectory(prefix='training-diff-') as temp_dir:
+        old_examples, old_invalid, old_topics = partition_file(old_path, temp_dir, 'old', partitions)
+        new_examples, new_invalid, new_topics = partition_file(new_path, temp_dir, 'new', partitions)
+
+        for i in range(partitions):
+            old_groups = read_partition(Path(temp_dir) / f"old-{i:04d}.tsv")
+            new_groups = read_partition(Path(temp_dir) / f"new-{i:04d}.tsv")
+            for prompt in old_groups.keys() | new_groups.keys():
+                report.compare_group(old_groups.get(prompt, []), new_groups.get(prompt, []))
+
+    topics = {}
+    for topic in sorted(set(old_topics) | set(new_topics)):
+        counts = report.topics[topic]
+        topics[topic] = {
+            'old': old_topics[topic],
+            'new': new_topics[topic],
+            'delta': new_topics[topic] - old_topics[topic],
+            'added': counts['added'],
+            'removed': counts['removed'],
+            'modified': counts['modified']
+        }
+
+    return {
+        'old_file': str(old_path),
+        'new_file': str(new_path),
+        'old_examples': old_examples,
+        'new_examples': new_examples,
+        'invalid_lines': {'old': old_invalid[:100], 'new': new_invalid[:100]},
+        'counts': {key: report.counts[key] for key in ('unchanged', 'added', 'removed', 'modified')},
+        'modification_kinds': dict(report.modification_kinds),
+        'topics': topics,
+        'samples': dict(report.examples),
+        'partitions': partitions,
+        'seconds': round(time.time() - started, 2)
+    }
+
+def print_report(report):
+    counts = report['counts']
+    print("=" * 70)
+    print(f"Training data diff")
+    print("=" * 70)
+    print(f"Old: {report['old_file']} ({report['old_examples']:,} examples)")
+    print(f"New: {report['new_file']} ({report['new_examples']:,} examples)")
+    for side in ('old', 'new'):
+        if report['invalid_lines'][side]:
+            print(f"⚠️  {len(report['invalid_lines'][side])} invalid line(s) in {side} file, "
+                  f"first: {report['invalid_lines'][side][:5]}")
+
+    print(f"\n  = {counts['unchanged']:>9,} unchanged")
+    print(f"  + {counts['added']:>9,} added")
+    print(f"  - {counts['removed']:>9,} removed")
+    print(f"  ~ {counts['modified']:>9,} modified", end='')
+    if report['modification_kinds']:
+        print(" (" + ', '.join(f"{kind}: {n:,}" for kind, n in sorted(report['modification_kinds'].items())) + ")")
+    else:
+        print()
+
+    print(f"\n{'Topic':<18} {'Old':>8} {'New':>8} {'Delta':>8} {'Added':>8} {'Removed':>8} {'Modified':>9}")
+    print("-" * 72)
+    for topic, row in sorted(report['topics'].items(), key=lambda item: -abs(item[1]['delta'])):
+        print(f"{topic:<18} {row['old']:>8,} {row['new']:>8,} {row['delta']:>+8,} {row['added']:>8,} "
+              f"{row['removed']:>8,} {row['modified']:>9,}")
+
+    for category, samples in report['samples'].items():
+        print(f"\nSample {category}: " + ', '.join(
+            '/'.join(f"{key.replace('_line', '')} L{value}" if key.endswith('_line') else str(value)
+                     for key, value in sample.items())
+            for sample in samples
+        ))
+    print(f"\n✓ Compared in {report['seconds']}s ({report['partitions']} partitions)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diff two training JSONL files by example content")
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--samples', type=int, default=3, help="Line numbers to show per category")
+    parser.add_argument('--partitions', type=int, help="Hash partitions (default: based on file size)")
+    parser.add_argument('--report', help="Also write the report as JSON (default: outputs/diffs/<old>__<new>.json)")
+    args = parser.parse_args()
+
+    report = diff_files(args.old, args.new, args.samples, args.partitions)
+    print_report(report)
+
+    report_path = Path(args.report) if args.report else DIFF_DIR / f"{Path(args.old).stem}__{Path(args.new).stem}.json"
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"✓ Report: {report_path}")
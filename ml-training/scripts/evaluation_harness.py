@@ -0,0 +1,312 @@
+"""
+Run an evaluation prompt set against a model with bounded concurrency.
+
+Prompts are read lazily from a JSONL file and sent by a fixed number of
+workers sharing one keep-alive connection pool. Each answer is written to
+outputs/evaluations/runs/ as soon as it arrives, along with its latency,
+time-to-first-token, inter-token gaps and tokens/sec. The run ends with
+p50/p95/p99 of those metrics and error rates by type.
+
+Answers are cached in outputs/response_cache.db (response_cache.py), so a
+re-run of the same prompts and settings is served from disk. Answers served
+from the cache are left out of the timing percentiles, because their timings
+come from the original run. --offline never calls the API;
+--refresh-cache re-fetches everything and --no-cache skips the cache.
+
+Prompt lines can be any of:
+    {"id": "q1", "query": "How do I create a catalog?", "topic": "catalog"}
+    {"prompt": "How do I create a catalog?"}
+    {"messages": [{"role": "system", ...}, {"role": "user", ...}, {"role": "assistant", ...}]}
+Chat examples (e.g. training data) are sent without their final assistant turn.
+
+Usage:
+    python evaluation_harness.py --prompts ../data/eval/prompts.jsonl --model <model> --concurrency 32
+    python evaluation_harness.py --model <model>              # the golden set, else the built-in test queries
+    python evaluation_harness.py --prompts prompts.jsonl --model <model> --offline   # cached answers only
+
+    # Offline against the mock server
+    python mock_chat_server.py &
+    python evaluation_harness.py --prompts prompts.jsonl --model mock --base-url http://127.0.0.1:8768
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import time
+from collections import Counter
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from build_golden_set import GOLDEN_SET_FILE
+from chat_client import ChatClient
+from response_cache import ResponseCache
+from test_fine_tuned_model import SYSTEM_PROMPT, TEST_QUERIES
+
+load_dotenv(Path(__file__).parent.parent / '.env')
+
+RUN_DIR = Path(__file__).parent.parent / 'outputs' / 'evaluations' / 'runs'
+DEFAULT_CONCURRENCY = 32
+PERCENTILES = (50, 95, 99)
+PROGRESS_EVERY = 100
+
+def to_messages(data):
+    """Chat messages for one prompt line (see module docstring for accepted shapes)."""
+    if isinstance(data, str):
+        data = {'query': data}
+    if data.get('messages'):
+        messages = list(data['messages'])
+        while messages and messages[-1].get('role') == 'assistant':
+            messages.pop()
+        return messages
+    query = data.get('query') or data.get('prompt')
+    if not query:
+        raise ValueError("Prompt line has no query, prompt or messages")
+    return [{'role': 'system', 'content': data.get('system', SYSTEM_PROMPT)}, {'role': 'user', 'content': query}]
+
+def load_prompts(path=None, limit=None):
+    """
+    Yield prompt dicts (id, messages, topic) from a JSONL file. Without one, the
+    golden set (build_golden_set.py) is used if it has been built, else the
+    built-in test queries. Bad lines are reported and skipped.
+    """
+    path = path or (GOLDEN_SET_FILE if GOLDEN_SET_FILE.exists() else None)
+    lines = read_lines(path) if path else ({'query': query} for query in TEST_QUERIES)
+    count = 0
+    for number, line in enumerate(lines, 1):
+        if limit and count >= limit:
+            return
+        try:
+            data = json.loads(line) if isinstance(line, str) else line
+            messages = to_messages(data)
+        except (ValueError, AttributeError) as e:
+            print(f"  ⚠️  Skipping prompt {number}: {e}")
+            continue
+        count += 1
+        data = data if isinstance(data, dict) else {}
+        yield {'id': data.get('id', number), 'messages': messages, 'topic': data.get('topic')}
+
+def read_lines(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield line
+
+def percentile(sorted_values, p):
+    """Linear-interpolated percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = (len(sorted_values) - 1) * p / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+def distribution(values):
+    """p50/p95/p99, mean and max of a list of numbers (None entries ignored)."""
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return None
+    stats = {f"p{p}": round(percentile(values, p), 4) for p in PERCENTILES}
+    stats['mean'] = round(sum(values) / len(values), 4)
+    stats['max'] = round(values[-1], 4)
+    stats['count'] = len(values)
+    return stats
+
+class RunStats:
+    """Metrics kept in memory for the summary; answers themselves only go to the output file."""
+
+    def __init__(self):
+        self.latency = []
+        self.ttft = []
+        self.itl = []
+        self.tokens_per_second = []
+        self.errors = Counter()
+        self.requests = 0
+        self.cached = 0
+        self.completion_tokens = 0
+
+    def add(self, result):
+        self.requests += 1
+        if result['error']:
+            self.errors[result['error_type']] += 1
+            return
+        self.completion_tokens += result['completion_tokens'] or 0
+        if result.get('cached'):
+            self.cached += 1
+            return
+        self.latency.append(result['latency'])
+        self.ttft.append(result['ttft'])
+        self.itl.append(result['itl_mean'])
+        self.tokens_per_second.append(result['tokens_per_second'])
+
+    def summary(self, seconds):
+        errors = sum(self.errors.values())
+        return {
+            'requests': self.requests,
+            'succeeded': self.requests - errors,
+            'cached': self.cached,
+            'errors': errors,
+            'error_rate': round(errors / self.requests, 4) if self.requests else 0,
+            'errors_by_type': dict(self.errors.most_common()),
+            'latency': distribution(self.latency),
+            'ttft': distribution(self.ttft),
+            'inter_token': distribution(self.itl),
+            'tokens_per_second': distribution(self.tokens_per_second),
+            'completion_tokens': self.completion_tokens,
+            'seconds': round(seconds, 2),
+            'requests_per_second': round(self.requests / seconds, 2) if seconds else None
+        }
+
+class EvaluationHarness:
+    def __init__(self, client, model, concurrency=DEFAULT_CONCURRENCY, max_tokens=500, temperature=0.7, stream=True):
+        """
+        Args:
+            client: ChatClient (its connection pool should allow `concurrency` connections)
+            model: Model to evaluate
+            concurrency: Requests in flight at once
+            max_tokens, temperature: Sampling settings
+            stream: Stream answers, which is what makes time-to-first-token measurable
+        """
+        self.client = client
+        self.model = model
+        self.concurrency = concurrency
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.stream = stream
+
+    async def evaluate(self, prompt):
+        result = await self.client.complete(self.model, prompt['messages'], self.max_tokens, self.temperature,
+                                            stream=self.stream)
+        query = next((m['content'] for m in reversed(prompt['messages']) if m.get('role') == 'user'), None)
+        return dict(result, id=prompt['id'], topic=prompt.get('topic'), query=query)
+
+    async def run(self, prompts, output_path=None):
+        """
+        Evaluate every prompt. `prompts` may be any iterable, including a lazy
+        generator over a file with millions of lines.
+
+        Returns:
+            Summary dict (see RunStats.summary)
+        """
+        stats = RunStats()
+        prompts = iter(prompts)
+        output = open(output_path, 'w', encoding='utf-8') if output_path else None
+        started = time.perf_counter()
+
+        async def worker():
+            # Workers share one iterator; next() never yields to the event loop, so no prompt is sent twice
+            for prompt in prompts:
+                result = await self.evaluate(prompt)
+                stats.add(result)
+                if output:
+                    output.write(json.dumps(result, ensure_ascii=False) + '\n')
+                if stats.requests % PROGRESS_EVERY == 0:
+                    elapsed = time.perf_counter() - started
+                    print(f"  {stats.requests:,} done, {sum(stats.errors.values())} errors, "
+                          f"{stats.requests / elapsed:.1f} req/s")
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            if output:
+                output.close()
+
+        summary = stats.summary(time.perf_counter() - started)
+        summary.update(model=self.model, concurrency=self.concurrency, stream=self.stream)
+        return summary
+
+def reserve_path(directory, name, suffix='.jsonl'):
+    """
+    directory/<timestamp>-<name><suffix>, with a -2, -3... suffix if a run started in
+    the same second already took that name. The file is created empty to claim it.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    stem = f"{time.strftime('%Y%m%d-%H%M%S')}-{name}"
+    path = directory / f"{stem}{suffix}"
+    number = 1
+    while True:
+        try:
+            path.open('x').close()  # Reserve the name, so concurrent runs can't both pick it
+            return path
+        except FileExistsError:
+            number += 1
+            path = directory / f"{stem}-{number}{suffix}"
+
+def run_path(model, run_dir=RUN_DIR):
+    """outputs/evaluations/runs/<timestamp>-<model>.jsonl (see reserve_path)"""
+    return reserve_path(run_dir, re.sub(r'[^A-Za-z0-9._-]+', '_', model)[-80:])
+
+def print_summary(summary):
+    print("\n" + "=" * 70)
+    print(f"Evaluation run: {summary['model']}")
+    print("=" * 70)
+    print(f"Requests: {summary['requests']:,} in {summary['seconds']}s "
+          f"({summary['requests_per_second']} req/s, concurrency {summary['concurrency']})")
+    print(f"Errors:   {summary['errors']:,} ({summary['error_rate']:.2%})"
+          + (" - " + ', '.join(f"{kind}: {n}" for kind, n in summary['errors_by_type'].items())
+             if summary['errors_by_type'] else ""))
+
+    print(f"\n{'':<18}" + ''.join(f"{f'p{p}':>10}" for p in PERCENTILES) + f"{'mean':>10}{'max':>10}")
+    print("-" * 68)
+    for key, label in (('latency', 'Latency (s)'), ('ttft', 'TTFT (s)'), ('inter_token', 'Inter-token (s)'),
+                       ('tokens_per_second', 'Tokens/sec')):
+        stats = summary[key]
+        if not stats:
+            print(f"{label:<18}{'-':>10}")
+            continue
+        print(f"{label:<18}" + ''.join(f"{stats[f'p{p}']:>10.3f}" for p in PERCENTILES)
+              + f"{stats['mean']:>10.3f}{stats['max']:>10.3f}")
+    if summary['cached']:
+        print(f"\n↻ {summary['cached']:,} answer(s) came from the cache and are not in the timings")
+    print(f"\nCompletion tokens: {summary['completion_tokens']:,}")
+
+async def main(args, cache):
+    async with ChatClient(args.base_url, max_connections=args.concurrency, timeout=args.timeout,
+                          cache=cache) as client:
+        harness = EvaluationHarness(client, args.model, args.concurrency, args.max_tokens, args.temperature,
+                                    stream=not args.no_stream)
+        output_path = Path(args.output) if args.output else run_path(args.model)
+        print(f"Evaluating {args.model} at {client.base_url} with {args.concurrency} concurrent requests...")
+        summary = await harness.run(load_prompts(args.prompts, args.limit), output_path)
+        summary['prompts'] = args.prompts
+        summary['pool'] = client.http.stats
+        summary['cache'] = dict(cache.stats, mode=cache.mode)
+
+    print_summary(summary)
+    print(cache.summary())
+    with open(output_path.with_suffix('.summary.json'), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    print(f"✓ Answers: {output_path}")
+    print(f"✓ Summary: {output_path.with_suffix('.summary.json')}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate a model on a prompt set with bounded concurrency")
+    parser.add_argument('--prompts',
+                        help="JSONL prompt file (default: the golden set, else the built-in test queries)")
+    parser.add_argument('--model', default=os.getenv('FINE_TUNED_MODEL_ID'))
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--limit', type=int, help="Only the first N prompts")
+    parser.add_argument('--max-tokens', type=int, default=500)
+    parser.add_argument('--temperature', type=float, default=0.7)
+    parser.add_argument('--no-stream', action='store_true', help="Use non-streaming responses (no TTFT)")
+    parser.add_argument('--base-url', help="API base URL (default: LLAMA_API_URL)")
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--output', help="Answers JSONL (default: outputs/evaluations/runs/<time>-<model>.jsonl)")
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument('--no-cache', action='store_true', help="Don't read or write the response cache")
+    cache_group.add_argument('--refresh-cache', action='store_true', help="Re-query every prompt and update the cache")
+    cache_group.add_argument('--offline', action='store_true', help="Only use cached answers; never call the API")
+    args = parser.parse_args()
+
+    if not args.model:
+        print("❌ No model given (--model or FINE_TUNED_MODEL_ID)")
+        exit(1)
+
+    mode = 'bypass' if args.no_cache else 'refresh' if args.refresh_cache else 'offline' if args.offline else 'use'
+    with ResponseCache(mode=mode) as cache:
+        try:
+            asyncio.run(main(args, cache))
+        except KeyboardInterrupt:
+            print("\nStopped.")
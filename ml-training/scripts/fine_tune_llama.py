@@ -6,9 +6,10 @@ Uses Llama Stack Client API for fine-tuning
 import os
 import json
 from dotenv import load_dotenv
-from llama_stack_client import LlamaStackClient
 from pathlib import Path
 
+from fine_tuning_client import FineTuningClient, LlamaStackProvider, validate_training_file
+
 # Load environment variables from parent directory
 load_dotenv(Path(__file__).parent.parent / '.env')
 
@@ -26,10 +27,7 @@ class LlamaFineTuner:
             )
 
         # Initialize client
-        self.client = LlamaStackClient(
-            base_url=self.base_url,
-            api_key=self.api_key
-        )
+        self.client = FineTuningClient(LlamaStackProvider(self.api_key, self.base_url))
 
         # Load configuration
         self.model_name = os.getenv('MODEL_NAME', 'llama-3.1-8b')
@@ -44,44 +42,13 @@ class LlamaFineTuner:
 
     def validate_training_data(self):
         """Validate the training data file exists and has correct format."""
-        training_path = Path(self.training_file)
-
-        if not training_path.exists():
-            raise FileNotFoundError(f"Training file not found: {self.training_file}")
-
-        # Check first few lines for format
-        print(f"Validating training data: {self.training_file}")
-
-        with open(training_path, 'r', encoding='utf-8') as f:
-            for i, line in enumerate(f):
-                if i >= 3:  # Check first 3 lines
-                    break
-                try:
-                    data = json.loads(line)
-                    if 'messages' not in data:
-                        raise ValueError(f"Line {i+1}: Missing 'messages' field")
-                except json.JSONDecodeError as e:
-                    raise ValueError(f"Line {i+1}: Invalid JSON - {e}")
-
-        # Count total examples
-        with open(training_path, 'r', encoding='utf-8') as f:
-            num_examples = sum(1 for _ in f)
-
-        print(f"✓ Validation passed!")
-        print(f"✓ Total examples: {num_examples}")
-        return num_examples
+        return validate_training_file(self.training_file)
 
     def upload_training_data(self):
         """Upload training data to Llama Stack."""
         print(f"\nUploading training data...")
 
-        with open(self.training_file, 'rb') as f:
-            response = self.client.files.create(
-                file=f,
-                purpose='fine-tune'
-            )
-
-        file_id = response.id
+        file_id = self.client.upload(self.training_file)
         print(f"✓ File uploaded successfully!")
         print(f"  File ID: {file_id}")
         return file_id
@@ -95,11 +62,11 @@ class LlamaFineTuner:
         print(f"  Batch size: {self.batch_size}")
         print(f"  Epochs: {self.num_epochs}")
 
-        response = self.client.fine_tuning.jobs.create(
-            training_file=file_id,
-            model=self.model_name,
-            suffix=self.output_model_name,
-            hyperparameters={
+        job = self.client.create_job(
+            file_id,
+            self.model_name,
+            self.output_model_name,
+            {
                 "learning_rate": self.learning_rate,
                 "batch_size": self.batch_size,
                 "n_epochs": self.num_epochs,
@@ -107,23 +74,26 @@ class LlamaFineTuner:
             }
         )
 
-        job_id = response.id
-        print(f"✓ Fine-tuning job created!")
+        job_id = job['id']
+        if job.get('reused'):
+            print(f"✓ An identical job already exists (same data and hyperparameters), not starting another")
+        else:
+            print(f"✓ Fine-tuning job created!")
         print(f"  Job ID: {job_id}")
-        print(f"  Status: {response.status}")
+        print(f"  Status: {job['status']}")
         return job_id
 
     def check_job_status(self, job_id):
         """Check the status of a fine-tuning job."""
-        response = self.client.fine_tuning.jobs.retrieve(job_id)
+        job = self.client.get_job(job_id)
 
-        print(f"\nJob Status: {response.status}")
-        if hasattr(response, 'trained_tokens'):
-            print(f"Trained tokens: {response.trained_tokens}")
-        if hasattr(response, 'fine_tuned_model'):
-            print(f"Fine-tuned model: {response.fine_tuned_model}")
+        print(f"\nJob Status: {job['status']}")
+        if job['trained_tokens'] is not None:
+            print(f"Trained tokens: {job['trained_tokens']}")
+        if job['fine_tuned_model']:
+            print(f"Fine-tuned model: {job['fine_tuned_model']}")
 
-        return response
+        return job
 
     def run(self):
         """Run the complete fine-tuning pipeline."""
@@ -1,14 +1,16 @@
 """
 Fine-tune Llama model using llama-api.com
-Uses direct HTTP requests to llama-api.com API
+Uploads and job creation go through FineTuningClient (pooled session, retries, reuse)
 """
 
 import os
 import json
-import requests
 from dotenv import load_dotenv
 from pathlib import Path
 
+from fine_tuning_client import FineTuningClient, FineTuningProviderError, LlamaAPIProvider, validate_training_file
+from multipart_upload import print_progress
+
 # Load environment variables from parent directory
 load_dotenv(Path(__file__).parent.parent / '.env')
 
@@ -16,7 +18,7 @@ class LlamaAPIFineTuner:
     def __init__(self):
         """Initialize the Llama API fine-tuner."""
         self.api_key = os.getenv('LLAMA_API_KEY')
-        self.base_url = "https://api.llama-api.com"
+        self.base_url = os.getenv('LLAMA_API_URL', 'https://api.llama-api.com')
 
         if not self.api_key or self.api_key == 'your_api_key_here':
             raise ValueError(
@@ -34,88 +36,69 @@ class LlamaAPIFineTuner:
             "Content-Type": "application/json"
         }
 
+        # Pooled, retrying client shared with the other fine-tuning tools
+        self.client = FineTuningClient(LlamaAPIProvider(self.api_key, self.base_url))
+        self.session = self.client.provider.session
+
     def validate_training_data(self):
         """Validate the training data file."""
-        training_path = Path(self.training_file)
-
-        if not training_path.exists():
-            raise FileNotFoundError(f"Training file not found: {self.training_file}")
-
-        print(f"Validating training data: {self.training_file}")
-
-        # Count and validate format
-        with open(training_path, 'r', encoding='utf-8') as f:
-            for i, line in enumerate(f):
-                if i >= 3:
-                    break
-                try:
-                    data = json.loads(line)
-                    if 'messages' not in data:
-                        raise ValueError(f"Line {i+1}: Missing 'messages' field")
-                except json.JSONDecodeError as e:
-                    raise ValueError(f"Line {i+1}: Invalid JSON - {e}")
-
-        with open(training_path, 'r', encoding='utf-8') as f:
-            num_examples = sum(1 for _ in f)
-
-        print(f"✓ Validation passed!")
-        print(f"✓ Total examples: {num_examples}")
-        return num_examples
-
-    def create_fine_tuning_job(self):
-        """Create a fine-tuning job using llama-api.com API."""
+        return validate_training_file(self.training_file)
+
+    def upload_training_data(self, progress_callback=print_progress):
+        """
+        Upload the training file; large files go up in resumable, parallel parts.
+
+        An interrupted multipart upload resumes from its manifest in
+        outputs/uploads/ the next time this runs.
+        """
+        print(f"\nUploading training data...")
+
+        try:
+            file_id = self.client.upload(self.training_file, progress_callback)
+        except FineTuningProviderError as e:
+            print(f"❌ Upload failed: {str(e)}")
+            return None
+
+        print(f"✓ File uploaded successfully!")
+        print(f"  File ID: {file_id}")
+        return file_id
+
+    def create_fine_tuning_job(self, file_id=None):
+        """
+        Create a fine-tuning job on llama-api.com, uploading the training file first
+        unless a file_id is given. Identical earlier jobs are reused.
+        """
+        file_id = file_id or self.upload_training_data()
+        if not file_id:
+            return None
+
         print(f"\nCreating fine-tuning job...")
         print(f"  Base model: {self.model_name}")
         print(f"  Output model: {self.output_model_name}")
 
-        # Read training data
-        training_data = []
-        with open(self.training_file, 'r', encoding='utf-8') as f:
-            for line in f:
-                training_data.append(json.loads(line))
-
-        # Prepare request payload
-        # NOTE: This is a guess at the API structure - llama-api.com may have different endpoints
-        payload = {
-            "model": self.model_name,
-            "training_data": training_data,
-            "model_suffix": self.output_model_name,
-            "hyperparameters": {
-                "n_epochs": int(os.getenv('NUM_EPOCHS', '3')),
-                "batch_size": int(os.getenv('BATCH_SIZE', '4')),
-                "learning_rate_multiplier": float(os.getenv('LEARNING_RATE', '2e-5'))
-            }
+        hyperparameters = {
+            "n_epochs": int(os.getenv('NUM_EPOCHS', '3')),
+            "batch_size": int(os.getenv('BATCH_SIZE', '4')),
+            "learning_rate_multiplier": float(os.getenv('LEARNING_RATE', '2e-5'))
         }
 
-        # Try fine-tuning endpoint
         try:
-            response = requests.post(
-                f"{self.base_url}/fine-tune",
-                headers=self.headers,
-                json=payload,
-                timeout=60
-            )
-
-            if response.status_code == 200:
-                result = response.json()
-                print(f"✓ Fine-tuning job created successfully!")
-                print(f"  Response: {json.dumps(result, indent=2)}")
-                return result
-            else:
-                print(f"❌ Error {response.status_code}: {response.text}")
-                return None
-
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Request failed: {str(e)}")
+            result = self.client.create_job(file_id, self.model_name, self.output_model_name, hyperparameters)
+        except FineTuningProviderError as e:
+            print(f"❌ {str(e)}")
             return None
 
+        print(f"✓ Fine-tuning job {'reused' if result.get('reused') else 'created successfully'}!")
+        print(f"  Response: {json.dumps(result, indent=2)}")
+        return result
+
     def check_api_info(self):
         """Check what endpoints are available."""
         print("\nChecking llama-api.com API...")
 
         # Try to get API info
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/",
                 headers=self.headers,
                 timeout=10
@@ -128,7 +111,7 @@ class LlamaAPIFineTuner:
 
         # Try models endpoint
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/models",
                 headers=self.headers,
                 timeout=10
@@ -4,10 +4,17 @@ For beta users with fine-tuning access
 """
 
 import os
+import sys
 import json
-import requests
 from dotenv import load_dotenv
 from pathlib import Path
+
+from fine_tuning_client import (FineTuningClient, FineTuningProviderError, LlamaAPIProvider,
+                                default_hyperparameters, validate_training_file)
+from create_final_clean_file import iter_clean_examples
+from multipart_upload import print_progress
+from shard_training_data import MAX_UPLOAD_FILE_BYTES, ShardError, print_manifest, shard_file, upload_shards
+from streaming_upload import print_stream_progress
 import time
 
 # Load environment variables from parent directory
@@ -17,7 +24,7 @@ class LlamaAPIFineTuner:
     def __init__(self):
         """Initialize the Llama API fine-tuner."""
         self.api_key = os.getenv('LLAMA_API_KEY')
-        self.base_url = "https://api.llama-api.com"
+        self.base_url = os.getenv('LLAMA_API_URL', 'https://api.llama-api.com')
 
         if not self.api_key or self.api_key == 'your_api_key_here':
             raise ValueError(
@@ -29,76 +36,76 @@ class LlamaAPIFineTuner:
         self.model_name = os.getenv('MODEL_NAME', 'llama3.1-8b')
         self.output_model_name = os.getenv('OUTPUT_MODEL_NAME', 'whatsapp-business-assistant-v1')
 
-        # Headers for API requests
-        self.headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
+        # Pooled, retrying client shared with the other fine-tuning tools
+        self.client = FineTuningClient(LlamaAPIProvider(self.api_key, self.base_url))
 
     def validate_training_data(self):
         """Validate the training data file."""
-        training_path = Path(self.training_file)
-
-        if not training_path.exists():
-            raise FileNotFoundError(f"Training file not found: {self.training_file}")
-
-        print(f"Validating training data: {self.training_file}")
+        return validate_training_file(self.training_file)
 
-        # Count and validate format
-        with open(training_path, 'r', encoding='utf-8') as f:
-            for i, line in enumerate(f):
-                if i >= 3:
-                    break
-                try:
-                    data = json.loads(line)
-                    if 'messages' not in data:
-                        raise ValueError(f"Line {i+1}: Missing 'messages' field")
-                except json.JSONDecodeError as e:
-                    raise ValueError(f"Line {i+1}: Invalid JSON - {e}")
+    def upload_training_data(self, progress_callback=print_progress):
+        """
+        Upload the training file; large files go up in resumable, parallel parts.
 
-        with open(training_path, 'r', encoding='utf-8') as f:
-            num_examples = sum(1 for _ in f)
+        An interrupted multipart upload resumes from its manifest in
+        outputs/uploads/ the next time this runs.
+        """
+        try:
+            file_id = self.client.upload(self.training_file, progress_callback)
+        except FineTuningProviderError as e:
+            print(f"❌ Upload failed: {str(e)}")
+            return None
 
-        print(f"✓ Validation passed!")
-        print(f"✓ Total examples: {num_examples}")
-        return num_examples
+        print(f"✓ File uploaded successfully!")
+        print(f"  File ID: {file_id}")
+        return file_id
 
     def upload_training_file(self):
-        """Upload training file to llama-api.com."""
+        """
+        Upload training file to llama-api.com.
+
+        Files over the per-file limit (MAX_UPLOAD_FILE_BYTES) are split into
+        shards first; the list of shard file ids is returned instead.
+        """
         print(f"\nUploading training file...")
+        if Path(self.training_file).stat().st_size > MAX_UPLOAD_FILE_BYTES:
+            return self.upload_sharded()
+        return self.upload_training_data()
+
+    def upload_sharded(self):
+        """Shard the training file and upload the shards in parallel."""
+        print(f"  File exceeds {MAX_UPLOAD_FILE_BYTES / 1e6:.0f} MB upload limit, sharding...")
+        try:
+            manifest, manifest_path = shard_file(self.training_file)
+            print_manifest(manifest)
+            file_ids = upload_shards(self.client, manifest_path)
+        except (ShardError, FineTuningProviderError) as e:
+            print(f"❌ Upload failed: {str(e)}")
+            return None
+
+        print(f"✓ {len(file_ids)} shards uploaded (manifest: {manifest_path})")
+        return file_ids
+
+    def upload_training_stream(self, examples, progress_callback=print_stream_progress):
+        """
+        Stream examples from a generator straight into the upload.
+
+        Validation and hashing happen inline, so no training file is written
+        or read back. Returns (file_id, num_examples).
+        """
+        print(f"\nStreaming training data...")
+        try:
+            file_id, stats = self.client.upload_examples(examples, progress_callback=progress_callback)
+        except (FineTuningProviderError, ValueError) as e:
+            print(f"\n❌ Upload failed: {str(e)}")
+            return None, 0
 
-        training_path = Path(self.training_file)
-
-        # Try file upload endpoint
-        with open(training_path, 'rb') as f:
-            files = {
-                'file': (training_path.name, f, 'application/jsonl')
-            }
-            headers_upload = {
-                "Authorization": f"Bearer {self.api_key}"
-            }
-
-            try:
-                response = requests.post(
-                    f"{self.base_url}/files",
-                    headers=headers_upload,
-                    files=files,
-                    timeout=300
-                )
-
-                if response.status_code in [200, 201]:
-                    result = response.json()
-                    file_id = result.get('id') or result.get('file_id')
-                    print(f"✓ File uploaded successfully!")
-                    print(f"  File ID: {file_id}")
-                    return file_id
-                else:
-                    print(f"❌ Upload failed ({response.status_code}): {response.text}")
-                    return None
-
-            except requests.exceptions.RequestException as e:
-                print(f"❌ Upload request failed: {str(e)}")
-                return None
+        print(f"✓ File uploaded successfully!")
+        print(f"  File ID: {file_id}")
+        print(f"  Examples: {stats['examples']:,} ({stats['bytes'] / 1e6:.1f} MB, "
+              f"{stats['wire_bytes'] / 1e6:.1f} MB sent)")
+        print(f"  SHA-256: {stats['sha256']}")
+        return file_id, stats['examples']
 
     def create_fine_tune_job(self, file_id):
         """Create fine-tuning job."""
@@ -107,43 +114,26 @@ class LlamaAPIFineTuner:
         print(f"  File ID: {file_id}")
         print(f"  Model suffix: {self.output_model_name}")
 
-        payload = {
-            "training_file": file_id,
-            "model": self.model_name,
-            "suffix": self.output_model_name,
-            "hyperparameters": {
-                "n_epochs": int(os.getenv('NUM_EPOCHS', '3')),
-                "batch_size": int(os.getenv('BATCH_SIZE', '4')),
-                "learning_rate": float(os.getenv('LEARNING_RATE', '2e-5'))
-            }
-        }
-
         try:
-            response = requests.post(
-                f"{self.base_url}/fine-tuning/jobs",
-                headers=self.headers,
-                json=payload,
-                timeout=60
+            result = self.client.create_job(
+                file_id, self.model_name, self.output_model_name, default_hyperparameters()
             )
+        except FineTuningProviderError as e:
+            print(f"❌ Job creation failed: {str(e)}")
+            return None
 
-            if response.status_code in [200, 201]:
-                result = response.json()
-                job_id = result.get('id') or result.get('job_id')
-                print(f"✓ Fine-tuning job created!")
-                print(f"  Job ID: {job_id}")
-                print(f"  Status: {result.get('status', 'pending')}")
-
-                # Save job info
-                self.save_job_info(job_id, file_id, result)
+        job_id = result['id']
+        if result.get('reused'):
+            print(f"✓ An identical job already exists (same data and hyperparameters), not starting another")
+        else:
+            print(f"✓ Fine-tuning job created!")
+        print(f"  Job ID: {job_id}")
+        print(f"  Status: {result['status']}")
 
-                return job_id
-            else:
-                print(f"❌ Job creation failed ({response.status_code}): {response.text}")
-                return None
+        # Save job info
+        self.save_job_info(job_id, file_id, result)
 
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Request failed: {str(e)}")
-            return None
+        return job_id
 
     def save_job_info(self, job_id, file_id, response_data):
         """Save job information to file."""
@@ -167,33 +157,33 @@ class LlamaAPIFineTuner:
     def check_job_status(self, job_id):
         """Check fine-tuning job status."""
         try:
-            response = requests.get(
-                f"{self.base_url}/fine-tuning/jobs/{job_id}",
-                headers=self.headers,
-                timeout=30
-            )
-
-            if response.status_code == 200:
-                return response.json()
-            else:
-                print(f"Status check failed: {response.text}")
-                return None
-        except Exception as e:
+            return self.client.get_job(job_id)
+        except FineTuningProviderError as e:
             print(f"Error checking status: {e}")
             return None
 
-    def run(self):
-        """Run the fine-tuning process."""
+    def run(self, examples=None):
+        """
+        Run the fine-tuning process.
+
+        Args:
+            examples: Optional generator of training examples to stream
+                      instead of reading self.training_file
+        """
         print("=" * 70)
         print("WhatsApp Business Assistant - llama-api.com Fine-Tuning")
         print("=" * 70)
 
         try:
-            # Step 1: Validate training data
-            num_examples = self.validate_training_data()
+            if examples is not None:
+                # Steps 1+2: Validate and upload in one pass
+                file_id, num_examples = self.upload_training_stream(examples)
+            else:
+                # Step 1: Validate training data
+                num_examples = self.validate_training_data()
 
-            # Step 2: Upload training file
-            file_id = self.upload_training_file()
+                # Step 2: Upload training file
+                file_id = self.upload_training_file()
 
             if not file_id:
                 print("\n❌ File upload failed. Please check:")
@@ -220,6 +210,8 @@ class LlamaAPIFineTuner:
             print(f"\nTo check status, run:")
             print(f"  cd scripts && source ../venv/bin/activate")
             print(f"  python check_llama_api_status.py {job_id}")
+            print(f"\nOr watch all your jobs at once:")
+            print(f"  python job_monitor.py")
             print("\nThe fine-tuning process will take 2-6 hours.")
             print("You'll be notified when it's complete.")
 
@@ -235,4 +227,8 @@ if __name__ == "__main__":
         exit(1)
 
     tuner = LlamaAPIFineTuner()
-    tuner.run()
+    if len(sys.argv) > 2 and sys.argv[1] == '--stream':
+        # Clean and upload in one pass, without writing final_training_data.jsonl
+        tuner.run(iter_clean_examples(sys.argv[2]))
+    else:
+        tuner.run()
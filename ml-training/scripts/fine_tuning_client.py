@@ -0,0 +1,710 @@
+"""
+Provider-agnostic fine-tuning client.
+
+One interface for validating training data, uploading files (or streaming
+examples straight from a generator), creating jobs and checking their status,
+with thin adapters per backend:
+
+    LlamaAPIProvider    - llama-api.com over a pooled, retrying HTTP session
+    LlamaStackProvider  - llama-stack-client
+    MockProvider        - in-process simulation of upload, queueing and training
+                          latency, for offline tests and benchmarks
+
+FineTuningClient adds retries and per-call timing on top of any provider, and
+skips uploads and jobs that upload_registry.py has already seen.
+
+Usage:
+    python fine_tuning_client.py --provider mock ../data/training/training_data_complete.jsonl
+    python fine_tuning_client.py --provider mock --time-scale 0.01 --jobs 5 <file>
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from http_cassette import CassetteAdapter, active_cassette
+from job_registry import TERMINAL_STATUSES, JobRegistry
+from multipart_upload import MultipartUploader, UploadError, multipart_threshold
+from streaming_upload import ByteCounter, ExampleStream, gzip_chunks, multipart_body
+from upload_registry import UploadRegistry, fingerprint_file, job_fingerprint
+from usage_accounting import active_usage_log
+
+load_dotenv(Path(__file__).parent.parent / '.env')
+
+DEFAULT_POOL_SIZE = 10
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+# Calls that are safe to repeat. Anything else (uploads, job creation) may have reached the
+# backend before a timeout or 5xx, so it is only retried on 429, which the API rejects unprocessed.
+IDEMPOTENT_OPERATIONS = {'get_job', 'file_exists'}
+
+class FineTuningProviderError(Exception):
+    """A provider call failed. `retryable` marks throttling, 5xx and connection errors."""
+
+    def __init__(self, message, status_code=None, retryable=False):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable
+
+def validate_training_file(training_file, check_lines=3):
+    """
+    Validate a training JSONL file and count its examples.
+
+    The first `check_lines` lines are parsed and must have a 'messages' field;
+    the rest are only counted.
+
+    Returns:
+        Number of examples
+    """
+    training_path = Path(training_file)
+
+    if not training_path.exists():
+        raise FileNotFoundError(f"Training file not found: {training_file}")
+
+    print(f"Validating training data: {training_file}")
+
+    num_examples = 0
+    with open(training_path, 'r', encoding='utf-8') as f:
+        for i, line in enumerate(f):
+            num_examples += 1
+            if i >= check_lines:
+                continue
+            try:
+                data = json.loads(line)
+                if 'messages' not in data:
+                    raise ValueError(f"Line {i+1}: Missing 'messages' field")
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Line {i+1}: Invalid JSON - {e}")
+
+    print(f"✓ Validation passed!")
+    print(f"✓ Total examples: {num_examples}")
+    return num_examples
+
+def create_session(api_key=None, pool_size=DEFAULT_POOL_SIZE, retries=3):
+    """
+    Build a pooled requests session shared by the llama-api.com tooling.
+
+    Idempotent requests (GET, HEAD) are retried with backoff on throttling and
+    5xx responses; POSTs are never retried at this layer. With HTTP_CASSETTE
+    set, traffic is recorded to or replayed from a cassette (http_cassette.py).
+    Every response is recorded by usage_accounting.py.
+    """
+    session = requests.Session()
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=RETRYABLE_STATUS_CODES,
+        allowed_methods=frozenset({'GET', 'HEAD'}),
+        raise_on_status=False
+    )
+    cassette = active_cassette()
+    if cassette:
+        adapter = CassetteAdapter(cassette, pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+    else:
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if api_key:
+        session.headers['Authorization'] = f"Bearer {api_key}"
+    usage = active_usage_log()
+    if usage:
+        session.hooks['response'].append(usage.record_response)
+    return session
+
+def normalize_job(data):
+    """Map a provider job response onto the fields the tooling uses."""
+    get = data.get if isinstance(data, dict) else lambda key, default=None: getattr(data, key, default)
+    return {
+        'id': get('id') or get('job_id'),
+        'status': get('status', 'unknown'),
+        'model': get('model'),
+        'fine_tuned_model': get('fine_tuned_model'),
+        'training_file': get('training_file'),
+        'progress': get('progress'),
+        'trained_tokens': get('trained_tokens'),
+        'created_at': get('created_at'),
+        'finished_at': get('finished_at'),
+        'metrics': get('metrics') or get('result_metrics'),
+        'error': get('error')
+    }
+
+class FineTuningProvider(ABC):
+    """Interface every backend adapter implements."""
+
+    name = 'base'
+    base_url = None
+
+    @property
+    def target(self):
+        """Identifies where uploads live, so cached file ids are only reused on the same API."""
+        return f"{self.name}:{self.base_url}"
+
+    def file_exists(self, file_id):
+        """Whether a previously uploaded file can still be used."""
+        return False
+
+    @abstractmethod
+    def upload_file(self, path, progress_callback=None):
+        """Upload a training file; returns the remote file id."""
+
+    def upload_stream(self, stream, filename, compress=None):
+        """
+        Upload an ExampleStream; returns the remote file id.
+
+        Providers without a streaming upload path spool the stream to a
+        temporary file and upload that.
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / filename
+            with open(path, 'wb') as f:
+                for chunk in stream:
+                    f.write(chunk)
+            stream.wire_bytes = path.stat().st_size
+            return self.upload_file(path)
+
+    @abstractmethod
+    def create_job(self, training_file, model, suffix, hyperparameters):
+        """
+        Start a fine-tuning job; returns a normalized job dict.
+
+        training_file is a file id, or a list of ids for sharded datasets.
+        """
+
+    @abstractmethod
+    def get_job(self, job_id):
+        """Fetch a job; returns a normalized job dict."""
+
+class LlamaAPIProvider(FineTuningProvider):
+    name = 'llama-api'
+
+    def __init__(self, api_key=None, base_url=None, pool_size=DEFAULT_POOL_SIZE, gzip_uploads=None):
+        self.api_key = api_key or os.getenv('LLAMA_API_KEY')
+        self.base_url = (base_url or os.getenv('LLAMA_API_URL', 'https://api.llama-api.com')).rstrip('/')
+        self.session = create_session(self.api_key, pool_size)
+        # Only send Content-Encoding: gzip request bodies to servers known to accept them
+        if gzip_uploads is None:
+            gzip_uploads = os.getenv('LLAMA_API_GZIP_UPLOADS', 'false').lower() in ('1', 'true', 'yes')
+        self.gzip_uploads = gzip_uploads
+
+    def request(self, method, path, **kwargs):
+        kwargs.setdefault('timeout', 60)
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        except requests.exceptions.RequestException as e:
+            raise FineTuningProviderError(f"Request failed: {e}", retryable=True)
+
+        if response.status_code not in (200, 201):
+            raise FineTuningProviderError(
+                f"{method} {path} failed ({response.status_code}): {response.text[:500]}",
+                status_code=response.status_code,
+                retryable=response.status_code in RETRYABLE_STATUS_CODES
+            )
+        try:
+            return response.json()
+        except ValueError:
+            raise FineTuningProviderError(
+                f"Invalid JSON response to {method} {path}: {response.text[:200]!r}", status_code=response.status_code
+            )
+
+    def upload_file(self, path, progress_callback=None):
+        path = Path(path)
+        if path.stat().st_size >= multipart_threshold():
+            uploader = MultipartUploader(
+                self.base_url, self.api_key, progress_callback=progress_callback, session=self.session
+            )
+            try:
+                return uploader.upload(path)
+            except UploadError as e:
+                raise FineTuningProviderError(str(e))
+
+        with open(path, 'rb') as f:
+            result = self.request(
+                'POST', '/files',
+                files={'file': (path.name, f, 'application/jsonl')},
+                data={'purpose': 'fine-tune'},
+                timeout=300
+            )
+        return result.get('id') or result.get('file_id')
+
+    def file_exists(self, file_id):
+        try:
+            self.request('GET', f"/files/{file_id}", timeout=30)
+        except FineTuningProviderError as e:
+            if e.status_code == 404:
+                return False
+            raise
+        return True
+
+    def upload_stream(self, stream, filename, compress=None):
+        compress = self.gzip_uploads if compress is None else compress
+        content_type, body = multipart_body(
+            stream, filename,
+            fields={'purpose': 'fine-tune'},
+            trailing_fields=lambda: {'sha256': stream.sha256}
+        )
+        headers = {'Content-Type': content_type}
+        if compress:
+            body = gzip_chunks(body)
+            headers['Content-Encoding'] = 'gzip'
+
+        # A generator body makes requests send Transfer-Encoding: chunked
+        wire = ByteCounter(body)
+        result = self.request('POST', '/files', data=iter(wire), headers=headers, timeout=300)
+        stream.wire_bytes = wire.bytes
+        return result.get('id') or result.get('file_id')
+
+    def create_job(self, training_file, model, suffix, hyperparameters):
+        payload = {
+            "model": model,
+            "suffix": suffix,
+            "hyperparameters": hyperparameters
+        }
+        if isinstance(training_file, (list, tuple)):
+            payload["training_files"] = list(training_file)
+        else:
+            payload["training_file"] = training_file
+        return normalize_job(self.request('POST', '/fine-tuning/jobs', json=payload))
+
+    def get_job(self, job_id):
+        return normalize_job(self.request('GET', f"/fine-tuning/jobs/{job_id}", timeout=30))
+
+class LlamaStackProvider(FineTuningProvider):
+    name = 'llama-stack'
+
+    def __init__(self, api_key=None, base_url=None):
+        import llama_stack_client
+
+        self.sdk = llama_stack_client
+        self.base_url = base_url or os.getenv('LLAMA_API_BASE_URL', 'https://api.llama-stack.io')
+        self.client = llama_stack_client.LlamaStackClient(base_url=self.base_url, api_key=api_key or os.getenv('LLAMA_API_KEY'))
+
+    def call(self, func, *args, **kwargs):
+        """Run an SDK call, turning API errors into FineTuningProviderError; anything else propagates."""
+        try:
+            return func(*args, **kwargs)
+        except self.sdk.APIStatusError as e:
+            raise FineTuningProviderError(
+                str(e), status_code=e.status_code, retryable=e.status_code in RETRYABLE_STATUS_CODES
+            )
+        except self.sdk.APIConnectionError as e:  # Includes APITimeoutError
+            raise FineTuningProviderError(f"Request failed: {e}", retryable=True)
+
+    def file_exists(self, file_id):
+        try:
+            self.call(self.client.files.retrieve, file_id)
+        except FineTuningProviderError as e:
+            if e.status_code == 404:
+                return False
+            raise
+        return True
+
+    def upload_file(self, path, progress_callback=None):
+        with open(path, 'rb') as f:
+            response = self.call(self.client.files.create, file=f, purpose='fine-tune')
+        return response.id
+
+    def create_job(self, training_file, model, suffix, hyperparameters):
+        response = self.call(
+            self.client.fine_tuning.jobs.create,
+            training_file=training_file,
+            model=model,
+            suffix=suffix,
+            hyperparameters=hyperparameters
+        )
+        return normalize_job(response)
+
+    def get_job(self, job_id):
+        return normalize_job(self.call(self.client.fine_tuning.jobs.retrieve, job_id))
+
+class MockProvider(FineTuningProvider):
+    """
+    In-process stand-in for a fine-tuning backend.
+
+    Uploads take time proportional to file size, jobs sit in a queue and then
+    report training progress as simulated time passes. time_scale shrinks all
+    simulated durations (0.01 runs a 10-minute job in 6 seconds).
+    """
+
+    name = 'mock'
+    base_url = 'in-process'
+
+    def __init__(self, upload_bytes_per_second=20e6, request_latency=0.05, queue_seconds=60,
+                 training_seconds=600, failure_rate=0.0, time_scale=1.0, seed=None):
+        self.upload_bytes_per_second = upload_bytes_per_second
+        self.request_latency = request_latency
+        self.queue_seconds = queue_seconds
+        self.training_seconds = training_seconds
+        self.failure_rate = failure_rate
+        self.time_scale = time_scale
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.files = {}
+        self.jobs = {}
+
+    def sleep(self, seconds):
+        time.sleep(seconds * self.time_scale)
+
+    def file_exists(self, file_id):
+        return file_id in self.files
+
+    def elapsed(self, started):
+        return (time.monotonic() - started) / self.time_scale
+
+    def upload_file(self, path, progress_callback=None):
+        size = Path(path).stat().st_size
+        self.sleep(self.request_latency)
+
+        done = 0
+        step = max(int(self.upload_bytes_per_second / 10), 1)  # Report ~10 times per simulated second
+        while done < size:
+            chunk = min(step, size - done)
+            self.sleep(chunk / self.upload_bytes_per_second)
+            done += chunk
+            if progress_callback:
+                progress_callback(done, size)
+
+        return self.register_file(Path(path).name, size)
+
+    def upload_stream(self, stream, filename, compress=None):
+        self.sleep(self.request_latency)
+        body = gzip_chunks(stream) if compress else stream
+        wire = ByteCounter(body)
+        for chunk in wire:
+            self.sleep(len(chunk) / self.upload_bytes_per_second)
+        stream.wire_bytes = wire.bytes
+        return self.register_file(filename, stream.bytes, stream.sha256)
+
+    def register_file(self, filename, size, sha256=None):
+        with self.lock:
+            file_id = f"file-mock-{next(self.ids):06d}"
+            self.files[file_id] = {'id': file_id, 'bytes': size, 'filename': filename, 'sha256': sha256}
+        return file_id
+
+    def create_job(self, training_file, model, suffix, hyperparameters):
+        self.sleep(self.request_latency)
+        for file_id in (training_file if isinstance(training_file, (list, tuple)) else [training_file]):
+            if file_id not in self.files:
+                raise FineTuningProviderError(f"Unknown training file {file_id}", status_code=400)
+
+        with self.lock:
+            job_id = f"ftjob-mock-{next(self.ids):06d}"
+            self.jobs[job_id] = {
+                'id': job_id,
+                'model': model,
+                'suffix': suffix,
+                'training_file': training_file,
+                'hyperparameters': hyperparameters,
+                'started': time.monotonic(),
+                'created_at': int(time.time()),
+                # Decide the outcome up front, so repeated polls agree
+                'will_fail': self.random.random() < self.failure_rate,
+                'metrics': self.simulated_metrics(hyperparameters)
+            }
+        return self.get_job(job_id, latency=False)
+
+    def get_job(self, job_id, latency=True):
+        if latency:
+            self.sleep(self.request_latency)
+        job = self.jobs.get(job_id)
+        if not job:
+            raise FineTuningProviderError(f"Job {job_id} not found", status_code=404)
+
+        elapsed = self.elapsed(job['started'])
+        result = {
+            'id': job_id,
+            'model': job['model'],
+            'training_file': job['training_file'],
+            'created_at': job['created_at']
+        }
+        if elapsed < self.queue_seconds:
+            result['status'] = 'queued'
+        elif elapsed < self.queue_seconds + self.training_seconds:
+            result['status'] = 'running'
+            result['progress'] = round((elapsed - self.queue_seconds) / self.training_seconds * 100, 1)
+        elif job['will_fail']:
+            result['status'] = 'failed'
+            result['error'] = 'Simulated training failure'
+        else:
+            result['status'] = 'succeeded'
+            result['progress'] = 100
+            result['fine_tuned_model'] = f"ft:{job['model']}:{job['suffix']}:{job_id[-6:]}"
+            result['metrics'] = job['metrics']
+        return normalize_job(result)
+
+    def simulated_metrics(self, hyperparameters):
+        """
+        Plausible final losses for a set of hyperparameters: more epochs lower
+        training loss but eventually raise validation loss, and learning rates
+        far from 2e-5 do worse.
+        """
+        hyperparameters = hyperparameters or {}
+        epochs = hyperparameters.get('n_epochs', 3)
+        learning_rate = hyperparameters.get('learning_rate', 2e-5)
+        lr_penalty = abs(math.log10(learning_rate / 2e-5)) * 0.3
+        train_loss = 1.6 / (1 + epochs) + lr_penalty + self.random.uniform(0, 0.05)
+        valid_loss = train_loss + 0.04 * max(epochs - 3, 0) ** 1.5 + self.random.uniform(0, 0.05)
+        return {'train_loss': round(train_loss, 4), 'valid_loss': round(valid_loss, 4)}
+
+def create_provider(name=None, **options):
+    """Create a provider by name (defaults to $FINE_TUNING_PROVIDER or llama-api)."""
+    name = name or os.getenv('FINE_TUNING_PROVIDER', 'llama-api')
+    providers = {
+        'llama-api': LlamaAPIProvider,
+        'llama-stack': LlamaStackProvider,
+        'mock': MockProvider,
+    }
+    if name not in providers:
+        raise ValueError(f"Unknown provider '{name}'. Choose from: {', '.join(providers)}")
+    return providers[name](**options)
+
+class FineTuningClient:
+    def __init__(self, provider=None, registry=None, retries=3, backoff=1.0, uploads=None, reuse=None):
+        """
+        Args:
+            provider: FineTuningProvider (default: create_provider())
+            registry: JobRegistry that created jobs are recorded in
+            retries: Attempts for calls that fail with a retryable error
+            backoff: Initial retry delay in seconds (doubles each attempt)
+            uploads: UploadRegistry of past uploads and jobs
+            reuse: Reuse identical uploads/jobs (default: $REUSE_UPLOADS, true)
+        """
+        self.provider = provider or create_provider()
+        self.registry = registry or JobRegistry()
+        self.uploads = uploads or UploadRegistry()
+        if reuse is None:
+            reuse = os.getenv('REUSE_UPLOADS', 'true').lower() not in ('0', 'false', 'no')
+        self.reuse = reuse
+        self.retries = retries
+        self.backoff = backoff
+        self.timings = {}
+        self.timings_lock = threading.Lock()
+
+    def timed(self, operation, func, *args, **kwargs):
+        """
+        Run a provider call with retries, recording how long each attempt took.
+        Operations outside IDEMPOTENT_OPERATIONS are only retried after a 429.
+        """
+        delay = self.backoff
+        for attempt in range(1, self.retries + 1):
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+                self.record(operation, time.perf_counter() - start, True)
+                return result
+            except FineTuningProviderError as e:
+                self.record(operation, time.perf_counter() - start, False)
+                if not e.retryable or attempt == self.retries:
+                    raise
+                if operation not in IDEMPOTENT_OPERATIONS and e.status_code != 429:
+                    raise
+                time.sleep(delay)
+                delay *= 2
+
+    def record(self, operation, seconds, ok):
+        with self.timings_lock:
+            self.timings.setdefault(operation, []).append((seconds, ok))
+
+    def validate(self, training_file):
+        start = time.perf_counter()
+        num_examples = validate_training_file(training_file)
+        self.record('validate', time.perf_counter() - start, True)
+        return num_examples
+
+    def upload(self, training_file, progress_callback=None):
+        """Upload a file, or return the id of an identical file already on this API."""
+        target = self.provider.target
+        sha256 = fingerprint_file(training_file)
+
+        cached = self.uploads.find_file(target, sha256) if self.reuse else None
+        if cached:
+            if self.timed('file_exists', self.provider.file_exists, cached['file_id']):
+                print(f"  ↻ Identical data already uploaded on {cached['uploaded_at']}, "
+                      f"reusing file {cached['file_id']}")
+                return cached['file_id']
+            self.uploads.forget_file(target, sha256)
+
+        file_id = self.timed('upload', self.provider.upload_file, training_file, progress_callback)
+        self.uploads.record_file(
+            target, sha256, file_id, filename=Path(training_file).name, bytes=Path(training_file).stat().st_size
+        )
+        return file_id
+
+    def upload_examples(self, examples, filename='training_data.jsonl', compress=None, skip_invalid=False,
+                        progress_callback=None):
+        """
+        Stream examples from a generator into an upload, validating and hashing inline.
+
+        A generator can only be consumed once, so streamed uploads are not retried.
+
+        Returns:
+            (file_id, stats) where stats has examples, skipped, bytes, wire_bytes and sha256
+        """
+        stream = ExampleStream(examples, skip_invalid, progress_callback=progress_callback)
+        start = time.perf_counter()
+        try:
+            file_id = self.provider.upload_stream(stream, filename, compress)
+        except Exception:
+            self.record('upload_stream', time.perf_counter() - start, False)
+            raise
+        self.record('upload_stream', time.perf_counter() - start, True)
+
+        stats = stream.stats()
+        stats['wire_bytes'] = stream.wire_bytes
+        # The hash is only known afterwards, but later file-based runs can still reuse it
+        self.uploads.record_file(
+            self.provider.target, stats['sha256'], file_id, filename=filename, bytes=stats['bytes']
+        )
+        return file_id, stats
+
+    def find_existing_job(self, job_target, job_key):
+        """A recorded identical job that hasn't failed, refreshed from the provider, or None."""
+        existing = self.uploads.find_job(job_target, job_key)
+        if not existing:
+            return None
+        try:
+            job = self.get_job(existing['job_id'])
+        except FineTuningProviderError:
+            return None
+        if job['status'] in ('failed', 'cancelled'):
+            return None
+        return job
+
+    def create_job(self, training_file_id, model, suffix, hyperparameters):
+        """
+        Start a job, unless an identical one (same data, model, suffix and
+        hyperparameters) is already queued, running or finished. Reused jobs
+        come back with job['reused'] = True.
+        """
+        target = self.provider.target
+        file_ids = training_file_id if isinstance(training_file_id, (list, tuple)) else [training_file_id]
+        dataset_hashes = [self.uploads.dataset_for_file(target, file_id) for file_id in file_ids]
+        job_key = None
+        if all(dataset_hashes):
+            # Shards are fingerprinted as the ordered list of their hashes
+            dataset_sha256 = dataset_hashes[0] if len(dataset_hashes) == 1 else ','.join(dataset_hashes)
+            job_key = job_fingerprint(dataset_sha256, model, suffix, hyperparameters)
+
+        if job_key and self.reuse:
+            job = self.find_existing_job(target, job_key)
+            if job:
+                job['reused'] = True
+                return job
+
+        job = self.timed('create_job', self.provider.create_job, training_file_id, model, suffix, hyperparameters)
+        if job_key:
+            self.uploads.record_job(
+                target, job_key, job['id'],
+                file_id=training_file_id, model=model, suffix=suffix, hyperparameters=hyperparameters
+            )
+        self.registry.update(
+            job['id'],
+            status=job['status'],
+            provider=self.provider.name,
+            file_id=training_file_id,
+            model=model,
+            suffix=suffix,
+            hyperparameters=hyperparameters
+        )
+        return job
+
+    def get_job(self, job_id):
+        return self.timed('get_job', self.provider.get_job, job_id)
+
+    def wait_for_job(self, job_id, poll_interval=30, timeout=None):
+        """Block until a job reaches a terminal status; returns the final job dict."""
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            job = self.get_job(job_id)
+            self.registry.update(job_id, status=job['status'], progress=job['progress'],
+                                 fine_tuned_model=job['fine_tuned_model'])
+            if job['status'] in TERMINAL_STATUSES:
+                return job
+            if deadline and time.monotonic() > deadline:
+                raise TimeoutError(f"Job {job_id} still {job['status']} after {timeout}s")
+            time.sleep(poll_interval)
+
+    def timing_summary(self):
+        """Per-operation call counts, failures and latency stats in milliseconds."""
+        summary = {}
+        for operation, samples in self.timings.items():
+            durations = [seconds * 1000 for seconds, _ in samples]
+            summary[operation] = {
+                'calls': len(samples),
+                'failures': sum(1 for _, ok in samples if not ok),
+                'mean_ms': statistics.fmean(durations),
+                'max_ms': max(durations),
+                'total_ms': sum(durations)
+            }
+        return summary
+
+    def print_timings(self):
+        print(f"\n{'Operation':<14} {'Calls':>6} {'Fail':>5} {'Mean ms':>10} {'Max ms':>10} {'Total ms':>10}")
+        for operation, stats in self.timing_summary().items():
+            print(f"{operation:<14} {stats['calls']:>6} {stats['failures']:>5} "
+                  f"{stats['mean_ms']:>10.1f} {stats['max_ms']:>10.1f} {stats['total_ms']:>10.1f}")
+
+def default_hyperparameters():
+    """Hyperparameters from the .env file, as every fine-tune script reads them."""
+    return {
+        "n_epochs": int(os.getenv('NUM_EPOCHS', '3')),
+        "batch_size": int(os.getenv('BATCH_SIZE', '4')),
+        "learning_rate": float(os.getenv('LEARNING_RATE', '2e-5'))
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the fine-tuning flow through the unified client")
+    parser.add_argument('training_file')
+    parser.add_argument('--provider', default=os.getenv('FINE_TUNING_PROVIDER', 'mock'),
+                        choices=['llama-api', 'llama-stack', 'mock'])
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="Number of identical jobs to start from the same upload (implies --no-reuse)")
+    parser.add_argument('--no-reuse', action='store_true', help="Upload and start jobs even if identical ones exist")
+    parser.add_argument('--time-scale', type=float, default=0.01, help="Mock provider only: simulated time factor")
+    parser.add_argument('--poll-interval', type=float, default=None)
+    args = parser.parse_args()
+
+    options = {'time_scale': args.time_scale} if args.provider == 'mock' else {}
+    provider = create_provider(args.provider, **options)
+    output_dir = Path(__file__).parent.parent / 'outputs'
+    if args.provider == 'mock':
+        registry = JobRegistry(output_dir / 'mock_job_registry.json')
+        uploads = UploadRegistry(output_dir / 'mock_upload_registry.json')
+    else:
+        registry, uploads = JobRegistry(), UploadRegistry()
+    client = FineTuningClient(provider, registry, uploads=uploads, reuse=not args.no_reuse and args.jobs == 1)
+
+    print("=" * 70)
+    print(f"Fine-tuning flow via {provider.name} provider")
+    print("=" * 70)
+
+    client.validate(args.training_file)
+
+    print(f"\nUploading training data...")
+    file_id = client.upload(args.training_file)
+    print(f"✓ File ID: {file_id}")
+
+    model = os.getenv('MODEL_NAME', 'llama3.1-8b')
+    suffix = os.getenv('OUTPUT_MODEL_NAME', 'whatsapp-business-assistant-v1')
+    jobs = [client.create_job(file_id, model, suffix, default_hyperparameters()) for _ in range(args.jobs)]
+    print(f"✓ Started {len(jobs)} job(s): {', '.join(job['id'] for job in jobs)}")
+
+    poll_interval = args.poll_interval or (30 * args.time_scale if args.provider == 'mock' else 30)
+    for job in jobs:
+        final = client.wait_for_job(job['id'], poll_interval=poll_interval)
+        print(f"  {final['id']}: {final['status']} {final['fine_tuned_model'] or final['error'] or ''}")
+
+    client.print_timings()
@@ -0,0 +1,390 @@
+"""
+Record and replay HTTP traffic ("cassettes") on the shared HTTP paths.
+
+Both HTTP paths used by the tooling can run against a cassette instead of
+the network: requests sessions from fine_tuning_client.create_session() (job
+creation, uploads, status checks, test_fine_tuned_model.py) and
+async_http.AsyncHTTPClient (chat_client.py and the evaluation tools).
+
+While recording, every response is captured with its status, headers,
+body chunks and timing: the wait for the response head and the gap
+before each chunk, so streamed answers keep their time to first token and
+inter-token gaps. Request bodies are stored only as a hash. A cassette is a
+JSONL file with one line per exchange, gzipped if the name ends in .gz.
+
+Replaying never touches the network. Requests are matched on method, URL
+and a hash of the body (JSON bodies are compared by content, not key order).
+Identical requests get their recorded responses in order, so a polled job
+status moves through the same states, and the last one repeats once they run
+out. A request whose non-JSON body differs from the recording (multipart
+boundaries, streamed uploads) falls back to the next response recorded for
+the same method and URL; JSON bodies must match, so a chat request never gets
+the answer to a different prompt. A request with no recorded response fails
+like a connection error.
+
+Replays are instant by default; --speed 1 reproduces the recorded timing
+and --speed 2 plays it back twice as fast.
+
+Any script can be recorded or replayed without changes:
+
+    HTTP_CASSETTE        cassette file
+    HTTP_CASSETTE_MODE   record or replay (default: replay if the file exists, else record)
+    HTTP_CASSETTE_SPEED  0 for instant replays, 1 for recorded timing
+
+Usage:
+    python http_cassette.py record ../outputs/cassettes/status.jsonl -- python check_llama_api_status.py ftjob-abc
+    python http_cassette.py replay ../outputs/cassettes/status.jsonl -- python check_llama_api_status.py ftjob-abc
+    python http_cassette.py replay eval.jsonl.gz --speed 1 -- python evaluation_harness.py --model <model>
+    python http_cassette.py show ../outputs/cassettes/status.jsonl
+"""
+
+import argparse
+import asyncio
+import base64
+import gzip
+import hashlib
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.response import HTTPResponse
+
+CASSETTE_ENV = 'HTTP_CASSETTE'
+MODE_ENV = 'HTTP_CASSETTE_MODE'
+SPEED_ENV = 'HTTP_CASSETTE_SPEED'
+MODES = ('record', 'replay')
+COALESCE_SECONDS = 0.001  # Chunks arriving closer together than this are stored as one
+# Bodies are stored decoded and re-framed on replay, so these would no longer be true
+DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive',
+                   'set-cookie', 'date'}
+
+class CassetteMiss(Exception):
+    """Raised in replay mode for a request that has no recorded response."""
+
+def open_cassette(path, mode):
+    path = Path(path)
+    if path.suffix == '.gz':
+        return gzip.open(path, mode, encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+def body_digest(body):
+    """
+    Short hash identifying a request body (None without one).
+
+    JSON is hashed in canonical form ('json:<hash>'), other bodies as bytes
+    ('raw:<hash>'); bodies streamed from a generator or file can't be hashed
+    up front and are all 'stream'.
+    """
+    if body is None or body == b'' or body == '':
+        return None
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    if not isinstance(body, (bytes, bytearray)):
+        return 'stream'
+    try:
+        canonical = json.dumps(json.loads(body), sort_keys=True, separators=(',', ':')).encode('utf-8')
+        kind = 'json'
+    except (ValueError, UnicodeDecodeError):
+        canonical, kind = bytes(body), 'raw'
+    return f"{kind}:{hashlib.sha256(canonical).hexdigest()[:16]}"
+
+def drain(body):
+    """Consume a streamed request body the way sending it would (progress counters and inline hashes run)."""
+    if body is None or isinstance(body, (bytes, bytearray, str)):
+        return
+    if hasattr(body, 'read'):
+        while body.read(1024 * 1024):
+            pass
+    else:
+        for _ in body:
+            pass
+
+def encode_chunks(chunks):
+    """[(delay, bytes), ...] -> compact JSON entries, merging chunks that arrived together."""
+    merged = []
+    for delay, data in chunks:
+        if merged and delay < COALESCE_SECONDS:
+            merged[-1][1] += data
+        else:
+            merged.append([delay, bytes(data)])
+
+    encoded = []
+    for delay, data in merged:
+        try:
+            encoded.append([round(delay, 4), data.decode('utf-8')])
+        except UnicodeDecodeError:
+            encoded.append([round(delay, 4), base64.b64encode(data).decode('ascii'), 'b64'])
+    return encoded
+
+def decode_chunks(entry):
+    return [(chunk[0], base64.b64decode(chunk[1]) if len(chunk) > 2 else chunk[1].encode('utf-8'))
+            for chunk in entry['chunks']]
+
+class Cassette:
+    def __init__(self, path, mode='replay', speed=0.0):
+        """
+        Args:
+            path: Cassette file (.jsonl or .jsonl.gz)
+            mode: 'record' starts a new cassette; 'replay' loads an existing one
+            speed: Replay timing: 0 for no waits, 1 for the recorded timing, 2 for twice as fast
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}; expected one of {', '.join(MODES)}")
+        self.path = Path(path)
+        self.mode = mode
+        self.speed = speed
+        self.lock = threading.Lock()
+        self.exact = defaultdict(deque)   # (method, url, body digest) -> unplayed exchanges
+        self.routes = defaultdict(deque)  # (method, url) -> unplayed exchanges
+        self.last = {}                    # Most recently played exchange per key, repeated once a queue runs out
+        self.stats = {'recorded': 0, 'replayed': 0, 'misses': 0}
+
+        if mode == 'record':
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            open_cassette(self.path, 'wt').close()
+        else:
+            with open_cassette(self.path, 'rt') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        entry['played'] = False
+                        self.exact[(entry['method'], entry['url'], entry['body'])].append(entry)
+                        self.routes[(entry['method'], entry['url'])].append(entry)
+
+    def record(self, method, url, digest, status, reason, headers, wait, chunks):
+        """Append one exchange (chunks: [(seconds since the previous chunk, bytes), ...])."""
+        entry = {
+            'method': method,
+            'url': url,
+            'body': digest,
+            'status': status,
+            'reason': reason,
+            'headers': {name.lower(): value for name, value in headers.items() if name.lower() not in DROPPED_HEADERS},
+            'wait': round(wait, 4),
+            'chunks': encode_chunks(chunks)
+        }
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self.lock:
+            with open_cassette(self.path, 'at') as f:
+                f.write(line)
+            self.stats['recorded'] += 1
+
+    def match(self, method, url, digest):
+        """
+        The recorded exchange to answer a request with (see module docstring for the order).
+
+        Raises:
+            CassetteMiss when nothing was recorded for the method and URL
+        """
+        key, route = (method, url, digest), (method, url)
+        candidates = [(key, self.exact.get(key))]
+        if not (digest or '').startswith('json:'):
+            candidates.append((route, self.routes.get(route)))
+        with self.lock:
+            for queue_key, queue in candidates:
+                while queue:
+                    entry = queue.popleft()
+                    if not entry['played']:
+                        entry['played'] = True
+                        self.last[key] = self.last[route] = entry
+                        self.stats['replayed'] += 1
+                        return entry
+                if queue_key in self.last:
+                    self.stats['replayed'] += 1
+                    return self.last[queue_key]
+            self.stats['misses'] += 1
+        raise CassetteMiss(f"No recorded response for {method} {url} in {self.path}")
+
+    def delay(self, seconds):
+        """Seconds to actually wait in replay for `seconds` of recorded time."""
+        return seconds / self.speed if self.speed else 0
+
+    async def play_async(self, method, url, body, send):
+        """
+        AsyncHTTPClient hook: replay a response, or send the request with `send()` and record it.
+
+        Returns:
+            An object with AsyncResponse's interface
+        """
+        digest = body_digest(body)
+        if self.mode == 'replay':
+            entry = self.match(method, url, digest)
+            if self.delay(entry['wait']):
+                await asyncio.sleep(self.delay(entry['wait']))
+            return ReplayedResponse(entry, self)
+        started = time.perf_counter()
+        response = await send()
+        return RecordingResponse(response, self, method, url, digest, time.perf_counter() - started)
+
+class ResponseBody:
+    """read()/json()/text() on top of iter_chunks(), as AsyncResponse has them."""
+
+    async def read(self):
+        return b''.join([chunk async for chunk in self.iter_chunks()])
+
+    async def json(self):
+        return json.loads(await self.read() or b'null')
+
+    async def text(self):
+        return (await self.read()).decode('utf-8', errors='replace')
+
+class ReplayedResponse(ResponseBody):
+    def __init__(self, entry, cassette):
+        self.status = entry['status']
+        self.reason = entry['reason']
+        self.headers = dict(entry['headers'])
+        self.entry = entry
+        self.cassette = cassette
+
+    async def iter_chunks(self):
+        for delay, data in decode_chunks(self.entry):
+            if self.cassette.delay(delay):
+                await asyncio.sleep(self.cassette.delay(delay))
+            yield data
+
+class RecordingResponse(ResponseBody):
+    """Passes a live AsyncResponse through, recording its chunks and their timing."""
+
+    def __init__(self, response, cassette, method, url, digest, wait):
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+        self.response = response
+        self.cassette = cassette
+        self.request = (method, url, digest)
+        self.wait = wait
+
+    async def iter_chunks(self):
+        chunks = []
+        last = time.perf_counter()
+        try:
+            async for chunk in self.response.iter_chunks():
+                now = time.perf_counter()
+                chunks.append((now - last, chunk))
+                last = now
+                yield chunk
+        finally:
+            # A body abandoned part way is recorded as far as it was read, which is what a replay will see
+            self.cassette.record(*self.request, self.status, self.reason, self.headers, self.wait, chunks)
+
+class CassetteAdapter(HTTPAdapter):
+    """requests transport adapter that records to or replays from a Cassette."""
+
+    def __init__(self, cassette, **kwargs):
+        """
+        Args:
+            cassette: Cassette to record to or replay from
+            **kwargs: HTTPAdapter options (pool size, retries), used when recording
+        """
+        self.cassette = cassette
+        super().__init__(**kwargs)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        digest = body_digest(request.body)
+        if self.cassette.mode == 'replay':
+            drain(request.body)
+            try:
+                entry = self.cassette.match(request.method, request.url, digest)
+            except CassetteMiss as e:
+                raise requests.exceptions.ConnectionError(str(e), request=request)
+            chunks = decode_chunks(entry)
+            pause = self.cassette.delay(entry['wait'] + sum(delay for delay, _ in chunks))
+            if pause:
+                time.sleep(pause)
+            raw = HTTPResponse(
+                body=io.BytesIO(b''.join(data for _, data in chunks)), headers=entry['headers'],
+                status=entry['status'], reason=entry['reason'], preload_content=False, decode_content=False
+            )
+            return self.build_response(request, raw)
+
+        started = time.perf_counter()
+        response = super().send(request, stream=True, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+        wait = time.perf_counter() - started
+        chunks = []
+        last = time.perf_counter()
+        for chunk in response.iter_content(chunk_size=None):
+            now = time.perf_counter()
+            chunks.append((now - last, chunk))
+            last = now
+        # The body has been read; hand it to the caller as if it had been read normally
+        response._content = b''.join(chunk for _, chunk in chunks)
+        response._content_consumed = True
+        self.cassette.record(request.method, request.url, digest, response.status_code, response.reason,
+                             response.headers, wait, chunks)
+        return response
+
+_active = None
+_active_lock = threading.Lock()
+
+def active_cassette():
+    """The cassette configured through HTTP_CASSETTE, shared by the whole process (None if unset)."""
+    global _active
+    path = os.getenv(CASSETTE_ENV)
+    if not path:
+        return None
+    with _active_lock:
+        if _active is None or str(_active.path) != str(Path(path)):
+            mode = os.getenv(MODE_ENV) or ('replay' if Path(path).exists() else 'record')
+            _active = Cassette(path, mode, float(os.getenv(SPEED_ENV) or 0))
+        return _active
+
+def show(path):
+    exchanges = 0
+    body_bytes = 0
+    recorded_seconds = 0.0
+    with open_cassette(path, 'rt') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            chunks = decode_chunks(entry)
+            size = sum(len(data) for _, data in chunks)
+            duration = entry['wait'] + sum(delay for delay, _ in chunks)
+            exchanges += 1
+            body_bytes += size
+            recorded_seconds += duration
+            print(f"{entry['method']:<6} {entry['status']:>3} {duration:>8.3f}s {len(chunks):>5} chunks "
+                  f"{size:>10,} B  {entry['url']}")
+    print(f"\n{exchanges:,} exchanges, {body_bytes:,} body bytes, {recorded_seconds:.1f}s of recorded time "
+          f"in {Path(path).stat().st_size:,} bytes on disk")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record or replay a command's HTTP traffic",
+                                     usage="%(prog)s {record,replay,show} cassette [--speed S] [-- command ...]")
+    parser.add_argument('action', choices=['record', 'replay', 'show'])
+    parser.add_argument('cassette', help="Cassette file (.jsonl, or .jsonl.gz to compress)")
+    parser.add_argument('--speed', type=float, default=0,
+                        help="Replay: 0 for no waits (default), 1 for the recorded timing")
+    argv = sys.argv[1:]
+    command = []
+    if '--' in argv:
+        argv, command = argv[:argv.index('--')], argv[argv.index('--') + 1:]
+    args = parser.parse_args(argv)
+
+    if args.action == 'show':
+        show(args.cassette)
+        exit(0)
+
+    if not command:
+        print("❌ No command given (e.g. -- python check_llama_api_status.py <job_id>)")
+        exit(1)
+    if args.action == 'replay' and not Path(args.cassette).exists():
+        print(f"❌ Cassette not found: {args.cassette}")
+        exit(1)
+
+    env = dict(os.environ, **{CASSETTE_ENV: str(Path(args.cassette).resolve()), MODE_ENV: args.action,
+                              SPEED_ENV: str(args.speed)})
+    started = time.perf_counter()
+    returncode = subprocess.run(command, env=env).returncode
+    verb = 'Recorded' if args.action == 'record' else 'Replayed'
+    print(f"\n{'✓' if returncode == 0 else '❌'} {verb} {args.cassette} in {time.perf_counter() - started:.2f}s "
+          f"(exit code {returncode})")
+    sys.exit(returncode)
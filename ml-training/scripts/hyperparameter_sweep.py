@@ -0,0 +1,253 @@
+"""
+Hyperparameter sweep over fine-tuning jobs.
+
+Builds a grid (or a random sample) of epochs, learning rate, batch size and
+dataset variants, uploads each dataset once, and keeps the provider's job
+quota full: as soon as one job finishes the next configuration is submitted.
+Jobs are watched concurrently with JobMonitor, and the final status and
+metrics of every run are collected into one comparison table, saved to
+outputs/sweeps/ as CSV and JSON.
+
+Usage:
+    python hyperparameter_sweep.py --dataset ../data/training/training_data_complete.jsonl \\
+        --epochs 2 3 5 --learning-rate 1e-5 2e-5 5e-5 --max-concurrent 3
+
+    # Random search: 8 runs, learning rate sampled log-uniformly from a range
+    python hyperparameter_sweep.py --dataset a.jsonl --dataset b.jsonl --random 8 --lr-range 5e-6 1e-4
+
+    # Offline dry run against the simulated provider
+    python hyperparameter_sweep.py --dataset a.jsonl --provider mock --time-scale 0.01
+"""
+
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import math
+import os
+import random
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from fine_tuning_client import FineTuningClient, FineTuningProviderError, create_provider
+from job_monitor import MAX_INTERVAL, MIN_INTERVAL, QUEUED_INTERVAL, JobMonitor
+from job_registry import JobRegistry
+from upload_registry import UploadRegistry
+
+load_dotenv(Path(__file__).parent.parent / '.env')
+
+SWEEP_DIR = Path(__file__).parent.parent / 'outputs' / 'sweeps'
+DEFAULT_QUOTA = int(os.getenv('FINE_TUNING_QUOTA', '3'))
+SORT_METRIC = 'valid_loss'
+
+def build_grid(datasets, epochs, learning_rates, batch_sizes):
+    """Every combination of dataset variant and hyperparameters."""
+    return [
+        {'dataset': dataset, 'n_epochs': n_epochs, 'learning_rate': learning_rate, 'batch_size': batch_size}
+        for dataset, n_epochs, learning_rate, batch_size
+        in itertools.product(datasets, epochs, learning_rates, batch_sizes)
+    ]
+
+def sample_random(datasets, epochs, batch_sizes, lr_range, count, seed=None):
+    """
+    Random search: datasets, epochs and batch sizes are drawn from their
+    lists, the learning rate log-uniformly from lr_range. Duplicates are
+    dropped, so fewer than `count` configs may come back for tiny spaces.
+    """
+    rng = random.Random(seed)
+    low, high = math.log10(lr_range[0]), math.log10(lr_range[1])
+    configs = {}
+    for _ in range(count * 10):
+        if len(configs) >= count:
+            break
+        config = {
+            'dataset': rng.choice(datasets),
+            'n_epochs': rng.choice(epochs),
+            'learning_rate': float(f"{10 ** rng.uniform(low, high):.2e}"),
+            'batch_size': rng.choice(batch_sizes)
+        }
+        configs[json.dumps(config, sort_keys=True)] = config
+    return list(configs.values())
+
+class SweepScheduler:
+    def __init__(self, client, model, suffix, max_concurrent=DEFAULT_QUOTA, monitor=None):
+        """
+        Args:
+            client: FineTuningClient used for uploads and job creation
+            model: Base model name
+            suffix: Model suffix; each run appends -s<NN>
+            max_concurrent: Provider quota of jobs that may be queued/running at once
+            monitor: JobMonitor (default: one polling through `client`)
+        """
+        self.client = client
+        self.model = model
+        self.suffix = suffix
+        self.max_concurrent = max_concurrent
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.monitor = monitor or JobMonitor(fetch_status=client.get_job, registry=client.registry)
+        self.file_ids = {}
+        self.upload_errors = {}
+
+    async def upload_datasets(self, datasets):
+        """
+        Upload each dataset variant once, concurrently (identical earlier uploads are reused).
+        A failed upload only fails the runs on that dataset.
+        """
+        datasets = sorted(set(datasets))
+        results = await asyncio.gather(
+            *(asyncio.to_thread(self.client.upload, dataset) for dataset in datasets), return_exceptions=True
+        )
+        for dataset, result in zip(datasets, results):
+            if isinstance(result, (FineTuningProviderError, OSError)):
+                self.upload_errors[dataset] = str(result)
+                print(f"  ❌ {Path(dataset).name}: upload failed: {result}")
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                self.file_ids[dataset] = result
+                print(f"  ✓ {Path(dataset).name}: {result}")
+
+    async def run_one(self, index, config):
+        """Hold a quota slot from submission until the job reaches a terminal status."""
+        result = dict(config, run=index, dataset=Path(config['dataset']).name)
+        hyperparameters = {k: config[k] for k in ('n_epochs', 'batch_size', 'learning_rate')}
+        if config['dataset'] in self.upload_errors:
+            return dict(result, status='upload_failed', error=self.upload_errors[config['dataset']])
+
+        async with self.semaphore:
+            started = time.monotonic()
+            try:
+                job = await asyncio.to_thread(
+                    self.client.create_job,
+                    self.file_ids[config['dataset']], self.model, f"{self.suffix}-s{index:02d}", hyperparameters
+                )
+            except FineTuningProviderError as e:
+                print(f"  ❌ Run {index:02d}: could not start job: {e}")
+                return dict(result, status='submit_failed', error=str(e))
+
+            note = " (identical job already exists)" if job.get('reused') else ""
+            print(f"  ▶ Run {index:02d}: {job['id']} epochs={config['n_epochs']} "
+                  f"lr={config['learning_rate']:g} batch={config['batch_size']}{note}")
+            record = await self.monitor.watch(job['id'])
+
+        return dict(
+            result,
+            job_id=job['id'],
+            status=record['status'],
+            fine_tuned_model=record.get('fine_tuned_model'),
+            trained_tokens=record.get('trained_tokens'),
+            error=record.get('error'),
+            minutes=round((time.monotonic() - started) / 60, 2),
+            **(record.get('metrics') or {})
+        )
+
+    async def run(self, configs):
+        """Upload datasets and run every configuration; returns one result row per run."""
+        print(f"\nUploading {len(set(c['dataset'] for c in configs))} dataset variant(s)...")
+        await self.upload_datasets(c['dataset'] for c in configs)
+
+        print(f"\nSubmitting {len(configs)} run(s), at most {self.max_concurrent} at a time...")
+        return await asyncio.gather(*(self.run_one(i, config) for i, config in enumerate(configs, 1)))
+
+def print_table(results, sort_metric=SORT_METRIC):
+    """Print runs sorted by sort_metric (missing values last)."""
+    results = sorted(results, key=lambda r: (r.get(sort_metric) is None, r.get(sort_metric) or 0))
+    metric_names = sorted({k for r in results for k in ('train_loss', 'valid_loss') if r.get(k) is not None})
+
+    header = f"{'Run':>4}  {'Dataset':<28} {'Epochs':>6} {'LR':>9} {'Batch':>5}  {'Status':<10}"
+    header += ''.join(f" {name:>10}" for name in metric_names) + f" {'Minutes':>8}"
+    print("\n" + header)
+    print("-" * len(header))
+    for r in results:
+        line = (f"{r['run']:>4}  {r['dataset'][:28]:<28} {r['n_epochs']:>6} {r['learning_rate']:>9.2e} "
+                f"{r['batch_size']:>5}  {r['status']:<10}")
+        line += ''.join(f" {r[name]:>10.4f}" if r.get(name) is not None else f" {'-':>10}" for name in metric_names)
+        line += f" {r.get('minutes', 0):>8.1f}"
+        print(line)
+
+    best = next((r for r in results if r.get(sort_metric) is not None), None)
+    if best:
+        print(f"\n🏆 Best by {sort_metric}: run {best['run']} → {best.get('fine_tuned_model')}")
+    return results
+
+def save_results(results, sweep_dir=SWEEP_DIR):
+    """Write the comparison table as CSV and JSON; returns the CSV path."""
+    sweep_dir.mkdir(parents=True, exist_ok=True)
+    stem = sweep_dir / f"sweep-{time.strftime('%Y%m%d-%H%M%S')}"
+
+    columns = []
+    for r in results:
+        columns.extend(k for k in r if k not in columns)
+    with open(stem.with_suffix('.csv'), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(results)
+    with open(stem.with_suffix('.json'), 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    return stem.with_suffix('.csv')
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fine-tuning hyperparameter sweep")
+    parser.add_argument('--dataset', action='append', required=True, help="Training JSONL (repeat for variants)")
+    parser.add_argument('--epochs', type=int, nargs='+', default=[int(os.getenv('NUM_EPOCHS', '3'))])
+    parser.add_argument('--learning-rate', type=float, nargs='+', default=[float(os.getenv('LEARNING_RATE', '2e-5'))])
+    parser.add_argument('--batch-size', type=int, nargs='+', default=[int(os.getenv('BATCH_SIZE', '4'))])
+    parser.add_argument('--random', type=int, metavar='N', help="Random search with N runs instead of the full grid")
+    parser.add_argument('--lr-range', type=float, nargs=2, default=[5e-6, 1e-4], help="Random search LR bounds")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--max-concurrent', type=int, default=DEFAULT_QUOTA, help="Provider job quota")
+    parser.add_argument('--provider', default=os.getenv('FINE_TUNING_PROVIDER', 'llama-api'),
+                        choices=['llama-api', 'llama-stack', 'mock'])
+    parser.add_argument('--time-scale', type=float, default=0.01, help="Mock provider only: simulated time factor")
+    parser.add_argument('--yes', action='store_true', help="Don't ask before submitting real jobs")
+    args = parser.parse_args()
+
+    if args.random:
+        configs = sample_random(args.dataset, args.epochs, args.batch_size, args.lr_range, args.random, args.seed)
+    else:
+        configs = build_grid(args.dataset, args.epochs, args.learning_rate, args.batch_size)
+
+    print("=" * 70)
+    print(f"Hyperparameter sweep: {len(configs)} run(s) on {args.provider}")
+    print("=" * 70)
+
+    output_dir = Path(__file__).parent.parent / 'outputs'
+    if args.provider == 'mock':
+        provider = create_provider('mock', time_scale=args.time_scale, seed=args.seed)
+        client = FineTuningClient(provider, JobRegistry(output_dir / 'mock_job_registry.json'),
+                                  uploads=UploadRegistry(output_dir / 'mock_upload_registry.json'))
+        # Poll on the simulated clock too
+        interval_scale = args.time_scale
+    else:
+        if not args.yes and input(f"Submit {len(configs)} real fine-tuning jobs? [y/N] ").strip().lower() != 'y':
+            exit(0)
+        client = FineTuningClient(create_provider(args.provider))
+        interval_scale = 1
+
+    monitor = JobMonitor(
+        fetch_status=client.get_job,
+        registry=client.registry,
+        min_interval=MIN_INTERVAL * interval_scale,
+        max_interval=(QUEUED_INTERVAL if args.provider == 'mock' else MAX_INTERVAL) * interval_scale
+    )
+    scheduler = SweepScheduler(
+        client,
+        model=os.getenv('MODEL_NAME', 'llama3.1-8b'),
+        suffix=os.getenv('OUTPUT_MODEL_NAME', 'whatsapp-business-assistant-v1'),
+        max_concurrent=args.max_concurrent,
+        monitor=monitor
+    )
+
+    try:
+        results = asyncio.run(scheduler.run(configs))
+    except KeyboardInterrupt:
+        print("\nStopped. Submitted jobs keep running; see outputs/job_registry.json")
+        exit(1)
+
+    print_table(results)
+    csv_path = save_results(results)
+    print(f"\n✓ Results saved to: {csv_path.relative_to(output_dir.parent)} (+ .json)")
+    client.print_timings()
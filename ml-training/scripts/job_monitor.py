@@ -0,0 +1,287 @@
+"""
+Watch many fine-tuning jobs at once.
+
+Each job is polled in its own asyncio task with an adaptive interval: the
+interval backs off while a job sits in the queue, and shrinks as a running
+job approaches its estimated finish. Status changes are written to the job
+registry, and completion hooks fire once a job reaches a terminal state.
+Succeeded jobs are evaluated against the previous best model
+(auto_evaluate.py) unless --no-eval is given.
+
+Usage:
+    python job_monitor.py                  # all active jobs in the registry + outputs/fine_tuning_job.json
+    python job_monitor.py ftjob-abc ftjob-def
+    python job_monitor.py --once           # one status sweep, then exit
+    python job_monitor.py --no-eval        # don't evaluate finished models
+"""
+
+import argparse
+import asyncio
+import inspect
+import os
+import time
+from pathlib import Path
+
+import requests
+from dotenv import load_dotenv
+
+from auto_evaluate import AutoEvaluator
+from fine_tuning_client import FineTuningProviderError, create_provider
+from job_registry import QUEUED_STATUSES, RUNNING_STATUSES, TERMINAL_STATUSES, JobRegistry
+
+load_dotenv(Path(__file__).parent.parent / '.env')
+
+MIN_INTERVAL = 15       # Seconds between polls when a job is about to finish
+QUEUED_INTERVAL = 60    # First poll interval for a queued job
+RUNNING_INTERVAL = 120  # Poll interval for a running job without progress info
+MAX_INTERVAL = 900
+BACKOFF_FACTOR = 1.5
+MAX_CONSECUTIVE_FAILURES = 5   # Give up on a job after this many failed status checks in a row
+
+class ProviderStatusFetcher:
+    """
+    Fetches job status from the provider each job was created with (the record's
+    `provider`, else $FINE_TUNING_PROVIDER / llama-api), one client per provider.
+    """
+
+    def __init__(self, registry, providers=None):
+        self.registry = registry
+        self.providers = providers or {}
+
+    def provider_for(self, job_id):
+        name = (self.registry.get(job_id) or {}).get('provider') or os.getenv('FINE_TUNING_PROVIDER', 'llama-api')
+        if name not in self.providers:
+            self.providers[name] = create_provider(name)
+        return self.providers[name]
+
+    def __call__(self, job_id):
+        return self.provider_for(job_id).get_job(job_id)
+
+def is_permanent(error):
+    """Whether a failed status check can't succeed on retry (unknown job id, revoked key, bad request)."""
+    if isinstance(error, FineTuningProviderError):
+        return not error.retryable and error.status_code is not None
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return 400 <= error.response.status_code < 500 and error.response.status_code not in (408, 429)
+    return False
+
+class PollSchedule:
+    """Adaptive poll interval for one job."""
+
+    def __init__(self, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min(QUEUED_INTERVAL, max_interval)
+        self.last_progress = None  # (timestamp, percent)
+
+    def clamp(self, seconds):
+        return max(self.min_interval, min(self.max_interval, seconds))
+
+    def next_interval(self, status, progress=None):
+        """
+        Work out how long to wait before the next poll.
+
+        Queued: grow the interval geometrically. Running with progress: wait
+        about a quarter of the estimated remaining time, so polls get more
+        frequent near the end. Running without progress: fixed interval.
+        """
+        if status in QUEUED_STATUSES:
+            self.interval = self.clamp(self.interval * BACKOFF_FACTOR)
+            return self.interval
+
+        if status in RUNNING_STATUSES and progress is not None:
+            current = (time.monotonic(), float(progress))
+            previous = self.last_progress
+            self.last_progress = current
+
+            if previous and current[1] > previous[1]:
+                rate = (current[1] - previous[1]) / (current[0] - previous[0])
+                remaining = (100 - current[1]) / rate
+                self.interval = self.clamp(remaining / 4)
+            else:
+                self.interval = self.clamp(RUNNING_INTERVAL * (1 - current[1] / 100))
+            return self.interval
+
+        self.interval = self.clamp(RUNNING_INTERVAL)
+        return self.interval
+
+    def error_interval(self):
+        """Back off after a failed status fetch."""
+        self.interval = self.clamp(self.interval * 2)
+        return self.interval
+
+class JobMonitor:
+    def __init__(self, fetch_status=None, registry=None, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL):
+        """
+        Args:
+            fetch_status: Callable job_id -> status dict (blocking calls run in a thread;
+                          coroutine functions are awaited directly). Default: each job's
+                          own provider (ProviderStatusFetcher)
+            registry: JobRegistry to record status changes in
+            min_interval, max_interval: Bounds for the adaptive poll interval
+        """
+        self.registry = registry or JobRegistry()
+        self.fetch_status = fetch_status or ProviderStatusFetcher(self.registry)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.completion_hooks = []
+        self.change_hooks = []
+        self.results = {}
+
+    def on_complete(self, hook):
+        """Register hook(job_record) to run when a job reaches a terminal status."""
+        self.completion_hooks.append(hook)
+        return hook
+
+    def on_change(self, hook):
+        """Register hook(job_record) to run on every status change."""
+        self.change_hooks.append(hook)
+        return hook
+
+    async def call_hooks(self, hooks, record):
+        for hook in hooks:
+            try:
+                result = hook(record)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                print(f"  ⚠️  Hook {getattr(hook, '__name__', hook)} failed for {record['job_id']}: {e}")
+
+    async def fetch(self, job_id):
+        if inspect.iscoroutinefunction(self.fetch_status):
+            return await self.fetch_status(job_id)
+        return await asyncio.to_thread(self.fetch_status, job_id)
+
+    async def check_once(self, job_id):
+        """Fetch one status, record it, and fire hooks. Returns the job record."""
+        data = await self.fetch(job_id)
+        status = data.get('status', 'unknown')
+        record, changed = self.registry.update(
+            job_id,
+            status=status,
+            progress=data.get('progress'),
+            model=data.get('model'),
+            fine_tuned_model=data.get('fine_tuned_model'),
+            trained_tokens=data.get('trained_tokens'),
+            metrics=data.get('metrics'),
+            error=data.get('error')
+        )
+
+        if changed:
+            self.registry.update_job_file(record)
+            print(f"[{time.strftime('%H:%M:%S')}] {job_id}: {status}"
+                  + (f" ({data['progress']}%)" if data.get('progress') is not None else ""))
+            await self.call_hooks(self.change_hooks, record)
+            if status in TERMINAL_STATUSES:
+                await self.call_hooks(self.completion_hooks, record)
+        return record
+
+    async def watch(self, job_id, max_failures=MAX_CONSECUTIVE_FAILURES):
+        """
+        Poll one job until it reaches a terminal status. After `max_failures` failed checks
+        in a row, or one that can't succeed on retry (e.g. 404), the job is given up on: the
+        error is recorded as monitor_error and its last known record returned.
+        """
+        schedule = PollSchedule(self.min_interval, self.max_interval)
+        failures = 0
+        while True:
+            try:
+                record = await self.check_once(job_id)
+            except Exception as e:
+                failures += 1
+                if failures >= max_failures or is_permanent(e):
+                    print(f"[{time.strftime('%H:%M:%S')}] {job_id}: status check failed ({e}), giving up")
+                    record, _ = self.registry.update(job_id, monitor_error=str(e))
+                    self.results[job_id] = record
+                    return record
+                delay = schedule.error_interval()
+                print(f"[{time.strftime('%H:%M:%S')}] {job_id}: status check failed ({e}), retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            failures = 0
+            if record.get('monitor_error'):
+                record, _ = self.registry.update(job_id, monitor_error='')
+
+            if record['status'] in TERMINAL_STATUSES:
+                self.results[job_id] = record
+                return record
+
+            await asyncio.sleep(schedule.next_interval(record['status'], record.get('progress')))
+
+    async def watch_all(self, job_ids):
+        """Watch several jobs concurrently; returns {job_id: final record}."""
+        await asyncio.gather(*(self.watch(job_id) for job_id in job_ids))
+        return self.results
+
+    async def sweep(self, job_ids):
+        """Check every job once, concurrently."""
+        records = await asyncio.gather(*(self.check_once(job_id) for job_id in job_ids), return_exceptions=True)
+        return dict(zip(job_ids, records))
+
+def print_summary(results):
+    print("\n" + "=" * 70)
+    print("Job summary")
+    print("=" * 70)
+    for job_id, record in results.items():
+        if isinstance(record, Exception):
+            print(f"  ❌ {job_id}: {record}")
+            continue
+        if record.get('monitor_error'):
+            print(f"  ❌ {job_id}: {record['status']}, stopped watching: {record['monitor_error']}")
+            continue
+        icon = {'succeeded': '🎉', 'failed': '❌', 'cancelled': '⛔'}.get(record['status'], '⏳')
+        line = f"  {icon} {job_id}: {record['status']}"
+        if record.get('fine_tuned_model'):
+            line += f" → {record['fine_tuned_model']}"
+        print(line)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monitor fine-tuning jobs concurrently")
+    parser.add_argument('job_ids', nargs='*', help="Job ids (default: active jobs in the registry)")
+    parser.add_argument('--once', action='store_true', help="Check each job once and exit")
+    parser.add_argument('--min-interval', type=float, default=MIN_INTERVAL)
+    parser.add_argument('--max-interval', type=float, default=MAX_INTERVAL)
+    parser.add_argument('--no-eval', action='store_true', help="Don't evaluate models when their jobs succeed")
+    args = parser.parse_args()
+
+    registry = JobRegistry()
+    job_ids = args.job_ids
+    if not job_ids:
+        registry.import_job_file()
+        job_ids = [job['job_id'] for job in registry.active_jobs()]
+
+    if not job_ids:
+        print("❌ No jobs to monitor")
+        print("Usage: python job_monitor.py <job_id> [<job_id> ...]")
+        exit(1)
+
+    monitor = JobMonitor(registry=registry, min_interval=args.min_interval, max_interval=args.max_interval)
+
+    @monitor.on_complete
+    def announce(record):
+        if record['status'] == 'succeeded':
+            print(f"\n🎉 {record['job_id']} finished: {record.get('fine_tuned_model')}")
+        else:
+            print(f"\n❌ {record['job_id']} ended with status {record['status']}: {record.get('error', '')}")
+
+    evaluator = None
+    if not args.no_eval:
+        evaluator = AutoEvaluator(registry)
+        monitor.on_complete(evaluator.on_complete)
+
+    async def run():
+        if args.once:
+            results = await monitor.sweep(job_ids)
+        else:
+            results = await monitor.watch_all(job_ids)
+        if evaluator:
+            await evaluator.drain()
+        return results
+
+    print(f"Monitoring {len(job_ids)} job(s): {', '.join(job_ids)}\n")
+    try:
+        results = asyncio.run(run())
+        print_summary(results)
+    except KeyboardInterrupt:
+        print("\nStopped. Job states are saved in outputs/job_registry.json")
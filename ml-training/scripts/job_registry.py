@@ -0,0 +1,165 @@
+"""
+Local registry of fine-tuning jobs.
+
+Every job the tooling starts or watches is kept in outputs/job_registry.json
+with its latest status and a history of status changes, so monitors,
+webhooks and evaluation hooks share one view of what is running. Updates
+from several processes are serialized with a lock file next to the registry.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads within one process are serialized
+    fcntl = None
+
+OUTPUT_DIR = Path(__file__).parent.parent / 'outputs'
+REGISTRY_FILE = OUTPUT_DIR / 'job_registry.json'
+JOB_FILE = OUTPUT_DIR / 'fine_tuning_job.json'
+
+TERMINAL_STATUSES = {'succeeded', 'failed', 'cancelled'}
+QUEUED_STATUSES = {'pending', 'queued', 'validating_files', 'created'}
+RUNNING_STATUSES = {'running', 'in_progress'}
+
+def now():
+    return time.strftime('%Y-%m-%d %H:%M:%S')
+
+class JobRegistry:
+    def __init__(self, path=REGISTRY_FILE):
+        """Load the registry (an empty one if the file does not exist yet)."""
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + '.lock')
+        self.lock = threading.RLock()
+        self.jobs = {}
+        self.loaded_version = None
+        self.reload()
+
+    @contextmanager
+    def locked(self):
+        """Hold the registry across threads and processes for a reload -> change -> save."""
+        with self.lock:
+            if fcntl is None:
+                yield
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def reload(self):
+        """Re-read the file if another process (a tuner, webhook receiver, monitor) changed it."""
+        with self.lock:
+            try:
+                stat = self.path.stat()
+            except FileNotFoundError:
+                return
+            # Every save replaces the file, so the inode changes even within one mtime tick
+            version = (stat.st_ino, stat.st_mtime_ns)
+            if version != self.loaded_version:
+                with open(self.path, 'r') as f:
+                    self.jobs = json.load(f).get('jobs', {})
+                self.loaded_version = version
+
+    def save(self):
+        """Write the registry atomically (callers hold locked())."""
+        with self.lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile('w', dir=self.path.parent, prefix=self.path.stem + '.',
+                                             suffix='.tmp', delete=False) as f:
+                json.dump({'jobs': self.jobs}, f, indent=2)
+            try:
+                os.replace(f.name, self.path)
+            except OSError:
+                os.unlink(f.name)
+                raise
+            stat = self.path.stat()
+            self.loaded_version = (stat.st_ino, stat.st_mtime_ns)
+
+    def get(self, job_id):
+        self.reload()
+        return self.jobs.get(job_id)
+
+    def update(self, job_id, status=None, **fields):
+        """
+        Create or update a job record and save the registry.
+
+        Returns:
+            (record, status_changed)
+        """
+        with self.locked():
+            self.reload()
+            record = self.jobs.setdefault(job_id, {
+                'job_id': job_id,
+                'status': None,
+                'created_at': now(),
+                'history': []
+            })
+            record.update({k: v for k, v in fields.items() if v is not None})
+
+            status_changed = status is not None and status != record['status']
+            if status_changed:
+                record['status'] = status
+                record['history'].append({'status': status, 'at': now()})
+            record['updated_at'] = now()
+
+            self.save()
+            return dict(record), status_changed
+
+    def active_jobs(self):
+        """Jobs that have not reached a terminal status."""
+        self.reload()
+        return [job for job in self.jobs.values() if job.get('status') not in TERMINAL_STATUSES]
+
+    def import_job_file(self, path=JOB_FILE):
+        """Register the job saved by the fine-tuning scripts in outputs/fine_tuning_job.json."""
+        path = Path(path)
+        if not path.exists():
+            return None
+        with open(path, 'r') as f:
+            job_info = json.load(f)
+
+        job_id = job_info.get('job_id')
+        if not job_id:
+            return None
+        if job_id not in self.jobs:
+            self.update(
+                job_id,
+                status=(job_info.get('response') or {}).get('status', 'pending'),
+                file_id=job_info.get('file_id'),
+                model=job_info.get('model') or job_info.get('model_name'),
+                suffix=job_info.get('suffix') or job_info.get('output_model_name')
+            )
+        return job_id
+
+    def update_job_file(self, record, path=JOB_FILE):
+        """Mirror a job's latest state into outputs/fine_tuning_job.json if that file tracks it."""
+        path = Path(path)
+        if not path.exists():
+            return False
+        with open(path, 'r') as f:
+            job_info = json.load(f)
+        if job_info.get('job_id') != record['job_id']:
+            return False
+
+        response = job_info.setdefault('response', {}) or {}
+        for key in ('status', 'fine_tuned_model', 'trained_tokens', 'error'):
+            if record.get(key) is not None:
+                response[key] = record[key]
+        job_info['response'] = response
+        job_info['updated_at'] = now()
+
+        temp_path = path.with_suffix('.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump(job_info, f, indent=2)
+        temp_path.replace(path)
+        return True
@@ -0,0 +1,404 @@
+"""
+Load test a chat completions endpoint by replaying recorded request payloads.
+
+Payloads are replayed as recorded (system prompt, conversation history and
+sampling settings included), cycling through the file. Each stage runs for
+a fixed time, either:
+
+    --rate R          open loop: requests start on schedule (Poisson or evenly spaced
+                      arrivals) whether or not earlier ones have finished
+    --concurrency N   closed loop: N workers each send the next request as soon
+                      as their previous one finishes
+
+Open-loop latency is measured from when a request was due, not when it was
+actually sent, so a client that falls behind doesn't hide queueing.
+Each stage reports throughput, latency/TTFT percentiles and a latency
+histogram; the run reports the first stage that saturates (throughput
+falls behind the offered rate or stops scaling, latency blows up, errors
+or dropped requests) and the highest load that didn't.
+
+Payload files can be:
+    test_llama_api.sh style curl commands (the JSON after -d)
+    JSONL of request bodies ({"model", "messages", "temperature", ...}), evaluation
+    prompts ({"query": ...}) or chat examples (sent without their final assistant turn)
+
+Usage:
+    python load_generator.py --payloads ../test_llama_api.sh --rate 1 2 5 10 --duration 30
+    python load_generator.py --payloads prompts.jsonl --concurrency 1 4 16 64 --duration 20
+
+    # Offline against the mock server
+    python mock_chat_server.py --profile llama-api --max-concurrency 16 &
+    python load_generator.py --payloads ../test_llama_api.sh --rate 10 20 40 80 \\
+        --base-url http://127.0.0.1:8768 --duration 10
+"""
+
+import argparse
+import asyncio
+import bisect
+import itertools
+import json
+import os
+import random
+import re
+import time
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from chat_client import ChatClient
+from evaluation_harness import RunStats, percentile, read_lines, reserve_path, to_messages
+from test_fine_tuned_model import TEST_QUERIES
+
+load_dotenv(Path(__file__).parent.parent / '.env')
+
+LOAD_TEST_DIR = Path(__file__).parent.parent / 'outputs' / 'load_tests'
+DEFAULT_DURATION = 30
+DEFAULT_MAX_IN_FLIGHT = 1024
+HISTOGRAM_BOUNDS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)  # Seconds; one more bucket above the last
+HISTOGRAM_WIDTH = 40
+
+# A stage is saturated when any of these is exceeded
+SATURATION_THROUGHPUT = 0.9   # Open loop: throughput below this fraction of the offered rate
+MIN_SCALING = 0.25            # Closed loop: throughput grew less than this fraction of the concurrency increase
+SATURATION_LATENCY = 3.0      # p95 latency this many times that of the lightest stage
+SATURATION_ERROR_RATE = 0.05
+MIN_THROUGHPUT_SAMPLES = 20   # Fewer successful requests in a stage are too few to judge its throughput
+
+CURL_DATA = re.compile(r"(?:-d|--data(?:-raw|-binary)?)\s+'(.*)'", re.DOTALL)
+# Prompt-file fields that describe the prompt rather than belong in the request
+PROMPT_FIELDS = {'id', 'topic', 'query', 'prompt', 'system', 'messages'}
+
+def curl_bodies(text):
+    """JSON bodies of the curl commands in a shell script (everything between -d ' and the last quote)."""
+    bodies = []
+    for command in text.split('curl ')[1:]:
+        match = CURL_DATA.search(command)
+        if match:
+            bodies.append(json.loads(match.group(1)))
+    return bodies
+
+def to_payload(data):
+    """Request parts of one recorded body or prompt line: messages plus every other request field."""
+    if isinstance(data, str):
+        data = {'query': data}
+    params = {key: value for key, value in data.items() if key not in PROMPT_FIELDS}
+    return {'messages': to_messages(data), 'params': params}
+
+def load_payloads(path=None, limit=None):
+    """
+    Payloads from a curl script or JSONL file, or the built-in test queries.
+
+    Returns:
+        List of {'messages', 'params'} dicts; bad lines are reported and skipped
+    """
+    if path and str(path).endswith('.sh'):
+        with open(path, 'r', encoding='utf-8') as f:
+            records = curl_bodies(f.read())
+    elif path:
+        records = read_lines(path)
+    else:
+        records = TEST_QUERIES
+
+    payloads = []
+    for number, record in enumerate(records, 1):
+        if limit and len(payloads) >= limit:
+            break
+        try:
+            payloads.append(to_payload(json.loads(record) if path and isinstance(record, str) else record))
+        except (ValueError, AttributeError) as e:
+            print(f"  ⚠️  Skipping payload {number}: {e}")
+    return payloads
+
+class StageStats(RunStats):
+    """RunStats plus what a load stage needs: drops, schedule lag, arrival and completion spans and a histogram."""
+
+    def __init__(self):
+        super().__init__()
+        self.scheduled = 0
+        self.first_due = None
+        self.last_due = None
+        self.dropped = 0
+        self.lag = []
+        self.first_done = None
+        self.last_done = None
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+
+    def add(self, result):
+        super().add(result)
+        if result['error']:
+            return
+        now = time.perf_counter()
+        self.first_done = self.first_done or now
+        self.last_done = now
+        self.histogram[bisect.bisect_left(HISTOGRAM_BOUNDS, result['latency'])] += 1
+
+    def schedule(self, due):
+        self.scheduled += 1
+        self.first_due = self.first_due or due
+        self.last_due = due
+
+    def throughput(self, seconds):
+        """Successful requests per second, over the span in which they completed."""
+        succeeded = self.requests - sum(self.errors.values())
+        span = self.last_done - self.first_done if self.first_done else 0
+        if succeeded > 1 and span > 0:
+            return (succeeded - 1) / span
+        return succeeded / seconds if seconds else 0
+
+    def offered_rate(self, seconds):
+        """Requests scheduled per second, over the span in which they were due (same estimator as throughput)."""
+        span = self.last_due - self.first_due if self.first_due else 0
+        if self.scheduled > 1 and span > 0:
+            return (self.scheduled - 1) / span
+        return self.scheduled / seconds if seconds else 0
+
+    def summary(self, seconds):
+        summary = super().summary(seconds)
+        lag = sorted(self.lag)
+        summary.update(
+            scheduled=self.scheduled,
+            dropped=self.dropped,
+            throughput=round(self.throughput(seconds), 2),
+            completion_tokens_per_second=round(self.completion_tokens / seconds, 1) if seconds else None,
+            schedule_lag_p99=round(percentile(lag, 99), 4) if lag else None,
+            histogram=dict(zip([f"<={bound}s" for bound in HISTOGRAM_BOUNDS] + [f">{HISTOGRAM_BOUNDS[-1]}s"],
+                               self.histogram))
+        )
+        return summary
+
+class LoadGenerator:
+    def __init__(self, client, payloads, model=None, max_tokens=500, temperature=0.7, stream=True,
+                 max_in_flight=DEFAULT_MAX_IN_FLIGHT, seed=None):
+        """
+        Args:
+            client: ChatClient; its pool should allow max_in_flight connections
+            payloads: List from load_payloads(), replayed in a cycle
+            model: Model for every request (default: each payload's recorded model)
+            max_tokens, temperature, stream: Used where a payload didn't record them
+            max_in_flight: Open loop: requests due while this many are outstanding are dropped
+            seed: Seed for Poisson arrivals
+        """
+        self.client = client
+        self.payloads = itertools.cycle(payloads)
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.stream = stream
+        self.max_in_flight = max_in_flight
+        self.random = random.Random(seed)
+
+    async def send(self, payload, stats, due):
+        params = dict(payload['params'])
+        recorded_model = params.pop('model', None)
+        # A recorded max_completion_tokens stands in for max_tokens
+        default_max_tokens = None if 'max_completion_tokens' in params else self.max_tokens
+        result = await self.client.complete(
+            self.model or recorded_model, payload['messages'],
+            params.pop('max_tokens', default_max_tokens),
+            params.pop('temperature', self.temperature),
+            stream=params.pop('stream', self.stream) and self.stream,
+            started=due,
+            **params
+        )
+        stats.add(result)
+
+    async def run_rate(self, rate, duration, poisson=True):
+        """Open loop: start requests at `rate` per second for `duration` seconds, then wait for them."""
+        stats = StageStats()
+        in_flight = set()
+        started = time.perf_counter()
+        due = started
+        while due < started + duration:
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            stats.schedule(due)
+            stats.lag.append(time.perf_counter() - due)
+            if len(in_flight) >= self.max_in_flight:
+                stats.dropped += 1
+            else:
+                task = asyncio.create_task(self.send(next(self.payloads), stats, due))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+            due += self.random.expovariate(rate) if poisson else 1 / rate
+        if in_flight:
+            await asyncio.wait(in_flight)
+        summary = stats.summary(time.perf_counter() - started)
+        summary.update(level=rate, offered_rate=round(stats.offered_rate(duration), 2))
+        return summary
+
+    async def run_concurrency(self, concurrency, duration):
+        """Closed loop: `concurrency` workers send back-to-back requests for `duration` seconds."""
+        stats = StageStats()
+        started = time.perf_counter()
+
+        async def worker():
+            while time.perf_counter() < started + duration:
+                stats.scheduled += 1
+                await self.send(next(self.payloads), stats, time.perf_counter())
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        summary = stats.summary(time.perf_counter() - started)
+        summary.update(level=concurrency, offered_rate=None)
+        return summary
+
+def saturation_reasons(stage, baseline, previous, mode):
+    """Why a stage counts as saturated (empty list: it kept up)."""
+    reasons = []
+    if stage['error_rate'] > SATURATION_ERROR_RATE:
+        reasons.append(f"error rate {stage['error_rate']:.1%}")
+    if stage['dropped']:
+        reasons.append(f"{stage['dropped']:,} requests dropped at the in-flight limit")
+    # Throughput needs enough requests to be told apart from arrival jitter
+    measurable = stage['succeeded'] >= MIN_THROUGHPUT_SAMPLES
+    if (mode == 'rate' and measurable
+            and stage['throughput'] < stage['offered_rate'] * SATURATION_THROUGHPUT):
+        reasons.append(f"throughput {stage['throughput']:.1f}/s behind offered {stage['offered_rate']:.1f}/s")
+    if (mode == 'concurrency' and measurable and previous and previous['throughput']
+            and previous['succeeded'] >= MIN_THROUGHPUT_SAMPLES):
+        expected = 1 + (stage['level'] / previous['level'] - 1) * MIN_SCALING
+        if stage['throughput'] < previous['throughput'] * expected:
+            reasons.append(f"throughput {stage['throughput']:.1f}/s stopped scaling "
+                           f"(was {previous['throughput']:.1f}/s at {previous['level']})")
+    stage_p95 = (stage['latency'] or {}).get('p95')
+    baseline_p95 = (baseline['latency'] or {}).get('p95') if baseline is not stage else None
+    if stage_p95 and baseline_p95 and stage_p95 > baseline_p95 * SATURATION_LATENCY:
+        reasons.append(f"p95 latency {stage_p95:.2f}s is {stage_p95 / baseline_p95:.1f}x the lightest load")
+    return reasons
+
+def find_saturation(stages, mode):
+    """Mark every stage with its saturation reasons and summarize where the endpoint saturates."""
+    previous = None
+    for stage in stages:
+        stage['saturated'] = saturation_reasons(stage, stages[0], previous, mode)
+        previous = stage
+    first = next((stage for stage in stages if stage['saturated']), None)
+    sustained = [stage for stage in stages if not stage['saturated'] and (not first or stage['level'] < first['level'])]
+    return {
+        'saturated_at': first['level'] if first else None,
+        'reasons': first['saturated'] if first else [],
+        'max_sustained': sustained[-1]['level'] if sustained else None,
+        'peak_throughput': max((stage['throughput'] for stage in stages), default=None)
+    }
+
+def print_histogram(histogram):
+    peak = max(histogram.values()) or 1
+    for label, count in histogram.items():
+        if count:
+            print(f"    {label:>8} {'█' * max(1, round(count / peak * HISTOGRAM_WIDTH)):<{HISTOGRAM_WIDTH}} {count:,}")
+
+def print_report(report):
+    mode = report['mode']
+    unit = 'req/s' if mode == 'rate' else 'workers'
+    print("\n" + "=" * 100)
+    print(f"Load test: {report['model'] or 'recorded models'} at {report['base_url']} ({mode}, "
+          f"{report['duration']}s per stage, {report['payloads']} payloads)")
+    print("=" * 100)
+    print(f"{'Load':>10}{'Sent':>8}{'OK':>8}{'Err':>6}{'Drop':>6}{'Thru/s':>9}{'p50':>8}{'p95':>8}{'p99':>8}"
+          f"{'TTFT p95':>10}{'Tok/s':>9}  Saturated")
+    print("-" * 100)
+
+    def seconds(stats, key):
+        return f"{stats[key]:.2f}" if stats else '-'
+
+    for stage in report['stages']:
+        latency, ttft = stage['latency'], stage['ttft']
+        print(f"{stage['level']:>10g}{stage['requests']:>8,}{stage['succeeded']:>8,}{stage['errors']:>6,}"
+              f"{stage['dropped']:>6,}{stage['throughput']:>9.1f}{seconds(latency, 'p50'):>8}"
+              f"{seconds(latency, 'p95'):>8}{seconds(latency, 'p99'):>8}{seconds(ttft, 'p95'):>10}"
+              f"{stage['completion_tokens_per_second'] or 0:>9.0f}  {'yes' if stage['saturated'] else 'no'}")
+
+    few = [f"{stage['level']:g}" for stage in report['stages'] if stage['succeeded'] < MIN_THROUGHPUT_SAMPLES]
+    if few:
+        print(f"  Throughput not judged at {', '.join(few)} {unit}: fewer than {MIN_THROUGHPUT_SAMPLES} "
+              f"successful requests (use a longer --duration)")
+
+    for stage in report['stages']:
+        print(f"\n  Latency at {stage['level']:g} {unit}:")
+        print_histogram(stage['histogram'])
+
+    saturation = report['saturation']
+    print()
+    if saturation['saturated_at'] is not None:
+        print(f"⚠️  Saturates at {saturation['saturated_at']:g} {unit}: {'; '.join(saturation['reasons'])}")
+        if saturation['max_sustained'] is not None:
+            print(f"   Highest load sustained: {saturation['max_sustained']:g} {unit}")
+    else:
+        print(f"✓ No saturation up to {report['stages'][-1]['level']:g} {unit}")
+    print(f"Peak throughput: {saturation['peak_throughput']:.1f} req/s")
+
+async def main(args, payloads):
+    mode = 'rate' if args.rate else 'concurrency'
+    levels = args.rate or args.concurrency
+    max_connections = args.max_in_flight if mode == 'rate' else max(args.concurrency)
+
+    async with ChatClient(args.base_url, max_connections=max_connections, timeout=args.timeout) as client:
+        generator = LoadGenerator(client, payloads, args.model, args.max_tokens, args.temperature,
+                                  stream=not args.no_stream, max_in_flight=args.max_in_flight, seed=args.seed)
+        stages = []
+        for level in levels:
+            print(f"▶ {level:g} {'req/s' if mode == 'rate' else 'workers'} for {args.duration}s...")
+            if mode == 'rate':
+                stage = await generator.run_rate(level, args.duration, poisson=args.arrivals == 'poisson')
+            else:
+                stage = await generator.run_concurrency(level, args.duration)
+            stages.append(stage)
+            print(f"  {stage['requests']:,} requests, {stage['errors']:,} errors, {stage['throughput']:.1f} req/s, "
+                  f"p95 {stage['latency']['p95'] if stage['latency'] else '-'}s")
+        base_url = client.base_url
+
+    report = {
+        'mode': mode,
+        'model': args.model,
+        'base_url': base_url,
+        'payload_file': args.payloads,
+        'payloads': len(payloads),
+        'duration': args.duration,
+        'arrivals': args.arrivals if mode == 'rate' else None,
+        'stream': not args.no_stream,
+        'stages': stages,
+        'saturation': find_saturation(stages, mode)
+    }
+    print_report(report)
+
+    slug = re.sub(r'[^A-Za-z0-9._-]+', '_', args.model or Path(args.payloads or 'test_queries').stem)[-80:]
+    report_path = reserve_path(LOAD_TEST_DIR, f"{slug}-{mode}", '.json')
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"✓ Report: {report_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded chat payloads at increasing load")
+    parser.add_argument('--payloads', help="curl script or JSONL payloads (default: the built-in test queries)")
+    parser.add_argument('--limit', type=int, help="Only the first N payloads")
+    load = parser.add_mutually_exclusive_group(required=True)
+    load.add_argument('--rate', type=float, nargs='+', help="Open loop: requests per second, one stage each")
+    load.add_argument('--concurrency', type=int, nargs='+', help="Closed loop: concurrent workers, one stage each")
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help="Seconds per stage")
+    parser.add_argument('--arrivals', choices=['poisson', 'constant'], default='poisson')
+    parser.add_argument('--max-in-flight', type=int, default=DEFAULT_MAX_IN_FLIGHT)
+    parser.add_argument('--model', help="Override the recorded model (default: recorded, else FINE_TUNED_MODEL_ID)")
+    parser.add_argument('--base-url', help="API base URL (default: LLAMA_API_URL)")
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--max-tokens', type=int, default=500, help="For payloads that don't set one")
+    parser.add_argument('--temperature', type=float, default=0.7, help="For payloads that don't set one")
+    parser.add_argument('--no-stream', action='store_true', help="Non-streaming requests (no TTFT)")
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    payloads = load_payloads(args.payloads, args.limit)
+    if not payloads:
+        print("❌ No payloads to replay")
+        exit(1)
+    unmodelled = [payload for payload in payloads if not payload['params'].get('model')]
+    if unmodelled and not args.model:
+        if not os.getenv('FINE_TUNED_MODEL_ID'):
+            print("❌ Some payloads have no model; pass --model or set FINE_TUNED_MODEL_ID")
+            exit(1)
+        for payload in unmodelled:
+            payload['params']['model'] = os.getenv('FINE_TUNED_MODEL_ID')
+    print(f"Replaying {len(payloads):,} payload(s) from {args.payloads or 'the built-in test queries'}")
+    try:
+        asyncio.run(main(args, payloads))
+    except KeyboardInterrupt:
+        print("\nStopped.")
@@ -0,0 +1,129 @@
+"""
+Small HTTP server layer for the local helper services, built on aiohttp.
+
+The bookmarklet receiver, webhook receiver and mock servers write plain
+`async handler(request) -> HTTPResponse` functions; this module runs them
+on an aiohttp server, which takes care of HTTP itself (keep-alive, chunked
+bodies, limits). Request bodies are handed over as sent, still compressed
+if the client compressed them.
+"""
+
+import asyncio
+import json
+from http import HTTPStatus
+from urllib.parse import parse_qsl, urlsplit
+
+from aiohttp import web
+
+MAX_BODY_BYTES = 512 * 1024 * 1024
+SHUTDOWN_TIMEOUT = 5  # Seconds in-flight requests get to finish when the server stops
+
+class HTTPError(Exception):
+    """Raised by request parsing or handlers to send an error status."""
+
+    def __init__(self, status, message=None):
+        super().__init__(message or HTTPStatus(status).phrase)
+        self.status = status
+        self.message = message or HTTPStatus(status).phrase
+
+class HTTPRequest:
+    def __init__(self, method, target, headers, body):
+        self.method = method
+        self.target = target
+        self.headers = headers  # Lower-cased header names
+        self.body = body
+
+        parts = urlsplit(target)
+        self.path = parts.path
+        self.query = dict(parse_qsl(parts.query))
+
+    def json(self):
+        """Decode the body as JSON, raising a 400 on bad input."""
+        try:
+            return json.loads(self.body or b'null')
+        except (ValueError, UnicodeDecodeError) as e:
+            raise HTTPError(400, f"Invalid JSON body: {e}")
+
+class HTTPResponse:
+    def __init__(self, status=200, body=b'', headers=None, content_type='text/plain; charset=utf-8'):
+        """
+        Args:
+            status: HTTP status code
+            body: bytes, str, or an async iterator of bytes (sent chunked)
+            headers: Extra response headers
+            content_type: Content-Type header value
+        """
+        self.status = status
+        self.body = body.encode('utf-8') if isinstance(body, str) else body
+        self.headers = dict(headers or {})
+        self.headers.setdefault('Content-Type', content_type)
+
+def json_response(data, status=200, headers=None):
+    """Build a JSON response."""
+    body = json.dumps(data).encode('utf-8')
+    return HTTPResponse(status, body, headers, content_type='application/json')
+
+async def send_response(request, response):
+    """Turn an HTTPResponse into an aiohttp response, streaming async-iterator bodies chunked."""
+    if isinstance(response.body, (bytes, bytearray)):
+        return web.Response(status=response.status, body=response.body, headers=response.headers)
+
+    stream = web.StreamResponse(status=response.status, headers=response.headers)
+    stream.enable_chunked_encoding()
+    await stream.prepare(request)
+    try:
+        async for chunk in response.body:
+            if chunk:
+                await stream.write(chunk)
+        await stream.write_eof()
+    except ConnectionError:
+        pass  # The client went away mid-stream
+    return stream
+
+def make_request_handler(handler):
+    """Wrap an `async handler(request) -> HTTPResponse` into an aiohttp request handler."""
+
+    async def handle_request(request):
+        try:
+            body = await request.read()
+            headers = {name.lower(): value for name, value in request.headers.items()}
+            response = await handler(HTTPRequest(request.method, request.raw_path, headers, body))
+        except HTTPError as e:
+            response = json_response({'error': e.message}, status=e.status)
+        except web.HTTPException as e:  # Raised by aiohttp itself, e.g. a body over MAX_BODY_BYTES
+            response = json_response({'error': e.reason}, status=e.status)
+        except Exception as e:
+            response = json_response({'error': str(e)}, status=500)
+        return await send_response(request, response)
+
+    return handle_request
+
+class LocalServer:
+    def __init__(self, runner):
+        self.runner = runner
+
+    async def serve_forever(self):
+        """Serve until cancelled (e.g. by Ctrl+C), then stop."""
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        """Stop listening and close connections once in-flight requests finish (up to SHUTDOWN_TIMEOUT)."""
+        await self.runner.cleanup()
+
+async def start_server(handler, host='127.0.0.1', port=0):
+    """
+    Start serving `handler` on host:port (port 0 picks a free port).
+
+    Returns:
+        (LocalServer, port)
+    """
+    app = web.Application(client_max_size=MAX_BODY_BYTES)
+    app.router.add_route('*', '/{path:.*}', make_request_handler(handler))
+    runner = web.AppRunner(app, access_log=None, auto_decompress=False, shutdown_timeout=SHUTDOWN_TIMEOUT)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    return LocalServer(runner), runner.addresses[0][1]
@@ -1,14 +1,22 @@
 import json
 
-def convert_manual_articles_to_jsonl(input_json, output_jsonl):
+from chunk_articles import DEFAULT_OVERLAP_TOKENS, iter_passage_articles
+
+def convert_manual_articles_to_jsonl(input_json, output_jsonl, max_tokens=None, overlap_tokens=DEFAULT_OVERLAP_TOKENS):
     """
     Convert manually created help articles to JSONL training format.
+
+    With max_tokens set, long articles are split into passages under that
+    token budget and each passage becomes its own example.
     """
     with open(input_json, 'r', encoding='utf-8') as f:
         articles = json.load(f)
 
+    entries = iter_passage_articles(articles, max_tokens, overlap_tokens) if max_tokens else articles
+
+    count = 0
     with open(output_jsonl, 'w', encoding='utf-8') as f:
-        for article in articles:
+        for article in entries:
             title = article['title']
             content = article['content']
             category = article.get('category', 'General')
@@ -36,9 +44,12 @@ def convert_manual_articles_to_jsonl(input_json, output_jsonl):
                     "intent": intent
                 }
             }
+            if 'passage_id' in article:
+                entry['metadata']['passage_id'] = article['passage_id']
             f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            count += 1
 
-    print(f"Converted {len(articles)} manual articles to JSONL")
+    print(f"Converted {len(articles)} manual articles to {count} JSONL examples")
     print(f"Output: {output_jsonl}")
 
 def merge_training_datasets(datasets, output_file):
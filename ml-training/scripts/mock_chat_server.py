@@ -0,0 +1,220 @@
+"""
+Local OpenAI-compatible chat completions server for offline evaluation runs.
+
+Answers POST /chat/completions (also under /v1) with a canned reply, either
+as one JSON response or, with "stream": true, as server-sent events, one
+token per event. Time-to-first-token, token rate and an error rate are
+configurable, so the evaluation tools can be exercised without an API key.
+Fine-tuned model ids (containing ':') cite the help center link for the
+question's topic; base models don't.
+
+For load tests, a profile (PROFILES) also sets prompt processing speed, so
+long prompts wait longer for their first token, random jitter, and a limit
+on requests generated at once; requests beyond it queue for a slot, the way
+a real server saturates.
+
+Usage:
+    python mock_chat_server.py                       # http://127.0.0.1:8768
+    python mock_chat_server.py --ttft 0.3 --tokens-per-second 40 --error-rate 0.02
+    python mock_chat_server.py --profile llama-api --max-concurrency 16
+    LLAMA_API_URL=http://127.0.0.1:8768 python evaluation_harness.py --prompts prompts.jsonl --model m
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import time
+import uuid
+
+from embed_urls_in_responses import TOPIC_URL_MAPPING, determine_topic
+from local_http import HTTPError, HTTPResponse, json_response, start_server
+
+DEFAULT_PORT = 8768
+
+# ttft: seconds before the first token; prefill_tokens_per_second: prompt tokens processed per second
+# on top of that; jitter: spread of a log-normal factor on both delays; max_concurrency: generation slots
+PROFILES = {
+    'default': {'ttft': 0.2, 'tokens_per_second': 50.0, 'prefill_tokens_per_second': None, 'jitter': 0.0,
+                'max_concurrency': None},
+    'instant': {'ttft': 0.0, 'tokens_per_second': 5000.0, 'prefill_tokens_per_second': None, 'jitter': 0.0,
+                'max_concurrency': None},
+    'llama-api': {'ttft': 0.35, 'tokens_per_second': 80.0, 'prefill_tokens_per_second': 20000.0, 'jitter': 0.25,
+                  'max_concurrency': 64},
+    'overloaded': {'ttft': 0.5, 'tokens_per_second': 25.0, 'prefill_tokens_per_second': 5000.0, 'jitter': 0.5,
+                   'max_concurrency': 8}
+}
+
+def canned_reply(model, messages):
+    """Deterministic answer to the last user message."""
+    query = next((m.get('content', '') for m in reversed(messages) if m.get('role') == 'user'), '')
+    topic = determine_topic(query)
+    content = f"Here is how to handle that in WhatsApp Business: {query}"
+    if ':' in model and topic in TOPIC_URL_MAPPING:
+        content += f"\n\nLearn more: {TOPIC_URL_MAPPING[topic]['urls'][0]}"
+    return content
+
+def count_tokens(text):
+    """Word count stands in for a tokenizer."""
+    return len(text.split())
+
+def split_tokens(text):
+    """Split text into word-sized pieces that join back to the original text."""
+    pieces = text.split(' ')
+    return [piece if i == 0 else ' ' + piece for i, piece in enumerate(pieces)]
+
+def usage_for(messages, content):
+    prompt_tokens = sum(count_tokens(str(m.get('content', ''))) for m in messages)
+    completion_tokens = count_tokens(content)
+    return {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': prompt_tokens + completion_tokens
+    }
+
+def completion_response(model, messages, content, finish_reason='stop'):
+    """A non-streaming chat.completion body."""
+    return {
+        'id': f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': finish_reason}],
+        'usage': usage_for(messages, content)
+    }
+
+class MockChatAPI:
+    def __init__(self, ttft=0.2, tokens_per_second=50.0, error_rate=0.0, seed=None, prefill_tokens_per_second=None,
+                 jitter=0.0, max_concurrency=None):
+        """
+        Args:
+            ttft: Seconds before the first token
+            tokens_per_second: Generation speed after the first token
+            error_rate: Probability of answering 503
+            seed: Seed for error injection and jitter
+            prefill_tokens_per_second: Prompt tokens processed per second before the first token (None: instant)
+            jitter: Sigma of a log-normal factor applied to every delay (0: exact delays)
+            max_concurrency: Requests generated at once; the rest wait for a slot (None: unlimited)
+        """
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self.jitter = jitter
+        self.slots = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self.stats = {'requests': 0, 'streamed': 0, 'injected_errors': 0, 'queued': 0}
+
+    def first_token_delay(self, prompt_tokens):
+        delay = self.ttft
+        if self.prefill_tokens_per_second:
+            delay += prompt_tokens / self.prefill_tokens_per_second
+        return delay * self.random.lognormvariate(0, self.jitter) if self.jitter else delay
+
+    def token_delay(self):
+        delay = 1 / self.tokens_per_second
+        return delay * self.random.lognormvariate(0, self.jitter) if self.jitter else delay
+
+    def slot(self):
+        """Generation slot to hold while answering (a no-op without max_concurrency)."""
+        if not self.slots:
+            return contextlib.nullcontext()
+        if self.slots.locked():
+            self.stats['queued'] += 1
+        return self.slots
+
+    async def handle(self, request):
+        path = request.path[3:] if request.path.startswith('/v1/') else request.path
+        if request.method == 'GET' and path == '/models':
+            return json_response({'object': 'list', 'data': []})
+        if request.method != 'POST' or path != '/chat/completions':
+            raise HTTPError(404)
+
+        self.stats['requests'] += 1
+        body = request.json()
+        if not isinstance(body, dict) or not body.get('messages'):
+            raise HTTPError(400, "'messages' is required")
+        if self.random.random() < self.error_rate:
+            self.stats['injected_errors'] += 1
+            raise HTTPError(503, "Injected failure")
+
+        model = body.get('model', 'mock')
+        messages = body['messages']
+        tokens = split_tokens(canned_reply(model, messages))
+        max_tokens = body.get('max_tokens')
+        finish_reason = 'length' if max_tokens and len(tokens) > max_tokens else 'stop'
+        tokens = tokens[:max_tokens] if max_tokens else tokens
+
+        if body.get('stream'):
+            self.stats['streamed'] += 1
+            include_usage = (body.get('stream_options') or {}).get('include_usage', False)
+            return HTTPResponse(
+                200, self.stream(model, messages, tokens, finish_reason, include_usage),
+                headers={'Cache-Control': 'no-cache'}, content_type='text/event-stream'
+            )
+
+        async with self.slot():
+            await asyncio.sleep(self.first_token_delay(usage_for(messages, '')['prompt_tokens'])
+                                + sum(self.token_delay() for _ in tokens[1:]))
+        return json_response(completion_response(model, messages, ''.join(tokens), finish_reason))
+
+    async def stream(self, model, messages, tokens, finish_reason, include_usage):
+        """Yield one SSE event per token, then the finish event and [DONE]."""
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        def event(delta, reason=None, usage=None):
+            data = {
+                'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+                'choices': [] if usage else [{'index': 0, 'delta': delta, 'finish_reason': reason}]
+            }
+            if usage:
+                data['usage'] = usage
+            return b'data: ' + json.dumps(data).encode('utf-8') + b'\n\n'
+
+        async with self.slot():
+            await asyncio.sleep(self.first_token_delay(usage_for(messages, '')['prompt_tokens']))
+            yield event({'role': 'assistant', 'content': ''})
+            for i, token in enumerate(tokens):
+                if i:
+                    await asyncio.sleep(self.token_delay())
+                yield event({'content': token})
+        yield event({}, finish_reason)
+        if include_usage:
+            yield event({}, usage=usage_for(messages, ''.join(tokens)))
+        yield b'data: [DONE]\n\n'
+
+async def main(args):
+    settings = dict(PROFILES[args.profile])
+    settings.update({name: getattr(args, name) for name in settings if getattr(args, name) is not None})
+    api = MockChatAPI(error_rate=args.error_rate, seed=args.seed, **settings)
+    server, port = await start_server(api.handle, args.host, args.port)
+    print(f"Mock chat completions API listening on http://{args.host}:{port} ({args.profile} profile)")
+    print(f"  TTFT: {settings['ttft'] * 1000:.0f} ms"
+          + (f" + prompt at {settings['prefill_tokens_per_second']:g} tokens/s"
+             if settings['prefill_tokens_per_second'] else "")
+          + f", {settings['tokens_per_second']:g} tokens/s, jitter: {settings['jitter']:g}, "
+          f"slots: {settings['max_concurrency'] or 'unlimited'}, error rate: {args.error_rate:.0%}")
+    try:
+        await server.serve_forever()
+    finally:
+        print(f"\nStats: {api.stats}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible chat completions API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='default',
+                        help="Latency and capacity preset; the options below override it")
+    parser.add_argument('--ttft', type=float, help="Seconds before the first token")
+    parser.add_argument('--tokens-per-second', type=float)
+    parser.add_argument('--prefill-tokens-per-second', type=float, help="Prompt processing speed")
+    parser.add_argument('--jitter', type=float, help="Log-normal sigma applied to every delay")
+    parser.add_argument('--max-concurrency', type=int, help="Requests generated at once")
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int)
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
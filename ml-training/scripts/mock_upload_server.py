@@ -0,0 +1,234 @@
+"""
+Local mock of the file upload and fine-tuning job API for offline testing.
+
+Implements the multipart uploads protocol used by multipart_upload.py plus the
+single-request POST /files endpoint (including chunked, gzip-encoded streamed
+uploads), verifies every part checksum and the final file hash, and can inject failures and latency to exercise retries and
+resume. Fine-tuning jobs created against uploaded files queue and train on
+the simulated clock of fine_tuning_client.MockProvider. POST /chat/completions
+answers with a canned reply so evaluation runs can be tried offline.
+
+Usage:
+    python mock_upload_server.py --port 8766
+    python mock_upload_server.py --port 8766 --fail-rate 0.2 --latency 0.05
+    python mock_upload_server.py --port 8766 --time-scale 0.01   # jobs finish in seconds
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import random
+import re
+import time
+import uuid
+
+from fine_tuning_client import FineTuningProviderError, MockProvider
+from local_http import HTTPError, json_response, start_server
+from mock_chat_server import canned_reply, completion_response
+
+def parse_multipart(request):
+    """
+    Parse a multipart/form-data body.
+
+    Returns:
+        Dict of field name -> (filename, bytes)
+    """
+    match = re.search(r'boundary="?([^";]+)"?', request.headers.get('content-type', ''))
+    if not match:
+        raise HTTPError(400, "Expected multipart/form-data")
+    boundary = b'--' + match.group(1).encode('latin-1')
+
+    fields = {}
+    for section in request.body.split(boundary)[1:]:
+        if section.startswith(b'--'):
+            break
+        head, _, data = section.partition(b'\r\n\r\n')
+        disposition = head.decode('latin-1')
+        name = re.search(r'name="([^"]*)"', disposition)
+        filename = re.search(r'filename="([^"]*)"', disposition)
+        if name:
+            fields[name.group(1)] = (filename.group(1) if filename else None, data[:-2])  # Trailing CRLF
+    return fields
+
+class MockUploadAPI:
+    def __init__(self, fail_rate=0.0, latency=0.0, seed=None, time_scale=1.0):
+        """
+        Args:
+            fail_rate: Probability that a part upload returns 503
+            latency: Seconds added to every request
+            seed: Seed for the failure injection
+            time_scale: Simulated time factor for fine-tuning jobs
+        """
+        self.fail_rate = fail_rate
+        self.latency = latency
+        self.random = random.Random(seed)
+        self.uploads = {}
+        self.files = {}
+        self.jobs = MockProvider(request_latency=0, time_scale=time_scale, seed=seed)
+        self.stats = {'parts': 0, 'injected_failures': 0, 'checksum_failures': 0, 'files': 0}
+
+    def store_file(self, filename, data, purpose):
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        self.files[file_id] = {
+            'id': file_id,
+            'object': 'file',
+            'filename': filename,
+            'purpose': purpose,
+            'bytes': len(data),
+            'sha256': hashlib.sha256(data).hexdigest(),
+            'created_at': int(time.time()),
+            'data': data
+        }
+        self.jobs.files[file_id] = {'id': file_id, 'bytes': len(data), 'filename': filename}
+        self.stats['files'] += 1
+        return {k: v for k, v in self.files[file_id].items() if k != 'data'}
+
+    def get_upload(self, upload_id):
+        upload = self.uploads.get(upload_id)
+        if not upload:
+            raise HTTPError(404, f"Upload {upload_id} not found")
+        return upload
+
+    async def handle(self, request):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if request.headers.get('content-encoding', '').lower() == 'gzip':
+            try:
+                request.body = gzip.decompress(request.body)
+            except OSError as e:
+                raise HTTPError(400, f"Bad gzip body: {e}")
+
+        parts = request.path.strip('/').split('/')
+
+        if request.method == 'POST' and parts == ['files']:
+            fields = parse_multipart(request)
+            if 'file' not in fields:
+                raise HTTPError(400, "Missing 'file' field")
+            filename, data = fields['file']
+            purpose = fields.get('purpose', (None, b'fine-tune'))[1].decode()
+            # Streamed uploads send the content hash after the file part
+            expected = fields.get('sha256', (None, b''))[1].decode()
+            if expected and hashlib.sha256(data).hexdigest() != expected:
+                self.stats['checksum_failures'] += 1
+                raise HTTPError(400, "File checksum mismatch")
+            return json_response(self.store_file(filename, data, purpose), status=201)
+
+        if request.method == 'GET' and len(parts) == 2 and parts[0] == 'files':
+            file_info = self.files.get(parts[1])
+            if not file_info:
+                raise HTTPError(404, "File not found")
+            return json_response({k: v for k, v in file_info.items() if k != 'data'})
+
+        if parts[:2] == ['fine-tuning', 'jobs']:
+            return self.handle_job(request, parts[2:])
+
+        if request.method == 'POST' and parts == ['chat', 'completions']:
+            return json_response(self.chat_completion(request.json()))
+
+        if parts[0] != 'uploads':
+            raise HTTPError(404)
+
+        if request.method == 'POST' and len(parts) == 1:
+            body = request.json()
+            upload_id = f"upload-{uuid.uuid4().hex[:24]}"
+            self.uploads[upload_id] = {
+                'id': upload_id,
+                'filename': body.get('filename', 'upload.jsonl'),
+                'purpose': body.get('purpose', 'fine-tune'),
+                'bytes': body.get('bytes'),
+                'status': 'pending',
+                'parts': {}
+            }
+            return json_response({'id': upload_id, 'status': 'pending'}, status=201)
+
+        upload = self.get_upload(parts[1])
+
+        if request.method == 'GET' and len(parts) == 2:
+            return json_response({
+                'id': upload['id'],
+                'status': upload['status'],
+                'parts_received': len(upload['parts'])
+            })
+
+        if request.method == 'POST' and parts[2:] == ['parts']:
+            if self.random.random() < self.fail_rate:
+                self.stats['injected_failures'] += 1
+                raise HTTPError(503, "Injected failure")
+
+            _, data = parse_multipart(request).get('data', (None, None))
+            if data is None:
+                raise HTTPError(400, "Missing 'data' field")
+            expected = request.headers.get('x-content-sha256')
+            if expected and hashlib.sha256(data).hexdigest() != expected:
+                self.stats['checksum_failures'] += 1
+                raise HTTPError(400, "Part checksum mismatch")
+
+            part_id = f"part-{uuid.uuid4().hex[:24]}"
+            upload['parts'][part_id] = data
+            self.stats['parts'] += 1
+            return json_response({'id': part_id, 'upload_id': upload['id']}, status=201)
+
+        if request.method == 'POST' and parts[2:] == ['complete']:
+            body = request.json()
+            try:
+                data = b''.join(upload['parts'][part_id] for part_id in body['part_ids'])
+            except KeyError as e:
+                raise HTTPError(400, f"Unknown part {e}")
+
+            if body.get('sha256') and hashlib.sha256(data).hexdigest() != body['sha256']:
+                raise HTTPError(400, "File checksum mismatch")
+            if upload['bytes'] is not None and len(data) != upload['bytes']:
+                raise HTTPError(400, f"Expected {upload['bytes']} bytes, got {len(data)}")
+
+            upload['status'] = 'completed'
+            upload['parts'] = {}
+            file_info = self.store_file(upload['filename'], data, upload['purpose'])
+            return json_response({'id': upload['id'], 'status': 'completed', 'file': file_info})
+
+        raise HTTPError(404)
+
+    def chat_completion(self, body):
+        """Canned, immediate reply in the same format as mock_chat_server.py."""
+        messages = body.get('messages') or []
+        model = body.get('model', '')
+        return completion_response(model, messages, canned_reply(model, messages))
+
+    def handle_job(self, request, parts):
+        try:
+            if request.method == 'POST' and not parts:
+                body = request.json()
+                job = self.jobs.create_job(
+                    body.get('training_files') or body.get('training_file'),
+                    body.get('model'), body.get('suffix'), body.get('hyperparameters')
+                )
+                return json_response(job, status=201)
+            if request.method == 'GET' and len(parts) == 1:
+                return json_response(self.jobs.get_job(parts[0], latency=False))
+        except FineTuningProviderError as e:
+            raise HTTPError(e.status_code or 500, str(e))
+        raise HTTPError(404)
+
+async def main(args):
+    api = MockUploadAPI(args.fail_rate, args.latency, args.seed, args.time_scale)
+    server, port = await start_server(api.handle, args.host, args.port)
+    print(f"Mock fine-tuning API listening on http://{args.host}:{port}")
+    print(f"  Failure rate: {args.fail_rate:.0%}, latency: {args.latency * 1000:.0f} ms")
+    try:
+        await server.serve_forever()
+    finally:
+        print(f"\nStats: {api.stats}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock file upload API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--time-scale', type=float, default=1.0, help="Simulated time factor for fine-tuning jobs")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
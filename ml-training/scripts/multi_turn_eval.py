@@ -0,0 +1,411 @@
+"""
+Run scripted multi-turn conversations against a model and measure how each turn grows.
+
+The assistant resends the whole conversation with every message (see
+test_llama_api.sh): system prompt, every earlier question and every earlier
+answer. This driver replays scripted dialogues the same way. Each turn sends
+the history so far plus the next user message, and the model's own answer
+is appended before the next turn. Dialogues run concurrently, turns within
+a dialogue one after another. A dialogue stops at its first failed turn.
+
+Every answer is scored with score_responses.ResponseScorer. The report
+breaks latency, time-to-first-token, prompt tokens and score down by turn
+number and fits how they grow: prompt tokens and seconds added per turn,
+and TTFT per 1,000 prompt tokens (the cost of processing the history).
+Answers served from the response cache are scored but left out of the
+timings; prompt tokens are estimated from characters when the API reports
+none.
+
+Dialogue files can be:
+    test_llama_api.sh style curl commands: the user turns of each request body,
+        with its system prompt and sampling settings
+    JSONL of scripted dialogues: {"id": "d1", "turns": ["hi", "how do i ..."], "system": "..."}
+    JSONL of chat examples: their user turns
+    JSONL of prompts ({"query": ...}, e.g. the golden set): grouped into
+        dialogues of --turns consecutive queries
+Without a file the golden set (else the built-in test queries) is grouped
+that way. Dialogues without a system prompt get SYSTEM_PROMPT.md, the
+prompt the assistant sends.
+
+Turns are written to outputs/evaluations/dialogues/<time>-<model>.jsonl,
+the report to a .summary.json next to it.
+
+Usage:
+    python multi_turn_eval.py --dialogues ../test_llama_api.sh --model <model>
+    python multi_turn_eval.py --dialogues ../data/eval/golden_set.jsonl --turns 8 --concurrency 16 --model <model>
+
+    # Offline against the mock server (long prompts are slower to process with the llama-api profile)
+    python mock_chat_server.py --profile llama-api &
+    python multi_turn_eval.py --model mock --base-url http://127.0.0.1:8768 --turns 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from chat_client import ChatClient
+from evaluation_harness import distribution, load_prompts, read_lines, reserve_path
+from load_generator import curl_bodies
+from response_cache import ResponseCache
+from score_responses import SYSTEM_PROMPT_FILE, ResponseScorer, load_allowed_articles
+
+load_dotenv(Path(__file__).parent.parent / '.env')
+
+DIALOGUE_DIR = Path(__file__).parent.parent / 'outputs' / 'evaluations' / 'dialogues'
+DEFAULT_CONCURRENCY = 8
+DEFAULT_TURNS = 6
+PROGRESS_EVERY = 100
+CHARS_PER_TOKEN = 4.0
+# Request-body fields that are part of the dialogue rather than sampling settings
+DIALOGUE_FIELDS = {'messages', 'model', 'stream', 'stream_options'}
+
+def dialogue_from_messages(messages, dialogue_id, params=None):
+    """A dialogue from chat messages: their system prompt and user turns (answers are the model's own)."""
+    system = next((m['content'] for m in messages if m.get('role') == 'system'), None)
+    turns = [m['content'] for m in messages if m.get('role') == 'user' and isinstance(m.get('content'), str)]
+    if not turns:
+        raise ValueError("No user turns")
+    return {'id': dialogue_id, 'system': system, 'turns': turns, 'params': params or {}}
+
+def group_prompts(prompts, turns):
+    """Consecutive prompts grouped into dialogues of `turns` user turns."""
+    dialogue = []
+    number = 0
+    for prompt in prompts:
+        messages = prompt['messages']
+        dialogue.append(next(m['content'] for m in reversed(messages) if m.get('role') == 'user'))
+        if len(dialogue) == turns:
+            number += 1
+            yield {'id': f"dialogue-{number}", 'system': None, 'turns': dialogue, 'params': {}}
+            dialogue = []
+    if dialogue:
+        yield {'id': f"dialogue-{number + 1}", 'system': None, 'turns': dialogue, 'params': {}}
+
+def load_dialogues(path=None, turns=DEFAULT_TURNS, limit=None):
+    """
+    Dialogues from a curl script or JSONL file (see module docstring); without one,
+    the golden set or built-in test queries grouped into `turns`-turn dialogues.
+
+    Returns:
+        List of {'id', 'system', 'turns', 'params'} dicts; bad lines are reported and skipped
+    """
+    dialogues = []
+    if path and str(path).endswith('.sh'):
+        with open(path, 'r', encoding='utf-8') as f:
+            for number, body in enumerate(curl_bodies(f.read()), 1):
+                params = {key: value for key, value in body.items() if key not in DIALOGUE_FIELDS}
+                params['model'] = body.get('model')
+                dialogues.append(dialogue_from_messages(body.get('messages') or [], f"script-{number}", params))
+    elif path:
+        queries = []
+        for number, line in enumerate(read_lines(path), 1):
+            try:
+                data = json.loads(line)
+                if isinstance(data, dict) and data.get('turns'):
+                    if not isinstance(data['turns'], list) or not all(isinstance(t, str) for t in data['turns']):
+                        raise ValueError("'turns' must be a list of strings")
+                    dialogues.append({'id': data.get('id', f"dialogue-{number}"), 'system': data.get('system'),
+                                      'turns': list(data['turns']), 'params': {}})
+                elif isinstance(data, dict) and data.get('messages'):
+                    dialogues.append(dialogue_from_messages(data['messages'], data.get('id', f"dialogue-{number}")))
+                else:
+                    queries.append(data)
+            except (ValueError, AttributeError, KeyError) as e:
+                print(f"  ⚠️  Skipping line {number}: {e}")
+        if queries:
+            prompts = ({'messages': [{'role': 'user', 'content': q if isinstance(q, str) else
+                                      q.get('query') or q.get('prompt')}]} for q in queries)
+            dialogues.extend(group_prompts(prompts, turns))
+    else:
+        dialogues = list(group_prompts(load_prompts(), turns))
+    return dialogues[:limit] if limit else dialogues
+
+def prompt_chars(messages):
+    return sum(len(m['content']) for m in messages if isinstance(m.get('content'), str))
+
+def slope(points):
+    """Least-squares slope of (x, y) points, or None with fewer than two distinct x values."""
+    if len({x for x, _ in points}) < 2:
+        return None
+    xs, ys = zip(*points)
+    return statistics.linear_regression(xs, ys).slope
+
+class TurnStats:
+    """
+    Per-turn-number metrics; cached answers count for scores but not timings. Errored turns
+    only count as errors: their prompt tokens are estimated, so they'd skew the token growth.
+    """
+
+    def __init__(self):
+        self.turns = defaultdict(lambda: defaultdict(list))
+        self.answers = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.cached = 0
+        self.completed = 0
+        self.abandoned = 0
+
+    def add(self, row):
+        turn = self.turns[row['turn']]
+        self.answers[row['turn']] += 1
+        if row['error']:
+            self.errors[row['turn']] += 1
+            return
+        turn['prompt_tokens'].append(row['prompt_tokens'])
+        turn['score'].append(row['scores']['score'])
+        turn['completion_tokens'].append(row['completion_tokens'] or 0)
+        if row.get('cached'):
+            self.cached += 1
+            return
+        turn['latency'].append(row['latency'])
+        if row['ttft'] is not None:
+            turn['ttft'].append(row['ttft'])
+            turn['prefill'].append((row['prompt_tokens'], row['ttft']))
+
+    def summary(self):
+        by_turn = []
+        points = defaultdict(list)
+        for number in sorted(self.turns):
+            turn = self.turns[number]
+            scores = [score for score in turn['score'] if score is not None]
+            by_turn.append({
+                'turn': number,
+                'answers': self.answers[number],
+                'errors': self.errors[number],
+                'prompt_tokens': round(statistics.mean(turn['prompt_tokens'])) if turn['prompt_tokens'] else None,
+                'completion_tokens': (round(statistics.mean(turn['completion_tokens']))
+                                      if turn['completion_tokens'] else None),
+                'latency': distribution(turn['latency']),
+                'ttft': distribution(turn['ttft']),
+                'score': round(statistics.mean(scores), 4) if scores else None
+            })
+            points['prompt_tokens'].extend((number, tokens) for tokens in turn['prompt_tokens'])
+            points['latency'].extend((number, latency) for latency in turn['latency'])
+            points['ttft'].extend((number, ttft) for ttft in turn['ttft'])
+            points['prefill'].extend(turn['prefill'])
+
+        prefill = slope(points['prefill'])
+        first, last = (by_turn[0]['latency'], by_turn[-1]['latency']) if by_turn else (None, None)
+        growth = {
+            'prompt_tokens_per_turn': slope(points['prompt_tokens']),
+            'latency_per_turn': slope(points['latency']),
+            'ttft_per_turn': slope(points['ttft']),
+            'ttft_per_1k_prompt_tokens': prefill * 1000 if prefill is not None else None,
+            'latency_last_vs_first': last['p50'] / first['p50'] if first and last and first['p50'] else None
+        }
+        return {
+            'turns': by_turn,
+            'growth': {key: round(value, 4) if value is not None else None for key, value in growth.items()},
+            'answers': sum(self.answers.values()),
+            'errors': sum(self.errors.values()),
+            'cached': self.cached,
+            'dialogues_completed': self.completed,
+            'dialogues_abandoned': self.abandoned
+        }
+
+class DialogueRunner:
+    def __init__(self, client, model, scorer, system_prompt, concurrency=DEFAULT_CONCURRENCY, max_tokens=500,
+                 temperature=0.7, stream=True):
+        """
+        Args:
+            client: ChatClient (its connection pool should allow `concurrency` connections)
+            model: Model to evaluate (default: the model recorded with a scripted dialogue)
+            scorer: ResponseScorer
+            system_prompt: System prompt for dialogues that don't bring their own
+            concurrency: Dialogues in flight at once
+            max_tokens, temperature: Sampling settings (a dialogue's recorded settings take precedence)
+            stream: Stream answers, which is what makes time-to-first-token measurable
+        """
+        self.client = client
+        self.model = model
+        self.scorer = scorer
+        self.system_prompt = system_prompt
+        self.concurrency = concurrency
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.stream = stream
+
+    async def ask(self, dialogue, messages):
+        params = dict(dialogue['params'])
+        recorded_model = params.pop('model', None)
+        # A recorded max_completion_tokens stands in for max_tokens
+        default_max_tokens = None if 'max_completion_tokens' in params else self.max_tokens
+        model = self.model or recorded_model
+        result = await self.client.complete(model, list(messages), params.pop('max_tokens', default_max_tokens),
+                                            params.pop('temperature', self.temperature), stream=self.stream,
+                                            **params)
+        return model, result
+
+    async def run_dialogue(self, dialogue, stats, output):
+        system = dialogue['system'] or self.system_prompt
+        messages = [{'role': 'system', 'content': system}] if system else []
+        for number, query in enumerate(dialogue['turns'], 1):
+            messages.append({'role': 'user', 'content': query})
+            model, result = await self.ask(dialogue, messages)
+            estimated = result['prompt_tokens'] is None
+            row = dict(
+                result,
+                model=model,
+                dialogue=dialogue['id'],
+                turn=number,
+                query=query,
+                history_messages=len(messages),
+                prompt_chars=prompt_chars(messages),
+                prompt_tokens=(round(prompt_chars(messages) / CHARS_PER_TOKEN) if estimated
+                               else result['prompt_tokens']),
+                prompt_tokens_estimated=estimated
+            )
+            row['scores'] = self.scorer.score(row)
+            stats.add(row)
+            if output:
+                output.write(json.dumps(row, ensure_ascii=False) + '\n')
+            if result['error']:
+                stats.abandoned += 1
+                return
+            messages.append({'role': 'assistant', 'content': result['content']})
+        stats.completed += 1
+
+    async def run(self, dialogues, output_path=None):
+        """
+        Run every dialogue, `concurrency` at a time.
+
+        Returns:
+            Summary dict (see TurnStats.summary)
+        """
+        stats = TurnStats()
+        dialogues = iter(dialogues)
+        output = open(output_path, 'w', encoding='utf-8') if output_path else None
+        started = time.perf_counter()
+
+        async def worker():
+            # Workers share one iterator; next() never yields to the event loop, so no dialogue runs twice
+            for dialogue in dialogues:
+                await self.run_dialogue(dialogue, stats, output)
+                done = stats.completed + stats.abandoned
+                if done % PROGRESS_EVERY == 0:
+                    print(f"  {done:,} dialogues done, {stats.abandoned} abandoned")
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            if output:
+                output.close()
+
+        summary = stats.summary()
+        summary.update(model=self.model, concurrency=self.concurrency, stream=self.stream,
+                       seconds=round(time.perf_counter() - started, 2))
+        return summary
+
+def dialogue_path(model, dialogue_dir=DIALOGUE_DIR):
+    """outputs/evaluations/dialogues/<timestamp>-<model>.jsonl (see evaluation_harness.reserve_path)"""
+    return reserve_path(dialogue_dir, re.sub(r'[^A-Za-z0-9._-]+', '_', model or 'recorded')[-80:])
+
+def print_summary(summary):
+    print("\n" + "=" * 86)
+    print(f"Multi-turn evaluation: {summary['model'] or 'recorded models'}")
+    print("=" * 86)
+    print(f"Dialogues: {summary['dialogues_completed']:,} completed, {summary['dialogues_abandoned']:,} stopped "
+          f"by an error ({summary['answers']:,} turns in {summary['seconds']}s)")
+    print(f"\n{'Turn':<6}{'Answers':>9}{'Errors':>8}{'Prompt tok':>12}{'Latency p50':>13}{'p95':>8}"
+          f"{'TTFT p50':>10}{'p95':>8}{'Score':>8}")
+    print("-" * 82)
+
+    def seconds(stats, key):
+        return f"{stats[key]:.3f}" if stats else '-'
+
+    def score(value):
+        return f"{value:.3f}" if value is not None else '-'
+
+    for turn in summary['turns']:
+        print(f"{turn['turn']:<6}{turn['answers']:>9,}{turn['errors']:>8,}"
+              f"{format(turn['prompt_tokens'], ',') if turn['prompt_tokens'] is not None else '-':>12}"
+              f"{seconds(turn['latency'], 'p50'):>13}{seconds(turn['latency'], 'p95'):>8}"
+              f"{seconds(turn['ttft'], 'p50'):>10}{seconds(turn['ttft'], 'p95'):>8}"
+              f"{score(turn['score']):>8}")
+
+    growth = summary['growth']
+    print("\nGrowth per turn:")
+    if growth['prompt_tokens_per_turn'] is not None:
+        print(f"  Prompt tokens   {growth['prompt_tokens_per_turn']:+,.0f} per turn")
+    for key, label in (('latency_per_turn', 'Latency'), ('ttft_per_turn', 'TTFT')):
+        if growth[key] is not None:
+            print(f"  {label:<15} {growth[key] * 1000:+,.0f} ms per turn")
+    if growth['ttft_per_1k_prompt_tokens'] is not None:
+        print(f"  TTFT            {growth['ttft_per_1k_prompt_tokens'] * 1000:+,.0f} ms per 1,000 prompt tokens")
+    if growth['latency_last_vs_first'] is not None:
+        print(f"  Median latency of turn {summary['turns'][-1]['turn']} is {growth['latency_last_vs_first']:.2f}x "
+              f"that of turn 1")
+    if summary['cached']:
+        print(f"\n↻ {summary['cached']:,} answer(s) came from the cache and are not in the timings")
+
+async def main(args, cache, dialogues, system_prompt):
+    scorer = ResponseScorer(load_allowed_articles(args.allowed_articles))
+    async with ChatClient(args.base_url, max_connections=args.concurrency, timeout=args.timeout,
+                          cache=cache) as client:
+        runner = DialogueRunner(client, args.model, scorer, system_prompt, args.concurrency, args.max_tokens,
+                                args.temperature, stream=not args.no_stream)
+        output_path = Path(args.output) if args.output else dialogue_path(args.model)
+        print(f"Running {len(dialogues):,} dialogues ({sum(len(d['turns']) for d in dialogues):,} turns) "
+              f"at {client.base_url}, {args.concurrency} at a time...")
+        summary = await runner.run(dialogues, output_path)
+        summary['dialogues'] = args.dialogues
+        summary['cache'] = dict(cache.stats, mode=cache.mode)
+
+    print_summary(summary)
+    print(cache.summary())
+    with open(output_path.with_suffix('.summary.json'), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    print(f"✓ Turns:   {output_path}")
+    print(f"✓ Summary: {output_path.with_suffix('.summary.json')}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay multi-turn dialogues and measure per-turn growth")
+    parser.add_argument('--dialogues',
+                        help="Curl script or JSONL of dialogues or prompts (default: the golden set, else the "
+                             "built-in test queries)")
+    parser.add_argument('--model', default=os.getenv('FINE_TUNED_MODEL_ID'),
+                        help="Model to evaluate (default: FINE_TUNED_MODEL_ID, else the model in a curl script)")
+    parser.add_argument('--turns', type=int, default=DEFAULT_TURNS, help="Turns per dialogue built from prompts")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help="Dialogues in flight at once")
+    parser.add_argument('--limit', type=int, help="Only the first N dialogues")
+    parser.add_argument('--system-prompt', default=str(SYSTEM_PROMPT_FILE),
+                        help="System prompt for dialogues without one")
+    parser.add_argument('--allowed-articles', default=str(SYSTEM_PROMPT_FILE),
+                        help="File the allowed help center article URLs are read from")
+    parser.add_argument('--max-tokens', type=int, default=500)
+    parser.add_argument('--temperature', type=float, default=0.7)
+    parser.add_argument('--no-stream', action='store_true', help="Use non-streaming responses (no TTFT)")
+    parser.add_argument('--base-url', help="API base URL (default: LLAMA_API_URL)")
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--output', help="Turns JSONL (default: outputs/evaluations/dialogues/<time>-<model>.jsonl)")
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument('--no-cache', action='store_true', help="Don't read or write the response cache")
+    cache_group.add_argument('--refresh-cache', action='store_true', help="Re-query every turn and update the cache")
+    cache_group.add_argument('--offline', action='store_true', help="Only use cached answers; never call the API")
+    args = parser.parse_args()
+
+    if args.dialogues and not Path(args.dialogues).exists():
+        print(f"❌ Not found: {args.dialogues}")
+        exit(1)
+    dialogues = load_dialogues(args.dialogues, args.turns, args.limit)
+    if not dialogues:
+        print("❌ No dialogues")
+        exit(1)
+    if not args.model and not all(d['params'].get('model') for d in dialogues):
+        print("❌ No model given (--model or FINE_TUNED_MODEL_ID)")
+        exit(1)
+    system_prompt = Path(args.system_prompt).read_text(encoding='utf-8') if args.system_prompt else None
+
+    mode = 'bypass' if args.no_cache else 'refresh' if args.refresh_cache else 'offline' if args.offline else 'use'
+    with ResponseCache(mode=mode) as cache:
+        try:
+            asyncio.run(main(args, cache, dialogues, system_prompt))
+        except KeyboardInterrupt:
+            print("\nStopped.")
@@ -0,0 +1,327 @@
+"""
+Resumable, parallel multipart upload for large training files.
+
+The file is split into fixed-size parts that upload in parallel, each with
+its own SHA-256 checksum. Finished parts are recorded in a resume manifest
+under outputs/uploads/, so an interrupted upload picks up where it stopped
+instead of starting over.
+
+Upload protocol (OpenAI-style uploads API):
+    POST /uploads                   {"filename", "purpose", "bytes", "mime_type"} -> {"id"}
+    POST /uploads/{id}/parts        multipart "data" + X-Part-Number / X-Content-SHA256 -> {"id"}
+    POST /uploads/{id}/complete     {"part_ids", "sha256"} -> {"file": {"id"}} or {"id"}
+    GET  /uploads/{id}              -> {"status"} (404 once expired)
+
+Try it against the local mock server:
+    python mock_upload_server.py --port 8766 &
+    python multipart_upload.py ../data/training/training_data_complete.jsonl --base-url http://127.0.0.1:8766
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_RETRIES = 3
+# Files at least this large go through the multipart path (MULTIPART_THRESHOLD_BYTES overrides)
+DEFAULT_MULTIPART_THRESHOLD = 32 * 1024 * 1024
+
+MANIFEST_DIR = Path(__file__).parent.parent / 'outputs' / 'uploads'
+
+def multipart_threshold():
+    """Size from which files are uploaded in parts; read at call time so a .env loaded later applies."""
+    return int(os.getenv('MULTIPART_THRESHOLD_BYTES') or DEFAULT_MULTIPART_THRESHOLD)
+
+class UploadError(Exception):
+    """Raised when the upload cannot be completed."""
+
+def hash_parts(path, part_size):
+    """
+    Hash the whole file and each part in a single read.
+
+    Returns:
+        (file_sha256, [part_sha256, ...])
+    """
+    file_hash = hashlib.sha256()
+    part_hashes = []
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(part_size)
+            if not chunk:
+                break
+            file_hash.update(chunk)
+            part_hashes.append(hashlib.sha256(chunk).hexdigest())
+    return file_hash.hexdigest(), part_hashes
+
+def print_progress(done, total):
+    """Default progress callback: a single updating line."""
+    percent = done / total * 100 if total else 100
+    bar = '█' * int(percent // 4) + '░' * (25 - int(percent // 4))
+    print(f"\r  {bar} {percent:5.1f}%  {done / 1e6:.1f}/{total / 1e6:.1f} MB", end='', flush=True)
+    if done >= total:
+        print()
+
+class MultipartUploader:
+    def __init__(self, base_url, api_key, part_size=DEFAULT_PART_SIZE, max_workers=DEFAULT_MAX_WORKERS,
+                 progress_callback=None, manifest_dir=MANIFEST_DIR, max_retries=DEFAULT_MAX_RETRIES,
+                 session=None):
+        """
+        Args:
+            base_url: API base URL (e.g. https://api.llama-api.com)
+            api_key: Bearer token
+            part_size: Bytes per part
+            max_workers: Parts uploaded concurrently
+            progress_callback: Called as callback(bytes_done, bytes_total)
+            manifest_dir: Where resume manifests are kept
+            max_retries: Attempts per part before giving up
+            session: Optional requests.Session to reuse
+        """
+        self.base_url = base_url.rstrip('/')
+        self.part_size = part_size
+        self.max_workers = max_workers
+        self.progress_callback = progress_callback
+        self.manifest_dir = Path(manifest_dir)
+        self.max_retries = max_retries
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+        self.auth_headers = {"Authorization": f"Bearer {api_key}"}
+
+        self.lock = threading.Lock()
+
+    # Manifest handling
+
+    def manifest_path(self, file_sha256):
+        return self.manifest_dir / f"{file_sha256[:16]}.json"
+
+    def load_manifest(self, path, size, file_sha256):
+        """Return the saved manifest if it matches this exact file and part size."""
+        manifest_file = self.manifest_path(file_sha256)
+        if not manifest_file.exists():
+            return None
+        with open(manifest_file, 'r') as f:
+            manifest = json.load(f)
+        if (manifest.get('sha256') != file_sha256 or manifest.get('size') != size
+                or manifest.get('part_size') != self.part_size):
+            return None
+        return manifest
+
+    def save_manifest(self, manifest):
+        """Write the manifest atomically so a crash never leaves it half-written."""
+        self.manifest_dir.mkdir(parents=True, exist_ok=True)
+        manifest_file = self.manifest_path(manifest['sha256'])
+        temp_file = manifest_file.with_suffix('.tmp')
+        with open(temp_file, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        temp_file.replace(manifest_file)
+
+    # HTTP calls
+
+    @staticmethod
+    def json_body(response, action):
+        """Parse a JSON object response; anything else is an UploadError."""
+        try:
+            body = response.json()
+        except ValueError:
+            body = None
+        if not isinstance(body, dict):
+            raise UploadError(f"Could not {action}: invalid JSON response ({response.status_code}): "
+                              f"{response.text[:200]!r}")
+        return body
+
+    def upload_is_active(self, upload_id):
+        try:
+            response = self.session.get(f"{self.base_url}/uploads/{upload_id}", headers=self.auth_headers, timeout=30)
+            if response.status_code != 200:
+                return False
+            return self.json_body(response, "check upload").get('status', 'pending') == 'pending'
+        except (requests.exceptions.RequestException, UploadError):
+            return False
+
+    def create_upload(self, path, size, purpose):
+        response = self.session.post(
+            f"{self.base_url}/uploads",
+            headers=self.auth_headers,
+            json={
+                "filename": Path(path).name,
+                "purpose": purpose,
+                "bytes": size,
+                "mime_type": "application/jsonl"
+            },
+            timeout=60
+        )
+        if response.status_code not in (200, 201):
+            raise UploadError(f"Could not start upload ({response.status_code}): {response.text}")
+        upload_id = self.json_body(response, "start upload").get('id')
+        if not upload_id:
+            raise UploadError(f"Could not start upload: no upload id in {response.text[:200]!r}")
+        return upload_id
+
+    def upload_part(self, path, upload_id, part_number, part_sha256):
+        """Upload one part with retries and exponential backoff; returns the part id."""
+        offset = (part_number - 1) * self.part_size
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(self.part_size)
+
+        headers = dict(self.auth_headers)
+        headers['X-Part-Number'] = str(part_number)
+        headers['X-Content-SHA256'] = part_sha256
+
+        last_error = None
+        for attempt in range(self.max_retries):
+            try:
+                response = self.session.post(
+                    f"{self.base_url}/uploads/{upload_id}/parts",
+                    headers=headers,
+                    files={'data': (f"part-{part_number}", data, 'application/octet-stream')},
+                    timeout=300
+                )
+                if response.status_code in (200, 201):
+                    part_id = self.json_body(response, f"upload part {part_number}").get('id')
+                    if part_id:
+                        return part_id, len(data)
+                    last_error = f"no part id in {response.text[:200]!r}"
+                else:
+                    last_error = f"HTTP {response.status_code}: {response.text[:200]}"
+                    if response.status_code < 500 and response.status_code != 429:
+                        break  # Client errors won't fix themselves
+            except (requests.exceptions.RequestException, UploadError) as e:
+                last_error = str(e)
+            if attempt < self.max_retries - 1:
+                time.sleep(min(2 ** attempt, 30))
+
+        raise UploadError(f"Part {part_number} failed after {self.max_retries} attempts: {last_error}")
+
+    def complete_upload(self, upload_id, part_ids, file_sha256):
+        response = self.session.post(
+            f"{self.base_url}/uploads/{upload_id}/complete",
+            headers=self.auth_headers,
+            json={"part_ids": part_ids, "sha256": file_sha256},
+            timeout=300
+        )
+        if response.status_code not in (200, 201):
+            raise UploadError(f"Could not complete upload ({response.status_code}): {response.text}")
+        result = self.json_body(response, "complete upload")
+        return (result.get('file') or {}).get('id') or result.get('file_id') or result.get('id')
+
+    # Main entry point
+
+    def upload(self, path, purpose='fine-tune'):
+        """
+        Upload a file, resuming a previous attempt when a matching manifest exists.
+
+        Returns:
+            Remote file id
+        """
+        path = Path(path)
+        size = path.stat().st_size
+        file_sha256, part_hashes = hash_parts(path, self.part_size)
+
+        manifest = self.load_manifest(path, size, file_sha256)
+        if manifest and self.upload_is_active(manifest['upload_id']):
+            print(f"  ↻ Resuming upload {manifest['upload_id']} "
+                  f"({len(manifest['parts'])}/{len(part_hashes)} parts already sent)")
+        else:
+            manifest = {
+                'file': str(path.resolve()),
+                'size': size,
+                'sha256': file_sha256,
+                'part_size': self.part_size,
+                'upload_id': self.create_upload(path, size, purpose),
+                'parts': {},
+                'created_at': time.strftime('%Y-%m-%d %H:%M:%S')
+            }
+            self.save_manifest(manifest)
+
+        upload_id = manifest['upload_id']
+        done_bytes = sum(
+            min(self.part_size, size - (int(number) - 1) * self.part_size)
+            for number in manifest['parts']
+        )
+        if self.progress_callback:
+            self.progress_callback(done_bytes, size)
+
+        pending = [
+            (number, part_sha256)
+            for number, part_sha256 in enumerate(part_hashes, 1)
+            if str(number) not in manifest['parts']
+        ]
+
+        errors = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.upload_part, path, upload_id, number, part_sha256): (number, part_sha256)
+                for number, part_sha256 in pending
+            }
+            for future in as_completed(futures):
+                number, part_sha256 = futures[future]
+                try:
+                    part_id, part_bytes = future.result()
+                except UploadError as e:
+                    errors.append(str(e))
+                    continue
+
+                with self.lock:
+                    manifest['parts'][str(number)] = {'id': part_id, 'sha256': part_sha256}
+                    self.save_manifest(manifest)
+                    done_bytes += part_bytes
+                    if self.progress_callback:
+                        self.progress_callback(done_bytes, size)
+
+        if errors:
+            raise UploadError(
+                f"{len(errors)} parts failed; re-run to resume from outputs/uploads/. First error: {errors[0]}"
+            )
+
+        part_ids = [manifest['parts'][str(number)]['id'] for number in range(1, len(part_hashes) + 1)]
+        file_id = self.complete_upload(upload_id, part_ids, file_sha256)
+
+        self.manifest_path(file_sha256).unlink(missing_ok=True)
+        return file_id
+
+def upload_training_file(base_url, api_key, training_file, progress_callback=print_progress, **options):
+    """Convenience wrapper used by the fine-tuning scripts."""
+    uploader = MultipartUploader(base_url, api_key, progress_callback=progress_callback, **options)
+    return uploader.upload(training_file)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upload a training file in resumable parallel parts")
+    parser.add_argument('file', help="File to upload")
+    parser.add_argument('--base-url', help="API base URL (default: LLAMA_API_URL)")
+    parser.add_argument('--part-size-mb', type=float, default=DEFAULT_PART_SIZE / 1024 / 1024)
+    parser.add_argument('--workers', type=int, default=DEFAULT_MAX_WORKERS)
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv(Path(__file__).parent.parent / '.env')
+    api_key = os.getenv('LLAMA_API_KEY', 'local-test-key')
+    args.base_url = args.base_url or os.getenv('LLAMA_API_URL', 'https://api.llama-api.com')
+
+    print(f"Uploading {args.file} to {args.base_url}")
+    try:
+        file_id = upload_training_file(
+            args.base_url, api_key, args.file,
+            part_size=int(args.part_size_mb * 1024 * 1024),
+            max_workers=args.workers
+        )
+    except UploadError as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
+
+    print(f"✓ File uploaded successfully!")
+    print(f"  File ID: {file_id}")
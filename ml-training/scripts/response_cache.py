@@ -0,0 +1,176 @@
+"""
+Persistent cache of model answers for evaluation runs.
+
+Answers are stored in SQLite, keyed on a hash of the endpoint, model id,
+messages and sampling parameters. Re-running an evaluation after changing
+only the scoring therefore needs no API calls. Only successful answers are
+cached, together with the timings measured when they were first fetched.
+
+Modes:
+    use      read from the cache, fetch and store on a miss (default)
+    refresh  always fetch, overwriting what is cached
+    bypass   neither read nor write the cache
+    offline  read only; a miss is reported as an error instead of calling the API
+
+Usage:
+    python response_cache.py stats
+    python response_cache.py clear [--model MODEL]
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_DB = Path(__file__).parent.parent / 'outputs' / 'response_cache.db'
+MODES = ('use', 'refresh', 'bypass', 'offline')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    endpoint TEXT,
+    request TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at TEXT,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_responses_model ON responses(model);
+"""
+
+# What is kept of an answer; timings are the ones measured when it was fetched
+RECORD_FIELDS = (
+    'content', 'finish_reason', 'prompt_tokens', 'completion_tokens', 'latency',
+    'ttft', 'itl_mean', 'itl_p95', 'itl_max', 'tokens_per_second'
+)
+# Request fields that change how an answer is delivered, not what it says
+TRANSPORT_PARAMS = {'stream', 'stream_options'}
+
+def cache_request(endpoint, model, messages, params):
+    """The canonical request a cache key is computed from."""
+    return {
+        'endpoint': endpoint.rstrip('/'),
+        'model': model,
+        'messages': messages,
+        'params': {k: v for k, v in sorted(params.items()) if k not in TRANSPORT_PARAMS and v is not None}
+    }
+
+def cache_key(request):
+    canonical = json.dumps(request, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def to_record(result):
+    """Cacheable fields of a result dict (token counts may also come from an OpenAI 'usage' block)."""
+    usage = result.get('usage') or {}
+    return {field: result.get(field, usage.get(field)) for field in RECORD_FIELDS}
+
+class ResponseCache:
+    def __init__(self, db_path=DEFAULT_DB, mode='use'):
+        """
+        Open (and create if needed) the cache database.
+
+        Args:
+            db_path: SQLite file
+            mode: use, refresh, bypass or offline (see module docstring)
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode {mode!r}; expected one of {', '.join(MODES)}")
+        self.mode = mode
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Shared by evaluation worker threads; every statement runs under self.lock
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0}
+
+    @property
+    def offline(self):
+        return self.mode == 'offline'
+
+    def get(self, request):
+        """
+        Cached record for a request (see cache_request), or None.
+
+        Always None in refresh and bypass mode. Counts hits and misses.
+        """
+        if self.mode in ('refresh', 'bypass'):
+            return None
+        key = cache_key(request)
+        with self.lock:
+            row = self.conn.execute('SELECT response FROM responses WHERE key = ?', (key,)).fetchone()
+            if not row:
+                self.stats['misses'] += 1
+                return None
+            with self.conn:
+                self.conn.execute('UPDATE responses SET hits = hits + 1 WHERE key = ?', (key,))
+            self.stats['hits'] += 1
+        return json.loads(row[0])
+
+    def put(self, request, result):
+        """Store a successful result (no-op in bypass and offline mode)."""
+        if self.mode in ('bypass', 'offline') or result.get('error'):
+            return
+        with self.lock, self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO responses (key, model, endpoint, request, response, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (cache_key(request), request['model'], request['endpoint'],
+                 json.dumps(request, ensure_ascii=False), json.dumps(to_record(result), ensure_ascii=False),
+                 time.strftime('%Y-%m-%d %H:%M:%S'))
+            )
+            self.stats['writes'] += 1
+
+    def summary(self):
+        """One-line hit/miss report."""
+        lookups = self.stats['hits'] + self.stats['misses']
+        rate = f" ({self.stats['hits'] / lookups:.0%} hit rate)" if lookups else ""
+        return (f"Cache ({self.mode}): {self.stats['hits']:,} hits, {self.stats['misses']:,} misses{rate}, "
+                f"{self.stats['writes']:,} stored")
+
+    def model_counts(self):
+        """Cached answers and total hits per model."""
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT model, COUNT(*), SUM(hits) FROM responses GROUP BY model ORDER BY COUNT(*) DESC'
+            ).fetchall()
+        return {model: (count, hits) for model, count, hits in rows}
+
+    def clear(self, model=None):
+        """Delete cached answers (for one model, or all). Returns the number removed."""
+        with self.lock, self.conn:
+            if model:
+                cursor = self.conn.execute('DELETE FROM responses WHERE model = ?', (model,))
+            else:
+                cursor = self.conn.execute('DELETE FROM responses')
+        return cursor.rowcount
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or clear the evaluation response cache")
+    parser.add_argument('command', choices=['stats', 'clear'])
+    parser.add_argument('--model', help="clear: only this model's answers")
+    parser.add_argument('--db', default=str(DEFAULT_DB))
+    args = parser.parse_args()
+
+    with ResponseCache(args.db) as cache:
+        if args.command == 'clear':
+            print(f"✓ Removed {cache.clear(args.model):,} cached answer(s)")
+        else:
+            counts = cache.model_counts()
+            print(f"{sum(count for count, _ in counts.values()):,} cached answers in {cache.db_path}")
+            for model, (count, hits) in counts.items():
+                print(f"  {model}: {count:,} answers, {hits or 0:,} hits")
@@ -0,0 +1,438 @@
+"""
+Score model answers offline: links, topic adherence and length.
+
+The allowed help center articles are parsed once from SYSTEM_PROMPT.md and
+the verified URL mapping (embed_urls_in_responses.TOPIC_URL_MAPPING). Every
+answer is then checked for:
+
+    hallucinated_urls  whatsapp.com links that are not one of the allowed articles
+    expected_link      a link for the query's topic is present (topics with mapped URLs)
+    on_topic           the answer talks about the query's topic
+    business           the answer is framed around WhatsApp Business features
+    length_ok          MIN_WORDS..MAX_WORDS words and not cut off by max_tokens
+
+An answer's score is the fraction of the checks that apply to it which pass.
+Results are aggregated per topic; the topic is the prompt's own "topic"
+field or, failing that, is detected from the query.
+
+All patterns are compiled once, every answer is lowercased once and each
+pattern runs over it a single time. Lines are scored in batches, in
+parallel worker processes for large files.
+
+Input is any JSONL of answers: evaluation_harness.py runs ({"query", "content",
+"topic", ...}) or chat examples ({"messages": [...]}, last user and assistant turns).
+
+Usage:
+    python score_responses.py                                  # latest run in outputs/evaluations/runs/
+    python score_responses.py ../outputs/evaluations/runs/20250101-120000-model.jsonl --workers 8
+    python score_responses.py ../data/training/training_data_complete.jsonl --summary-only
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+from embed_urls_in_responses import TOPIC_URL_MAPPING
+
+SYSTEM_PROMPT_FILE = Path(__file__).parent.parent / 'SYSTEM_PROMPT.md'
+RUN_DIR = Path(__file__).parent.parent / 'outputs' / 'evaluations' / 'runs'
+SCORE_DIR = Path(__file__).parent.parent / 'outputs' / 'evaluations' / 'scores'
+BATCH_SIZE = 5000
+MIN_WORDS = 15
+MAX_WORDS = 400
+CHECKS = ('no_hallucinated_urls', 'expected_link', 'on_topic', 'business', 'length_ok')
+
+# "- Title - https://faq.whatsapp.com/<id>" lines in the system prompt
+ARTICLE_LINE = re.compile(r'^-\s*(.+?)\s+-\s+https?://faq\.whatsapp\.com/(\d+)\s*$', re.MULTILINE)
+URL_PATTERN = re.compile(r'(?:https?://|www\.|faq\.whatsapp\.com/)[^\s<>()\[\]{}"\'`*|]+', re.IGNORECASE)
+FAQ_ARTICLE = re.compile(r'faq\.whatsapp\.com/(\d+)')
+URL_TRAILING = '.,;:!?/'
+
+# Keywords per topic, in embed_urls_in_responses.determine_topic's order of precedence
+TOPIC_KEYWORDS = {
+    'catalog': r'catalog(?:ue)?s?|products?|collections?',
+    'labels': r'labels?',
+    'quick_replies': r'quick repl(?:y|ies)',
+    'greeting_message': r'greeting messages?',
+    'away_message': r'away messages?',
+    'statistics': r'statistics?|analytics',
+    'broadcast': r'broadcast(?:s|ing)?',
+    'business_profile': r'(?:business )?profiles?',
+    'ads': r'ads?|advertis\w*|click-to-whatsapp|ctwa',
+    'short_links': r'short links?|wa\.me|click-to-chat',
+    'verified': r'verified|verification|green check\w*',
+    'channels': r'channels?'
+}
+TOPIC_ORDER = {topic: rank for rank, topic in enumerate(TOPIC_KEYWORDS)}
+# One pass finds every topic mentioned: each alternative is a named group
+TOPIC_PATTERN = re.compile(
+    r'\b(?:' + '|'.join(f"(?P<{topic}>{keywords})" for topic, keywords in TOPIC_KEYWORDS.items()) + r')\b'
+)
+BUSINESS_PATTERN = re.compile(
+    r'\b(?:whatsapp business|business (?:app|account|tools?|features?)|ai agents?|customers?)\b'
+)
+
+def article_id(url):
+    """Help center article id of a faq.whatsapp.com URL, or None."""
+    match = FAQ_ARTICLE.search(url)
+    return match.group(1) if match else None
+
+def load_allowed_articles(system_prompt_path=SYSTEM_PROMPT_FILE):
+    """
+    Allowed articles: every URL listed in the system prompt plus the verified mapping.
+
+    Returns:
+        Dict of article id -> title
+    """
+    articles = {}
+    path = Path(system_prompt_path) if system_prompt_path else None
+    if path and path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            articles.update((article, title) for title, article in ARTICLE_LINE.findall(f.read()))
+    for info in TOPIC_URL_MAPPING.values():
+        for url in info['urls']:
+            articles.setdefault(article_id(url), info['title'])
+    return articles
+
+def detect_topic(text_lower):
+    """Highest-precedence topic mentioned in already lowercased text, or 'general'."""
+    found = {match.lastgroup for match in TOPIC_PATTERN.finditer(text_lower)}
+    return min(found, key=TOPIC_ORDER.get) if found else 'general'
+
+def answer_fields(row):
+    """(query, content, topic, finish_reason, error) of one input line."""
+    if row.get('messages'):
+        messages = row['messages']
+        query = next((m.get('content') for m in reversed(messages) if m.get('role') == 'user'), None)
+        content = next((m.get('content') for m in reversed(messages) if m.get('role') == 'assistant'), None)
+        return query, content, row.get('topic'), None, None if content else "No assistant turn"
+    return row.get('query'), row.get('content'), row.get('topic'), row.get('finish_reason'), row.get('error')
+
+class ResponseScorer:
+    def __init__(self, allowed_articles=None, min_words=MIN_WORDS, max_words=MAX_WORDS):
+        """
+        Args:
+            allowed_articles: Dict of article id -> title (default: load_allowed_articles())
+            min_words, max_words: Acceptable answer length
+        """
+        self.allowed = allowed_articles if allowed_articles is not None else load_allowed_articles()
+        self.topic_articles = {
+            topic: {article_id(url) for url in info['urls']}
+            for topic, info in TOPIC_URL_MAPPING.items() if topic != 'general'
+        }
+        self.min_words = min_words
+        self.max_words = max_words
+
+    def check_urls(self, content):
+        """(allowed article ids, hallucinated URLs, external URLs) linked in an answer."""
+        articles, hallucinated, external = [], [], []
+        for match in URL_PATTERN.finditer(content):
+            url = match.group().rstrip(URL_TRAILING)
+            bare = url.lower().split('://', 1)[-1].split('?', 1)[0].split('#', 1)[0]
+            if bare.startswith('www.'):
+                bare = bare[4:]
+            host = bare.split('/', 1)[0]
+            article = article_id(bare) if host == 'faq.whatsapp.com' else None
+            if article and article in self.allowed and bare.rstrip('/') == f"faq.whatsapp.com/{article}":
+                articles.append(article)
+            elif host == 'whatsapp.com' or host.endswith('.whatsapp.com'):
+                hallucinated.append(url)
+            elif host != 'wa.me':  # wa.me links are the business's own chat links
+                external.append(url)
+        return articles, hallucinated, external
+
+    def score(self, row):
+        """
+        Checks for one answer (an evaluation result dict or chat example).
+
+        Returns:
+            Dict of id, model, topic, words, articles, hallucinated_urls, external_urls,
+            the CHECKS (True/False, None where a check doesn't apply), truncated and score;
+            error and score None when there is no answer
+        """
+        query, content, topic, finish_reason, error = answer_fields(row)
+        if topic not in TOPIC_URL_MAPPING:
+            topic = detect_topic(query.lower()) if query else 'general'
+        scored = {'id': row.get('id'), 'model': row.get('model'), 'topic': topic}
+        if error or not content:
+            scored.update(error=error or "Empty answer", score=None)
+            return scored
+
+        content_lower = content.lower()
+        articles, hallucinated, external = self.check_urls(content)
+        mentioned = {match.lastgroup for match in TOPIC_PATTERN.finditer(content_lower)}
+        words = len(content.split())
+        truncated = finish_reason == 'length'
+        expected = self.topic_articles.get(topic)
+
+        checks = {
+            'no_hallucinated_urls': not hallucinated,
+            'expected_link': bool(expected.intersection(articles)) if expected else None,
+            'on_topic': topic in mentioned if topic != 'general' else None,
+            'business': bool(mentioned) or BUSINESS_PATTERN.search(content_lower) is not None,
+            'length_ok': self.min_words <= words <= self.max_words and not truncated
+        }
+        applicable = [checks[name] for name in CHECKS if checks[name] is not None]
+        scored.update(
+            words=words,
+            articles=articles,
+            hallucinated_urls=hallucinated,
+            external_urls=external,
+            truncated=truncated,
+            **checks,
+            score=round(sum(applicable) / len(applicable), 4)
+        )
+        return scored
+
+class ScoreAggregate:
+    """Per-topic counters; aggregates from separate batches are combined with merge()."""
+
+    def __init__(self):
+        self.topics = defaultdict(Counter)
+        self.hallucinated = Counter()
+        self.articles = Counter()
+
+    def add(self, scored):
+        counts = self.topics[scored['topic']]
+        counts['responses'] += 1
+        if scored['score'] is None:
+            counts['errors'] += 1
+            return
+        counts['scored'] += 1
+        counts['score'] += scored['score']
+        counts['words'] += scored['words']
+        counts['with_links'] += bool(scored['articles'])
+        counts['with_hallucinated'] += bool(scored['hallucinated_urls'])
+        counts['hallucinated_urls'] += len(scored['hallucinated_urls'])
+        counts['with_external'] += bool(scored['external_urls'])
+        counts['truncated'] += scored['truncated']
+        counts['bad_length'] += not scored['length_ok']
+        counts['off_business'] += not scored['business']
+        if scored['expected_link'] is not None:
+            counts['link_expected'] += 1
+            counts['missing_link'] += not scored['expected_link']
+        if scored['on_topic'] is not None:
+            counts['topic_checked'] += 1
+            counts['off_topic'] += not scored['on_topic']
+        self.hallucinated.update(scored['hallucinated_urls'])
+        self.articles.update(scored['articles'])
+
+    def merge(self, other):
+        for topic, counts in other.topics.items():
+            self.topics[topic].update(counts)
+        self.hallucinated.update(other.hallucinated)
+        self.articles.update(other.articles)
+
+    @staticmethod
+    def rates(counts):
+        def rate(part, whole):
+            return round(counts[part] / counts[whole], 4) if counts[whole] else None
+
+        return {
+            'responses': counts['responses'],
+            'errors': counts['errors'],
+            'mean_score': rate('score', 'scored'),
+            'mean_words': round(counts['words'] / counts['scored'], 1) if counts['scored'] else None,
+            'hallucination_rate': rate('with_hallucinated', 'scored'),
+            'hallucinated_urls': counts['hallucinated_urls'],
+            'missing_link_rate': rate('missing_link', 'link_expected'),
+            'off_topic_rate': rate('off_topic', 'topic_checked'),
+            'off_business_rate': rate('off_business', 'scored'),
+            'link_rate': rate('with_links', 'scored'),
+            'external_link_rate': rate('with_external', 'scored'),
+            'bad_length_rate': rate('bad_length', 'scored'),
+            'truncated': counts['truncated']
+        }
+
+    def summary(self, allowed=None, top=10):
+        total = Counter()
+        for counts in self.topics.values():
+            total.update(counts)
+        allowed = allowed or {}
+        return {
+            'overall': self.rates(total),
+            'topics': {topic: self.rates(counts) for topic, counts in sorted(
+                self.topics.items(), key=lambda item: -item[1]['responses'])},
+            'top_hallucinated_urls': dict(self.hallucinated.most_common(top)),
+            'top_articles': {f"{article} {allowed.get(article, '')}".strip(): n
+                             for article, n in self.articles.most_common(top)}
+        }
+
+# Set in each worker process by init_worker, so the allowed set is parsed once per process
+_scorer = None
+
+def init_worker(allowed_articles, min_words, max_words):
+    global _scorer
+    _scorer = ResponseScorer(allowed_articles, min_words, max_words)
+
+def score_batch(lines, scorer=None):
+    """
+    Score a batch of JSONL lines.
+
+    Returns:
+        (scored lines as one JSONL string, ScoreAggregate of the batch, number of unreadable lines)
+    """
+    scorer = scorer or _scorer
+    aggregate = ScoreAggregate()
+    output = []
+    bad = 0
+    for line in lines:
+        try:
+            row = json.loads(line)
+            scored = scorer.score(row)
+        except (ValueError, AttributeError, TypeError):
+            bad += 1
+            continue
+        aggregate.add(scored)
+        output.append(json.dumps(scored, ensure_ascii=False))
+    return '\n'.join(output) + '\n' if output else '', aggregate, bad
+
+def iter_batches(path, batch_size=BATCH_SIZE):
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = (line for line in f if line.strip())
+        while True:
+            batch = list(islice(lines, batch_size))
+            if not batch:
+                return
+            yield batch
+
+def score_file(path, output_path=None, workers=None, batch_size=BATCH_SIZE, allowed_articles=None,
+               min_words=MIN_WORDS, max_words=MAX_WORDS):
+    """
+    Score every answer in a JSONL file.
+
+    Args:
+        path: Answers JSONL
+        output_path: Where to write one scored line per answer (None: aggregates only)
+        workers: Worker processes (default: CPU count; 1 scores in this process)
+        batch_size: Lines per batch handed to a worker
+        allowed_articles: Dict of article id -> title (default: load_allowed_articles())
+
+    Returns:
+        Summary dict (see ScoreAggregate.summary) with the file, line counts and throughput
+    """
+    allowed = allowed_articles if allowed_articles is not None else load_allowed_articles()
+    workers = workers or os.cpu_count() or 1
+    aggregate = ScoreAggregate()
+    bad_lines = 0
+    started = time.perf_counter()
+    output = open(output_path, 'w', encoding='utf-8') if output_path else None
+
+    def collect(results):
+        nonlocal bad_lines
+        for text, batch_aggregate, bad in results:
+            aggregate.merge(batch_aggregate)
+            bad_lines += bad
+            if output:
+                output.write(text)
+
+    try:
+        if workers == 1:
+            scorer = ResponseScorer(allowed, min_words, max_words)
+            collect(score_batch(batch, scorer) for batch in iter_batches(path, batch_size))
+        else:
+            with ProcessPoolExecutor(workers, initializer=init_worker,
+                                     initargs=(allowed, min_words, max_words)) as executor:
+                # map() submits every batch up front; keep the backlog to a few batches per worker
+                batches = iter_batches(path, batch_size)
+                while True:
+                    window = list(islice(batches, workers * 4))
+                    if not window:
+                        break
+                    collect(executor.map(score_batch, window))
+    finally:
+        if output:
+            output.close()
+
+    seconds = time.perf_counter() - started
+    summary = aggregate.summary(allowed)
+    responses = summary['overall']['responses']
+    summary.update(
+        file=str(path),
+        bad_lines=bad_lines,
+        allowed_articles=len(allowed),
+        seconds=round(seconds, 2),
+        responses_per_minute=round(responses / seconds * 60) if seconds else None
+    )
+    return summary
+
+def latest_run(run_dir=RUN_DIR):
+    runs = sorted(run_dir.glob('*.jsonl')) if run_dir.exists() else []
+    return runs[-1] if runs else None
+
+def print_scores(summary):
+    overall = summary['overall']
+    print("\n" + "=" * 96)
+    print(f"Scores: {summary['file']}")
+    print("=" * 96)
+    print(f"{'Topic':<18}{'Answers':>9}{'Score':>8}{'Halluc.':>9}{'No link':>9}{'Off-topic':>11}"
+          f"{'Off-biz':>9}{'Length':>8}{'Words':>8}")
+    print("-" * 96)
+
+    def pct(value):
+        return f"{value:.1%}" if value is not None else '-'
+
+    for topic, stats in list(summary['topics'].items()) + [('ALL', overall)]:
+        if topic == 'ALL':
+            print("-" * 96)
+        print(f"{topic:<18}{stats['responses']:>9,}{stats['mean_score'] if stats['mean_score'] is not None else '-':>8}"
+              f"{pct(stats['hallucination_rate']):>9}{pct(stats['missing_link_rate']):>9}"
+              f"{pct(stats['off_topic_rate']):>11}{pct(stats['off_business_rate']):>9}"
+              f"{pct(stats['bad_length_rate']):>8}"
+              f"{stats['mean_words'] if stats['mean_words'] is not None else '-':>8}")
+
+    if summary['top_hallucinated_urls']:
+        print("\n⚠️  Most common links not in the allowed set:")
+        for url, count in summary['top_hallucinated_urls'].items():
+            print(f"   {count:>6,}  {url}")
+    if overall['errors'] or summary['bad_lines']:
+        print(f"\n{overall['errors']:,} answer(s) missing or failed, {summary['bad_lines']:,} unreadable line(s)")
+    print(f"\n{overall['responses']:,} answers against {summary['allowed_articles']} allowed articles "
+          f"in {summary['seconds']}s ({summary['responses_per_minute']:,}/min)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score model answers for links, topic adherence and length")
+    parser.add_argument('answers', nargs='?', help="Answers JSONL (default: latest evaluation run)")
+    parser.add_argument('--system-prompt', default=str(SYSTEM_PROMPT_FILE),
+                        help="File the allowed article URLs are read from")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--min-words', type=int, default=MIN_WORDS)
+    parser.add_argument('--max-words', type=int, default=MAX_WORDS)
+    parser.add_argument('--output', help="Scored JSONL (default: outputs/evaluations/scores/<name>.scored.jsonl); "
+                                           "the summary is written next to it")
+    parser.add_argument('--summary-only', action='store_true', help="Don't write per-answer scores")
+    args = parser.parse_args()
+
+    path = Path(args.answers) if args.answers else latest_run()
+    if not path or not path.exists():
+        print(f"❌ No answers file {'found in ' + str(RUN_DIR) if not args.answers else path}")
+        exit(1)
+
+    # The summary goes next to --output (<name>.scored.jsonl -> <name>.scores.json) when one is given
+    if args.output:
+        output = Path(args.output)
+        name = output.name[:-len('.scored.jsonl')] if output.name.endswith('.scored.jsonl') else output.stem
+        summary_path = output.with_name(f"{name}.scores.json")
+    else:
+        output = SCORE_DIR / f"{path.stem}.scored.jsonl"
+        summary_path = SCORE_DIR / f"{path.stem}.scores.json"
+    summary_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path = None if args.summary_only else output
+
+    allowed = load_allowed_articles(args.system_prompt)
+    print(f"Scoring {path} against {len(allowed)} allowed help center articles...")
+    summary = score_file(path, output_path, args.workers, args.batch_size, allowed, args.min_words, args.max_words)
+    print_scores(summary)
+
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    if output_path:
+        print(f"✓ Scored answers: {output_path}")
+    print(f"✓ Summary: {summary_path}")
@@ -1,8 +1,41 @@
 import requests
 from bs4 import BeautifulSoup
+from bs4.element import NavigableString, PreformattedString, Tag
 import json
 import time
 import re
+from pathlib import Path
+
+from chunk_articles import DEFAULT_OVERLAP_TOKENS, iter_passage_articles
+from article_change_detection import (
+    detect_article_changes,
+    load_fingerprints,
+    print_change_summary,
+    save_fingerprints,
+    save_manifest,
+)
+
+# Elements that start a new text block when the DOM walk enters or leaves them
+BLOCK_TAGS = {
+    'p', 'div', 'section', 'article', 'main', 'li', 'ul', 'ol', 'dl', 'dt', 'dd',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'pre', 'blockquote', 'table', 'tr', 'td', 'th',
+}
+HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+LIST_TAGS = {'ul', 'ol'}
+
+# Subtrees that never contain article text
+SKIP_TAGS = {
+    'script', 'style', 'noscript', 'template', 'svg', 'iframe',
+    'nav', 'header', 'footer', 'aside', 'form', 'button',
+}
+SKIP_ROLES = {'navigation', 'banner', 'contentinfo', 'search', 'dialog', 'menu'}
+BOILERPLATE_PATTERN = re.compile(
+    r'(^|[-_\s])(nav|navbar|navigation|menu|breadcrumbs?|footer|sidebar|'
+    r'cookies?|banner|share|social|related|feedback)([-_\s]|$)',
+    re.IGNORECASE
+)
+
+MIN_PARAGRAPH_LENGTH = 20  # Drops "Was this helpful?"-style snippets
 
 def scrape_whatsapp_help_article(url):
     """
@@ -27,24 +60,10 @@ def scrape_whatsapp_help_article(url):
         title = soup.find('h1')
         title_text = title.get_text(strip=True) if title else "Unknown Title"
 
-        # Extract main content
-        # WhatsApp FAQ pages typically have content in specific divs
-        content_divs = soup.find_all(['div', 'p', 'li'], class_=re.compile('content|text|article|body'))
-
-        # Fallback: get all paragraphs if specific divs not found
-        if not content_divs:
-            content_divs = soup.find_all('p')
-
-        content_parts = []
-        for div in content_divs:
-            text = div.get_text(strip=True)
-            if text and len(text) > 20:  # Filter out very short snippets
-                content_parts.append(text)
-
-        content = '\n\n'.join(content_parts)
-
-        # Clean up content
-        content = re.sub(r'\n{3,}', '\n\n', content)  # Remove excessive newlines
+        # Extract main content in a single pass over the article DOM
+        root = soup.find('main') or soup.find('article') or soup.body or soup
+        blocks = extract_article_blocks(root)
+        content = render_article_blocks(blocks, title_text)
 
         return {
             'url': url,
@@ -61,6 +80,116 @@ def scrape_whatsapp_help_article(url):
             'success': False
         }
 
+def is_boilerplate(element):
+    """Return True if an element is navigation, chrome or other non-article markup."""
+    if element.name in SKIP_TAGS:
+        return True
+    if element.get('role') in SKIP_ROLES or element.get('aria-hidden') == 'true':
+        return True
+
+    classes = element.get('class') or []
+    marker = ' '.join(classes) + ' ' + (element.get('id') or '')
+    return bool(BOILERPLATE_PATTERN.search(marker))
+
+def extract_article_blocks(root):
+    """
+    Walk the article DOM once and collect its leaf-level text blocks.
+
+    Every text node is visited exactly once. Inline text is buffered until the
+    walk enters or leaves a block element, so nested wrappers (div > div > p)
+    produce a single block instead of one copy per ancestor.
+
+    Args:
+        root: BeautifulSoup element containing the article
+
+    Returns:
+        List of (kind, level, text) tuples in document order, where kind is
+        'heading', 'list_item' or 'paragraph' and level is the heading level
+        or list nesting depth (0 for paragraphs)
+    """
+    blocks = []
+    parts = []
+    context = [('paragraph', 0)]  # Innermost open block
+    list_depth = 0
+
+    def flush():
+        text = re.sub(r'\s+', ' ', ''.join(parts)).strip()
+        parts.clear()
+        if text:
+            blocks.append((context[-1][0], context[-1][1], text))
+
+    # Explicit stack instead of recursion; (element, True) marks leaving a block
+    stack = [(child, False) for child in reversed(root.contents)]
+    while stack:
+        node, leaving = stack.pop()
+
+        if leaving:
+            flush()
+            context.pop()
+            if node.name in LIST_TAGS:
+                list_depth -= 1
+            continue
+
+        if isinstance(node, NavigableString):
+            if not isinstance(node, PreformattedString):  # Comments, doctypes, CDATA
+                parts.append(str(node))
+            continue
+
+        if not isinstance(node, Tag) or is_boilerplate(node):
+            continue
+
+        if node.name == 'br':
+            parts.append(' ')
+            continue
+
+        if node.name in BLOCK_TAGS:
+            flush()
+            if node.name in HEADING_TAGS:
+                context.append(('heading', int(node.name[1])))
+            elif node.name == 'li':
+                context.append(('list_item', max(list_depth, 1)))
+            else:
+                if node.name in LIST_TAGS:
+                    list_depth += 1
+                context.append(('paragraph', 0))
+            stack.append((node, True))
+
+        stack.extend((child, False) for child in reversed(node.contents))
+
+    flush()
+    return blocks
+
+def render_article_blocks(blocks, title=None):
+    """
+    Render extracted blocks as article text, keeping headings and list structure.
+
+    Headings become markdown-style "## Heading" lines, list items become
+    indented "•" bullets, and consecutive list items stay on adjacent lines.
+    A heading that repeats the article title is dropped.
+    """
+    lines = []
+    previous_kind = None
+
+    for kind, level, text in blocks:
+        if kind == 'heading':
+            if title and text == title:
+                continue
+            line = f"{'#' * max(level, 2)} {text}"
+        elif kind == 'list_item':
+            line = f"{'  ' * (level - 1)}• {text}"
+        else:
+            if len(text) < MIN_PARAGRAPH_LENGTH:
+                continue
+            line = text
+
+        if lines:
+            separator = '\n' if kind == 'list_item' and previous_kind == 'list_item' else '\n\n'
+            lines.append(separator)
+        lines.append(line)
+        previous_kind = kind
+
+    return ''.join(lines)
+
 def map_article_to_intent(title, content):
     """
     Map help article to intent category based on keywords.
@@ -91,7 +220,79 @@ def map_article_to_intent(title, content):
 
     return detected_intents if detected_intents else ['General']
 
-def convert_articles_to_jsonl(articles, output_file, format_type="qa"):
+def build_training_entry(article, format_type="qa"):
+    """
+    Build one JSONL training entry from a scraped article.
+
+    Args:
+        article: Article dict with title, content and url
+        format_type: "qa" or "instruction"
+    """
+    title = article['title']
+    content = article['content']
+    url = article['url']
+
+    # Map to intent
+    intents = map_article_to_intent(title, content)
+
+    if format_type == "qa":
+        # Question-Answer format
+        return {
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You are a helpful WhatsApp Business assistant. Provide accurate information based on official help center articles."
+                },
+                {
+                    "role": "user",
+                    "content": title
+                },
+                {
+                    "role": "assistant",
+                    "content": content
+                }
+            ],
+            "metadata": {
+                "source": "whatsapp_help_center",
+                "url": url,
+                "intents": intents
+            }
+        }
+
+    elif format_type == "instruction":
+        # Instruction format
+        return {
+            "instruction": "Answer the following question about WhatsApp Business.",
+            "input": title,
+            "output": content,
+            "metadata": {
+                "source": "whatsapp_help_center",
+                "url": url,
+                "intents": intents
+            }
+        }
+
+    raise ValueError(f"Unknown format type: {format_type}")
+
+def iter_training_entries(articles, format_type="qa", max_tokens=None, overlap_tokens=DEFAULT_OVERLAP_TOKENS):
+    """
+    Yield training entries for articles, one per article or one per passage.
+
+    With max_tokens set, each article is split into passages under that token
+    budget (see chunk_articles.py) and every passage becomes its own example
+    with a passage_id in its metadata.
+    """
+    if max_tokens:
+        articles = iter_passage_articles(articles, max_tokens, overlap_tokens)
+
+    for article in articles:
+        entry = build_training_entry(article, format_type)
+        if 'passage_id' in article:
+            entry['metadata']['passage_id'] = article['passage_id']
+        yield entry
+
+def convert_articles_to_jsonl(articles, output_file, format_type="qa", max_tokens=None,
+                              overlap_tokens=DEFAULT_OVERLAP_TOKENS):
     """
     Convert scraped articles to JSONL training format.
 
@@ -99,65 +300,69 @@ def convert_articles_to_jsonl(articles, output_file, format_type="qa"):
         articles: List of article dicts
         output_file: Output JSONL file path
         format_type: "qa" or "instruction"
+        max_tokens: Split long articles into passages under this token budget
+        overlap_tokens: Token overlap between consecutive passages
     """
     with open(output_file, 'w', encoding='utf-8') as f:
         count = 0
 
-        for article in articles:
-            if not article.get('success'):
-                continue
-
-            title = article['title']
-            content = article['content']
-            url = article['url']
-
-            # Map to intent
-            intents = map_article_to_intent(title, content)
-            intent_str = ', '.join(intents)
-
-            if format_type == "qa":
-                # Question-Answer format
-                entry = {
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": "You are a helpful WhatsApp Business assistant. Provide accurate information based on official help center articles."
-                        },
-                        {
-                            "role": "user",
-                            "content": title
-                        },
-                        {
-                            "role": "assistant",
-                            "content": content
-                        }
-                    ],
-                    "metadata": {
-                        "source": "whatsapp_help_center",
-                        "url": url,
-                        "intents": intents
-                    }
-                }
-
-            elif format_type == "instruction":
-                # Instruction format
-                entry = {
-                    "instruction": "Answer the following question about WhatsApp Business.",
-                    "input": title,
-                    "output": content,
-                    "metadata": {
-                        "source": "whatsapp_help_center",
-                        "url": url,
-                        "intents": intents
-                    }
-                }
-
+        successful = (article for article in articles if article.get('success'))
+        for entry in iter_training_entries(successful, format_type, max_tokens, overlap_tokens):
             f.write(json.dumps(entry, ensure_ascii=False) + '\n')
             count += 1
 
-        print(f"Converted {count} articles to JSONL format")
+        print(f"Converted articles to {count} JSONL examples")
         print(f"Output: {output_file}")
 
+def rebuild_training_examples(articles, manifest, output_file, format_type="qa", max_tokens=None,
+                              overlap_tokens=DEFAULT_OVERLAP_TOKENS):
+    """
+    Regenerate only the training examples affected by a change manifest.
+
+    Streams the existing JSONL once, keeps entries whose article did not change,
+    drops entries for changed or removed articles, and appends fresh entries
+    for new and changed articles. Falls back to a full conversion if the
+    output file does not exist yet.
+
+    Args:
+        articles: List of scraped article dicts from this run
+        manifest: Change manifest from article_change_detection.detect_article_changes
+        output_file: Existing JSONL training file to update in place
+        format_type: "qa" or "instruction"
+        max_tokens: Split long articles into passages under this token budget
+        overlap_tokens: Token overlap between consecutive passages
+    """
+    output_path = Path(output_file)
+    if not output_path.exists():
+        convert_articles_to_jsonl(articles, output_file, format_type, max_tokens, overlap_tokens)
+        return
+
+    rebuild = set(manifest['rebuild'])
+    stale = rebuild | set(manifest['drop'])
+    temp_path = output_path.with_suffix(output_path.suffix + '.tmp')
+
+    kept = 0
+    rebuilt = 0
+    with open(output_path, 'r', encoding='utf-8') as infile, \
+         open(temp_path, 'w', encoding='utf-8') as outfile:
+        for line in infile:
+            if not line.strip():
+                continue
+            url = json.loads(line).get('metadata', {}).get('url')
+            if url in stale:
+                continue
+            outfile.write(line)
+            kept += 1
+
+        affected = (a for a in articles if a.get('success') and a['url'] in rebuild)
+        for entry in iter_training_entries(affected, format_type, max_tokens, overlap_tokens):
+            outfile.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            rebuilt += 1
+
+    temp_path.replace(output_path)
+    print(f"Kept {kept} unchanged examples, rebuilt {rebuilt}, dropped examples for {len(manifest['drop'])} removed articles")
+    print(f"Output: {output_file}")
+
 def main():
     """
     Main function to scrape WhatsApp Business help articles.
@@ -209,6 +414,7 @@ def main():
     print()
 
     articles = []
+    failed_urls = []
     for i, url in enumerate(help_article_urls, 1):
         print(f"[{i}/{len(help_article_urls)}] Scraping: {url}")
         article = scrape_whatsapp_help_article(url)
@@ -218,6 +424,7 @@ def main():
             articles.append(article)
         else:
             print(f"  ✗ Failed: {article.get('error', 'Unknown error')}")
+            failed_urls.append(url)
 
         # Be respectful - add delay between requests
         time.sleep(1)
@@ -231,8 +438,23 @@ def main():
             json.dump(articles, f, indent=2, ensure_ascii=False)
         print(f"Raw articles saved to: ../outputs/help_articles_raw.json")
 
+        # Index them for full-text search
+        from article_store import ArticleStore
+        with ArticleStore() as store:
+            store.upsert_articles(articles, source='help_articles_raw.json')
+            print(f"Article store updated: ../outputs/articles.db ({store.count()} articles)")
+
+        # Compare against the previous run and rebuild only affected examples
+        print()
+        manifest, fingerprints = detect_article_changes(articles, load_fingerprints(), failed_urls)
+        print_change_summary(manifest)
+        save_manifest(manifest)
+        print(f"Change manifest saved to: ../outputs/article_changes.json")
+
         # Convert to JSONL training format
-        convert_articles_to_jsonl(articles, '../data/training/training_data_help_articles.jsonl', format_type="qa")
+        print()
+        rebuild_training_examples(articles, manifest, '../data/training/training_data_help_articles.jsonl', format_type="qa")
+        save_fingerprints(fingerprints)
 
     print("\nDone!")
 
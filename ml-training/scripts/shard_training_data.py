@@ -0,0 +1,263 @@
+"""
+Split a training file into upload-sized shards.
+
+Shards are cut on example (line) boundaries so that each stays under a byte
+limit and, optionally, an estimated token limit. With --shuffle, examples are
+spread across shards in a seeded random order. That order is reproducible, and
+only line offsets are held in memory, never the examples. Shards upload in
+parallel. A manifest next to the shards records each shard's hash and remote
+file id; job creation reads it to reference all shards.
+
+Usage:
+    python shard_training_data.py ../data/training/training_data_complete.jsonl --max-mb 100
+    python shard_training_data.py <file> --max-mb 100 --max-tokens 2000000 --shuffle --seed 42
+    python shard_training_data.py <file> --max-mb 100 --upload --create-job
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from chunk_articles import CHARS_PER_TOKEN
+from fine_tuning_client import FineTuningClient, FineTuningProviderError, create_provider, default_hyperparameters
+
+load_dotenv(Path(__file__).parent.parent / '.env')
+
+SHARD_DIR = Path(__file__).parent.parent / 'outputs' / 'shards'
+# Per-file limit of the upload API
+MAX_UPLOAD_FILE_BYTES = int(os.getenv('MAX_UPLOAD_FILE_BYTES', str(512 * 1024 * 1024)))
+DEFAULT_UPLOAD_WORKERS = 4
+
+class ShardError(Exception):
+    """Raised when the data cannot be sharded within the limits."""
+
+def index_examples(path):
+    """
+    Scan a JSONL file once.
+
+    Returns:
+        (list of (offset, length) per non-empty line, sha256 of the file)
+    """
+    offsets = []
+    digest = hashlib.sha256()
+    offset = 0
+    with open(path, 'rb') as f:
+        for line in f:
+            digest.update(line)
+            if line.strip():
+                offsets.append((offset, len(line)))
+            offset += len(line)
+    return offsets, digest.hexdigest()
+
+def iter_lines(path, offsets):
+    """Yield the raw lines at the given offsets (in that order)."""
+    with open(path, 'rb') as f:
+        for offset, length in offsets:
+            f.seek(offset)
+            line = f.read(length)
+            yield line if line.endswith(b'\n') else line + b'\n'
+
+def shard_file(path, max_bytes=MAX_UPLOAD_FILE_BYTES, max_tokens=None, shuffle=False, seed=0, output_dir=None):
+    """
+    Write shards and a manifest.
+
+    Args:
+        path: Training JSONL file
+        max_bytes: Byte limit per shard
+        max_tokens: Optional estimated-token limit per shard
+        shuffle: Spread examples across shards in seeded random order
+        seed: Shuffle seed
+        output_dir: Where shards go (default: outputs/shards/<name>-<hash>/)
+
+    Re-sharding the same source with the same limits keeps the file ids of
+    already uploaded shards from the previous manifest, so they aren't uploaded again.
+
+    Returns:
+        (manifest dict, path of the manifest.json saved next to the shards)
+    """
+    path = Path(path)
+    offsets, source_sha256 = index_examples(path)
+    if shuffle:
+        random.Random(seed).shuffle(offsets)
+
+    output_dir = Path(output_dir or SHARD_DIR / f"{path.stem}-{source_sha256[:8]}")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    settings = {'source_sha256': source_sha256, 'max_bytes': max_bytes, 'max_tokens': max_tokens,
+                'shuffle': shuffle, 'seed': seed if shuffle else None}
+    uploaded = {}
+    if (output_dir / 'manifest.json').exists():
+        previous = load_manifest(output_dir / 'manifest.json')
+        if all(previous.get(key) == value for key, value in settings.items()):
+            uploaded = {shard['sha256']: shard['file_id'] for shard in previous['shards'] if shard.get('file_id')}
+    for old_shard in output_dir.glob('shard-*.jsonl'):
+        old_shard.unlink()
+
+    shards = []
+    current = None
+
+    def close_shard():
+        current['file'].close()
+        shards.append({
+            'path': current['path'].name,
+            'examples': current['examples'],
+            'bytes': current['bytes'],
+            'tokens': current['tokens'],
+            'sha256': current['hash'].hexdigest(),
+            'file_id': uploaded.get(current['hash'].hexdigest())
+        })
+
+    try:
+        for number, line in enumerate(iter_lines(path, offsets), 1):
+            tokens = -(-len(line) // CHARS_PER_TOKEN)  # Same estimate as chunk_articles.estimate_tokens
+            if len(line) > max_bytes or (max_tokens and tokens > max_tokens):
+                raise ShardError(
+                    f"Example {number} alone exceeds the shard limit ({len(line)} bytes, ~{tokens} tokens)"
+                )
+
+            if current and (current['bytes'] + len(line) > max_bytes
+                            or (max_tokens and current['tokens'] + tokens > max_tokens)):
+                close_shard()
+                current = None
+
+            if current is None:
+                shard_path = output_dir / f"shard-{len(shards):03d}.jsonl"
+                current = {
+                    'path': shard_path, 'file': open(shard_path, 'wb'),
+                    'examples': 0, 'bytes': 0, 'tokens': 0, 'hash': hashlib.sha256()
+                }
+
+            current['file'].write(line)
+            current['hash'].update(line)
+            current['examples'] += 1
+            current['bytes'] += len(line)
+            current['tokens'] += tokens
+    except Exception:
+        if current:
+            current['file'].close()
+        raise
+
+    if current:
+        close_shard()
+
+    manifest = {
+        'source': str(path.resolve()),
+        'source_sha256': source_sha256,
+        'examples': len(offsets),
+        'max_bytes': max_bytes,
+        'max_tokens': max_tokens,
+        'shuffle': shuffle,
+        'seed': seed if shuffle else None,
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'shards': shards
+    }
+    save_manifest(manifest, output_dir / 'manifest.json')
+    return manifest, output_dir / 'manifest.json'
+
+def save_manifest(manifest, manifest_path):
+    """Write the manifest atomically."""
+    manifest_path = Path(manifest_path)
+    temp_path = manifest_path.with_suffix('.tmp')
+    with open(temp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    temp_path.replace(manifest_path)
+
+def load_manifest(manifest_path):
+    with open(manifest_path, 'r') as f:
+        return json.load(f)
+
+def upload_shards(client, manifest_path, max_workers=DEFAULT_UPLOAD_WORKERS):
+    """
+    Upload every shard without a file id yet, in parallel, saving each id as it lands.
+
+    Re-running after a failure only uploads the missing shards.
+
+    Returns:
+        List of file ids in shard order
+    """
+    manifest_path = Path(manifest_path)
+    manifest = load_manifest(manifest_path)
+    pending = [shard for shard in manifest['shards'] if not shard.get('file_id')]
+
+    errors = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(client.upload, manifest_path.parent / shard['path']): shard for shard in pending}
+        for future in as_completed(futures):
+            shard = futures[future]
+            try:
+                shard['file_id'] = future.result()
+            except (FineTuningProviderError, OSError) as e:
+                errors.append(f"{shard['path']}: {e}")
+                continue
+            save_manifest(manifest, manifest_path)
+            print(f"  ✓ {shard['path']} ({shard['examples']:,} examples, {shard['bytes'] / 1e6:.1f} MB): "
+                  f"{shard['file_id']}")
+
+    if errors:
+        raise ShardError(f"{len(errors)} shard upload(s) failed; re-run to retry. First error: {errors[0]}")
+    return [shard['file_id'] for shard in manifest['shards']]
+
+def create_job_from_manifest(client, manifest_path, model, suffix, hyperparameters):
+    """Start one fine-tuning job over all uploaded shards of a manifest."""
+    manifest = load_manifest(manifest_path)
+    file_ids = [shard.get('file_id') for shard in manifest['shards']]
+    if not all(file_ids):
+        raise ShardError("Not every shard has been uploaded yet; run upload_shards first")
+    return client.create_job(file_ids[0] if len(file_ids) == 1 else file_ids, model, suffix, hyperparameters)
+
+def print_manifest(manifest):
+    print(f"\n✓ {manifest['examples']:,} examples → {len(manifest['shards'])} shard(s)"
+          + (f" (shuffled, seed {manifest['seed']})" if manifest['shuffle'] else ""))
+    for shard in manifest['shards']:
+        print(f"  {shard['path']}: {shard['examples']:>7,} examples  {shard['bytes'] / 1e6:8.1f} MB"
+              f"  ~{shard['tokens']:,} tokens")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Split a training file into upload-sized shards")
+    parser.add_argument('input')
+    parser.add_argument('--max-mb', type=float, default=MAX_UPLOAD_FILE_BYTES / 1024 / 1024)
+    parser.add_argument('--max-tokens', type=int, help="Estimated token limit per shard")
+    parser.add_argument('--shuffle', action='store_true')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output-dir')
+    parser.add_argument('--upload', action='store_true', help="Upload the shards after writing them")
+    parser.add_argument('--create-job', action='store_true', help="Start a fine-tuning job over the shards")
+    parser.add_argument('--workers', type=int, default=DEFAULT_UPLOAD_WORKERS)
+    parser.add_argument('--provider', default=os.getenv('FINE_TUNING_PROVIDER', 'llama-api'),
+                        choices=['llama-api', 'llama-stack', 'mock'])
+    args = parser.parse_args()
+
+    print(f"Sharding {args.input}...")
+    try:
+        manifest, manifest_path = shard_file(
+            args.input, int(args.max_mb * 1024 * 1024), args.max_tokens, args.shuffle, args.seed, args.output_dir
+        )
+    except ShardError as e:
+        print(f"❌ {e}")
+        exit(1)
+    print_manifest(manifest)
+
+    print(f"✓ Manifest: {manifest_path}")
+
+    if args.upload or args.create_job:
+        client = FineTuningClient(create_provider(args.provider))
+        print(f"\nUploading {len(manifest['shards'])} shard(s) with {args.workers} workers...")
+        try:
+            upload_shards(client, manifest_path, args.workers)
+            if args.create_job:
+                job = create_job_from_manifest(
+                    client, manifest_path,
+                    os.getenv('MODEL_NAME', 'llama3.1-8b'),
+                    os.getenv('OUTPUT_MODEL_NAME', 'whatsapp-business-assistant-v1'),
+                    default_hyperparameters()
+                )
+                print(f"\n✓ Job {job['id']}: {job['status']}")
+        except (ShardError, FineTuningProviderError) as e:
+            print(f"❌ {e}")
+            exit(1)
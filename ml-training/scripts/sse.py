@@ -0,0 +1,127 @@
+"""
+Incremental server-sent events (text/event-stream) parser.
+
+Bytes are fed in as they come off the socket, in chunks of any size, and
+complete events come out. Bytes are copied as little as possible: the
+buffer is scanned from where the previous scan stopped and compacted once
+per chunk, not per line, and a single-line data field (the usual shape of
+chat completion chunks) is handed out without joining. LF, CRLF and CR
+line endings are accepted, as the spec requires.
+"""
+
+import re
+
+LINE_END = re.compile(rb'\r\n|\r|\n')
+
+class SSEEvent:
+    __slots__ = ('event', 'data', 'id', 'retry')
+
+    def __init__(self, event, data, id=None, retry=None):
+        self.event = event
+        self.data = data  # bytes
+        self.id = id
+        self.retry = retry
+
+    def __repr__(self):
+        return f"SSEEvent(event={self.event!r}, data={self.data[:60]!r}, id={self.id!r})"
+
+class SSEParser:
+    def __init__(self):
+        self.buffer = bytearray()
+        self.scan_from = 0  # Bytes before this in the buffer are known not to contain a line end
+        self.data = []
+        self.event_type = None
+        self.last_event_id = None
+        self.retry = None
+
+    def feed(self, chunk):
+        """
+        Add bytes and return the events they complete.
+
+        Returns:
+            List of SSEEvent (often empty or a single event)
+        """
+        self.buffer += chunk
+        events = []
+        buffer = self.buffer
+        position = 0  # Start of the current line
+
+        while True:
+            match = LINE_END.search(buffer, max(position, self.scan_from))
+            if not match:
+                break
+            # A CR at the very end might be the first half of a CRLF split across chunks
+            if match.start() == len(buffer) - 1 and buffer[-1] == 0x0D:
+                break
+            event = self.process_line(buffer, position, match.start())
+            if event:
+                events.append(event)
+            position = match.end()
+
+        if position:
+            del buffer[:position]
+        self.scan_from = max(len(buffer) - 1, 0)
+        return events
+
+    def process_line(self, buffer, start, end):
+        if start == end:
+            return self.dispatch()
+        if buffer[start] == 0x3A:  # ':' comment / keep-alive
+            return None
+
+        colon = buffer.find(b':', start, end)
+        if colon < 0:
+            field, value = bytes(buffer[start:end]), b''
+        else:
+            field = bytes(buffer[start:colon])
+            value_start = colon + 1
+            if value_start < end and buffer[value_start] == 0x20:
+                value_start += 1
+            value = bytes(buffer[value_start:end])
+
+        if field == b'data':
+            self.data.append(value)
+        elif field == b'event':
+            self.event_type = value.decode('utf-8', errors='replace')
+        elif field == b'id':
+            if b'\0' not in value:
+                self.last_event_id = value.decode('utf-8', errors='replace')
+        elif field == b'retry':
+            if value.isdigit():
+                self.retry = int(value)
+        return None
+
+    def dispatch(self):
+        """Blank line: emit the pending event, if it has any data."""
+        if not self.data:
+            self.event_type = None
+            return None
+        data = self.data[0] if len(self.data) == 1 else b'\n'.join(self.data)
+        event = SSEEvent(self.event_type or 'message', data, self.last_event_id, self.retry)
+        self.data = []
+        self.event_type = None
+        return event
+
+    def close(self):
+        """
+        End of stream: a trailing CR still ends its line, and an event that
+        never got its blank line is dropped, as the spec says.
+
+        Returns:
+            Events completed by the trailing CR, if any
+        """
+        events = self.feed(b'\n') if self.buffer.endswith(b'\r') else []
+        self.buffer.clear()
+        self.scan_from = 0
+        self.data = []
+        self.event_type = None
+        return events
+
+async def iter_events(chunks):
+    """Async iterator of SSEEvent over an async iterator of byte chunks."""
+    parser = SSEParser()
+    async for chunk in chunks:
+        for event in parser.feed(chunk):
+            yield event
+    for event in parser.close():
+        yield event
@@ -0,0 +1,165 @@
+"""
+Stream training examples straight into an upload request.
+
+Examples come from a generator (e.g. create_final_clean_file.iter_clean_examples)
+and are validated, hashed and optionally gzip-compressed as they are
+serialized, then sent as a chunked multipart body. The final training file
+never has to be written to disk and read back before uploading.
+
+The SHA-256 of the JSONL content is only known once the last example has been
+sent, so it goes in a form field after the file part; servers that check it
+reject the upload if the bytes they received don't match.
+"""
+
+import hashlib
+import json
+import uuid
+import zlib
+
+CHUNK_SIZE = 64 * 1024
+VALID_ROLES = {'system', 'user', 'assistant'}
+
+def validate_example(example):
+    """
+    Check one chat training example.
+
+    Returns:
+        Error message, or None if the example is valid
+    """
+    messages = example.get('messages') if isinstance(example, dict) else None
+    if not isinstance(messages, list) or not messages:
+        return "Missing 'messages' field"
+    for i, message in enumerate(messages):
+        if not isinstance(message, dict) or message.get('role') not in VALID_ROLES:
+            return f"Message {i+1}: invalid role"
+        if not isinstance(message.get('content'), str):
+            return f"Message {i+1}: content must be a string"
+    return None
+
+def print_stream_progress(examples, num_bytes):
+    """Default progress callback for streamed uploads (total size is unknown)."""
+    print(f"\r  ↑ {examples:,} examples  {num_bytes / 1e6:.1f} MB", end='', flush=True)
+
+class ExampleStream:
+    def __init__(self, examples, skip_invalid=False, chunk_size=CHUNK_SIZE, progress_callback=None):
+        """
+        Args:
+            examples: Iterable of training example dicts
+            skip_invalid: Drop invalid examples instead of aborting the upload
+            chunk_size: Approximate bytes per yielded chunk
+            progress_callback: Called as callback(examples_sent, bytes_sent) per chunk
+        """
+        self.examples = examples
+        self.skip_invalid = skip_invalid
+        self.chunk_size = chunk_size
+        self.progress_callback = progress_callback
+        self.hash = hashlib.sha256()
+        self.count = 0
+        self.skipped = 0
+        self.bytes = 0
+        self.wire_bytes = None  # Bytes actually sent (after framing/compression), set by the provider
+        self.finished = False
+
+    def __iter__(self):
+        """Yield the JSONL content in chunks, validating and hashing as it goes."""
+        buffer = []
+        buffered = 0
+        for number, example in enumerate(self.examples, 1):
+            error = validate_example(example)
+            if error:
+                if self.skip_invalid:
+                    self.skipped += 1
+                    continue
+                raise ValueError(f"Example {number}: {error}")
+
+            line = (json.dumps(example, ensure_ascii=False) + '\n').encode('utf-8')
+            self.hash.update(line)
+            self.count += 1
+            self.bytes += len(line)
+            buffer.append(line)
+            buffered += len(line)
+
+            if buffered >= self.chunk_size:
+                yield self.flush(buffer)
+                buffer, buffered = [], 0
+
+        if buffer:
+            yield self.flush(buffer)
+        self.finished = True
+        if self.progress_callback:
+            print()
+
+    def flush(self, buffer):
+        if self.progress_callback:
+            self.progress_callback(self.count, self.bytes)
+        return b''.join(buffer)
+
+    @property
+    def sha256(self):
+        if not self.finished:
+            raise RuntimeError("Stream has not been fully consumed yet")
+        return self.hash.hexdigest()
+
+    def stats(self):
+        return {
+            'examples': self.count,
+            'skipped': self.skipped,
+            'bytes': self.bytes,
+            'sha256': self.sha256
+        }
+
+def gzip_chunks(chunks, level=6):
+    """Gzip-compress an iterable of byte chunks on the fly."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def multipart_body(stream, filename, fields=None, trailing_fields=None, boundary=None):
+    """
+    Build a multipart/form-data body around a streamed file part.
+
+    Args:
+        stream: Iterable of file content chunks
+        filename: Filename reported for the 'file' field
+        fields: Form fields sent before the file
+        trailing_fields: Callable returning form fields sent after the file
+                         (evaluated once the stream is exhausted)
+        boundary: Multipart boundary (random by default)
+
+    Returns:
+        (content_type, iterator of byte chunks)
+    """
+    boundary = boundary or f"----wba{uuid.uuid4().hex}"
+
+    def field(name, value):
+        return (f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n"
+                f"{value}\r\n").encode('utf-8')
+
+    def chunks():
+        for name, value in (fields or {}).items():
+            yield field(name, value)
+        yield (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+               f"Content-Type: application/jsonl\r\n\r\n").encode('utf-8')
+        for chunk in stream:
+            yield chunk
+        yield b'\r\n'
+        for name, value in (trailing_fields() if trailing_fields else {}).items():
+            yield field(name, value)
+        yield f"--{boundary}--\r\n".encode('utf-8')
+
+    return f"multipart/form-data; boundary={boundary}", chunks()
+
+class ByteCounter:
+    """Pass-through iterator that counts the bytes actually put on the wire."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.bytes = 0
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            self.bytes += len(chunk)
+            yield chunk
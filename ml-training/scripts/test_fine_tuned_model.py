@@ -2,10 +2,14 @@
 Test your fine-tuned WhatsApp Business Assistant model
 """
 
+import argparse
 import os
+import time
 from dotenv import load_dotenv
 from pathlib import Path
 
+from response_cache import ResponseCache, cache_request
+
 # Load environment
 load_dotenv(Path(__file__).parent.parent / '.env')
 
@@ -37,67 +41,118 @@ Proactive WhatsApp Business Suggestions:
 
 Always be professional, helpful, and concise. Provide step-by-step instructions when explaining features. Keep every answer focused on WhatsApp Business-specific functionality."""
 
-def test_with_llama_api():
-    """Test the fine-tuned model using llama-api.com"""
-    import requests
+# Test queries
+TEST_QUERIES = [
+    "How do I create a product catalog?",
+    "What are labels and how can I use them?",
+    "A customer is asking about my business hours, what should I do?",
+    "How can I automate responses to common questions?",
+    "How do I track my message statistics?"
+]
+
+def query_model(model_id, query, api_key=None, base_url=None, session=None, max_tokens=500, temperature=0.7,
+                system_prompt=SYSTEM_PROMPT, cache=None):
+    """
+    Ask a model one question through the llama-api.com chat completions API.
+
+    Args:
+        model_id: Model to query
+        query: User message
+        api_key, base_url: Default to LLAMA_API_KEY / LLAMA_API_URL
+        session: Optional requests.Session to reuse connections (default: a new create_session())
+        max_tokens, temperature: Sampling settings
+        system_prompt: System message sent before the query
+        cache: Optional ResponseCache to answer repeated questions from
+
+    Returns:
+        Dict with content (None on failure), error, latency in seconds, usage and cached
+    """
+    from fine_tuning_client import create_session
+
+    api_key = api_key or os.getenv('LLAMA_API_KEY')
+    base_url = (base_url or os.getenv('LLAMA_API_URL', 'https://api.llama-api.com')).rstrip('/')
+
+    # Prepare the request with SYSTEM PROMPT
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": query}
+    ]
 
-    api_key = os.getenv('LLAMA_API_KEY')
+    request = cache_request(base_url, model_id, messages, {'max_tokens': max_tokens, 'temperature': temperature})
+    record = cache.get(request) if cache else None
+    if record:
+        usage = {'prompt_tokens': record['prompt_tokens'], 'completion_tokens': record['completion_tokens']}
+        return {'content': record['content'], 'error': None, 'latency': record['latency'], 'usage': usage,
+                'cached': True}
+    if cache and cache.offline:
+        return {'content': None, 'error': "Not in the response cache (offline)", 'latency': 0, 'usage': None}
+
+    session = session or create_session()
+    start = time.perf_counter()
+    try:
+        response = session.post(
+            f"{base_url}/chat/completions",
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "model": model_id,
+                "messages": messages,
+                "max_tokens": max_tokens,
+                "temperature": temperature
+            },
+            timeout=30
+        )
+    except Exception as e:
+        return {'content': None, 'error': f"Request failed: {e}", 'latency': time.perf_counter() - start, 'usage': None}
 
+    latency = time.perf_counter() - start
+    if response.status_code != 200:
+        return {'content': None, 'error': f"{response.status_code} - {response.text}", 'latency': latency, 'usage': None}
+
+    try:
+        data = response.json()
+        content = data['choices'][0]['message']['content']
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        return {'content': None, 'error': f"Unexpected response ({type(e).__name__}: {e}): {response.text[:200]}",
+                'latency': latency, 'usage': None}
+    result = {
+        'content': content,
+        'error': None,
+        'latency': latency,
+        'usage': data.get('usage'),
+        'cached': False
+    }
+    if cache:
+        cache.put(request, result)
+    return result
+
+def test_with_llama_api(cache=None):
+    """Test the fine-tuned model using llama-api.com"""
     # Your fine-tuned model ID (you'll get this after fine-tuning completes)
     # Replace this with your actual fine-tuned model ID
     model_id = os.getenv('FINE_TUNED_MODEL_ID', 'your-fine-tuned-model-id')
 
-    # Test queries
-    test_queries = [
-        "How do I create a product catalog?",
-        "What are labels and how can I use them?",
-        "A customer is asking about my business hours, what should I do?",
-        "How can I automate responses to common questions?",
-        "How do I track my message statistics?"
-    ]
-
     print("=" * 70)
     print("Testing Fine-Tuned WhatsApp Business Assistant")
     print("=" * 70)
     print(f"\nModel: {model_id}")
     print(f"Using SYSTEM PROMPT to establish model identity\n")
 
-    for i, query in enumerate(test_queries, 1):
+    from fine_tuning_client import create_session
+    session = create_session()
+
+    for i, query in enumerate(TEST_QUERIES, 1):
         print(f"\n{'='*70}")
         print(f"Test {i}: {query}")
         print('='*70)
 
-        # Prepare the request with SYSTEM PROMPT
-        messages = [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": query}
-        ]
-
-        try:
-            response = requests.post(
-                "https://api.llama-api.com/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": model_id,
-                    "messages": messages,
-                    "max_tokens": 500,
-                    "temperature": 0.7
-                },
-                timeout=30
-            )
-
-            if response.status_code == 200:
-                result = response.json()
-                assistant_message = result['choices'][0]['message']['content']
-                print(f"\n🤖 Assistant: {assistant_message}")
-            else:
-                print(f"❌ Error: {response.status_code} - {response.text}")
-
-        except Exception as e:
-            print(f"❌ Request failed: {e}")
+        result = query_model(model_id, query, session=session, cache=cache)
+        if result['error']:
+            print(f"❌ Error: {result['error']}")
+        else:
+            print(f"\n🤖 Assistant{' (cached)' if result.get('cached') else ''}: {result['content']}")
 
         print()
 
@@ -134,6 +189,13 @@ def test_with_llama_stack():
         print(f"❌ Error: {e}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test the fine-tuned model")
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument('--no-cache', action='store_true', help="Don't read or write the response cache")
+    cache_group.add_argument('--refresh-cache', action='store_true', help="Re-query and update the cache")
+    cache_group.add_argument('--offline', action='store_true', help="Only use cached answers")
+    args = parser.parse_args()
+
     print("\n" + "="*70)
     print("IMPORTANT: Update your fine-tuned model ID")
     print("="*70)
@@ -153,4 +215,7 @@ if __name__ == "__main__":
         # Run tests
         print(f"\n✓ Model ID found: {model_id}")
         print("\nStarting tests...\n")
-        test_with_llama_api()
+        mode = 'bypass' if args.no_cache else 'refresh' if args.refresh_cache else 'offline' if args.offline else 'use'
+        with ResponseCache(mode=mode) as cache:
+            test_with_llama_api(cache)
+            print(cache.summary())
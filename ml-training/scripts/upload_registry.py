@@ -0,0 +1,92 @@
+"""
+Local registry of uploaded training files and the jobs started from them.
+
+Files are keyed by the API they were uploaded to and their content SHA-256;
+jobs by the dataset hash plus model, suffix and hyperparameters. Re-running a
+fine-tune on byte-identical data reuses the remote file instead of uploading
+it again, and an identical job that is still queued, running or finished is
+reported instead of being started twice.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+
+REGISTRY_FILE = Path(__file__).parent.parent / 'outputs' / 'upload_registry.json'
+
+def fingerprint_file(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def job_fingerprint(dataset_sha256, model, suffix, hyperparameters):
+    """Stable hash of everything that determines a job's result."""
+    canonical = json.dumps(
+        {'dataset': dataset_sha256, 'model': model, 'suffix': suffix, 'hyperparameters': hyperparameters or {}},
+        sort_keys=True, separators=(',', ':')
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class UploadRegistry:
+    def __init__(self, path=REGISTRY_FILE):
+        """Load the registry (an empty one if the file does not exist yet)."""
+        self.path = Path(path)
+        self.lock = threading.RLock()
+        self.files = {}
+        self.jobs = {}
+        if self.path.exists():
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            self.files = data.get('files', {})
+            self.jobs = data.get('jobs', {})
+
+    def save(self):
+        """Write the registry atomically."""
+        with self.lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_suffix('.tmp')
+            with open(temp_path, 'w') as f:
+                json.dump({'files': self.files, 'jobs': self.jobs}, f, indent=2)
+            temp_path.replace(self.path)
+
+    def find_file(self, target, sha256):
+        """Previously uploaded file with this content on this API, or None."""
+        return self.files.get(f"{target}|{sha256}")
+
+    def record_file(self, target, sha256, file_id, **fields):
+        with self.lock:
+            self.files[f"{target}|{sha256}"] = dict(
+                fields, file_id=file_id, sha256=sha256, uploaded_at=time.strftime('%Y-%m-%d %H:%M:%S')
+            )
+            self.save()
+
+    def forget_file(self, target, sha256):
+        """Drop a file the API no longer has."""
+        with self.lock:
+            if self.files.pop(f"{target}|{sha256}", None):
+                self.save()
+
+    def dataset_for_file(self, target, file_id):
+        """Content hash of an uploaded file, if it was uploaded through the registry."""
+        for key, record in self.files.items():
+            if record['file_id'] == file_id and key.startswith(f"{target}|"):
+                return record['sha256']
+        return None
+
+    def find_job(self, target, job_key):
+        return self.jobs.get(f"{target}|{job_key}")
+
+    def record_job(self, target, job_key, job_id, **fields):
+        with self.lock:
+            self.jobs[f"{target}|{job_key}"] = dict(
+                fields, job_id=job_id, created_at=time.strftime('%Y-%m-%d %H:%M:%S')
+            )
+            self.save()
@@ -0,0 +1,418 @@
+"""
+Token and cost accounting for every API call the tooling makes.
+
+The shared clients record each call they send: fine_tuning_client.create_session()
+sessions (status checks, test_fine_tuned_model.py, auto_evaluate.py) through a
+response hook, and chat_client.ChatClient (evaluation_harness.py, load tests,
+compare_models.py) once an answer is complete. Each call becomes one JSON line
+in outputs/usage/usage-<date>.jsonl:
+
+    ts, source (script), endpoint, path, model, status, error_type, latency,
+    prompt_tokens, completion_tokens, estimated, system_chars, prompt_chars,
+    turn, cost
+
+Lines are appended to a line-buffered file, so a call costs one small write()
+and concurrent processes can share a day's file. A new file starts every day;
+files older than KEEP_DAYS are removed. Answers served from the response
+cache and cassette replays are not API calls and are not recorded. Set
+USAGE_ACCOUNTING=off to stop recording.
+
+Token counts come from the API's usage block. Where a server reports none,
+prompt tokens are estimated at CHARS_PER_TOKEN and the line is marked
+estimated. Costs are estimates from a price table in USD per million tokens;
+set USAGE_PRICES_FILE to a JSON file of {"model": [input, output]} to use
+real prices.
+
+The summary breaks usage down by model, script or day and works out what the
+system prompt costs: the share of prompt tokens it takes, its cost per
+conversation (it is resent with every turn), and the same projected for
+SYSTEM_PROMPT.md, which the assistant sends.
+
+Usage:
+    python usage_accounting.py                          # last 7 days by model
+    python usage_accounting.py --days 30 --by source
+    python usage_accounting.py --since 2026-10-01 --model ft:llama3.1-8b:whatsapp-business-assistant-v1:abc123
+    python usage_accounting.py prices
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from http_cassette import active_cassette
+
+USAGE_DIR = Path(__file__).parent.parent / 'outputs' / 'usage'
+SYSTEM_PROMPT_FILE = Path(__file__).parent.parent / 'SYSTEM_PROMPT.md'
+USAGE_ENV = 'USAGE_ACCOUNTING'
+PRICES_ENV = 'USAGE_PRICES_FILE'
+KEEP_DAYS = 90
+CHARS_PER_TOKEN = 4.0
+DEFAULT_DAYS = 7
+GROUPINGS = ('model', 'source', 'day', 'path')
+
+# USD per million (input, output) tokens; rough list prices, fine-tunes priced as their base model
+DEFAULT_PRICES = {
+    'llama3.1-8b': (0.20, 0.20),
+    'llama3.1-70b': (0.90, 0.90),
+    'llama3.1-405b': (3.50, 3.50),
+    'llama3.2-3b': (0.06, 0.06),
+    'llama3.3-70b': (0.90, 0.90),
+    'Llama-4-Scout-17B-16E': (0.18, 0.59),
+    'Llama-4-Maverick-17B-128E': (0.27, 0.85),
+}
+
+def price_key(model):
+    """Model id reduced to letters and digits, so 'llama-3.1-8b' and 'llama3.1-8b' share a price."""
+    return re.sub(r'[^a-z0-9]', '', model.lower())
+
+def load_prices(path=None):
+    """
+    Price table: DEFAULT_PRICES overlaid with the JSON file at `path` (default: USAGE_PRICES_FILE).
+
+    Returns:
+        List of (key, model, input price, output price), longest key first
+    """
+    prices = dict(DEFAULT_PRICES)
+    path = path or os.getenv(PRICES_ENV)
+    if path:
+        with open(path, 'r') as f:
+            prices.update({model: tuple(price) for model, price in json.load(f).items()})
+    return sorted(((price_key(model), model, *price) for model, price in prices.items()), key=lambda p: -len(p[0]))
+
+def price_for(model, prices):
+    """(input, output) USD per million tokens for a model, or None if no table entry matches."""
+    if not model:
+        return None
+    # ft:llama3.1-8b:name:id is billed like llama3.1-8b
+    base = model.split(':')[1] if model.startswith('ft:') else model
+    key = price_key(base)
+    for prefix, _, input_price, output_price in prices:
+        if prefix in key:
+            return input_price, output_price
+    return None
+
+def estimate_cost(model, prompt_tokens, completion_tokens, prices):
+    """Estimated USD for one call, or None without a price or token counts."""
+    price = price_for(model, prices)
+    if not price or (prompt_tokens is None and completion_tokens is None):
+        return None
+    return ((prompt_tokens or 0) * price[0] + (completion_tokens or 0) * price[1]) / 1e6
+
+def message_stats(messages):
+    """(system prompt chars, total prompt chars, turn number) of a chat request."""
+    system_chars = prompt_chars = turn = 0
+    for message in messages or []:
+        content = message.get('content') if isinstance(message, dict) else None
+        if not isinstance(content, str):
+            continue
+        prompt_chars += len(content)
+        if message.get('role') == 'system':
+            system_chars += len(content)
+        elif message.get('role') == 'user':
+            turn += 1
+    return system_chars, prompt_chars, turn
+
+def json_object(data):
+    """A request or response body parsed as a JSON object ({} for anything else, e.g. an upload)."""
+    if not isinstance(data, (str, bytes)):
+        return {}
+    try:
+        data = json.loads(data)
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+class UsageLog:
+    def __init__(self, directory=USAGE_DIR, source=None, prices=None, keep_days=KEEP_DAYS):
+        """
+        Args:
+            directory: Where the daily usage-<date>.jsonl files go
+            source: Name recorded with every call (default: the running script)
+            prices: Price table from load_prices() (default: load_prices())
+            keep_days: Files older than this are removed when the first call is recorded
+        """
+        self.directory = Path(directory)
+        self.source = source or Path(sys.argv[0]).stem or 'python'
+        self.prices = prices if prices is not None else load_prices()
+        self.keep_days = keep_days
+        self.lock = threading.Lock()
+        self.file = None
+        self.day = None
+
+    def record(self, model=None, messages=None, prompt_tokens=None, completion_tokens=None, latency=None,
+               status=None, error_type=None, endpoint=None, path=None):
+        """Append one call; prompt tokens are estimated when a successful chat call reported none."""
+        system_chars, prompt_chars, turn = message_stats(messages)
+        estimated = False
+        if messages and prompt_tokens is None and not error_type:
+            prompt_tokens = round(prompt_chars / CHARS_PER_TOKEN)
+            estimated = True
+        cost = None if error_type else estimate_cost(model, prompt_tokens, completion_tokens, self.prices)
+        self.write({
+            'ts': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'source': self.source,
+            'endpoint': endpoint,
+            'path': path,
+            'model': model,
+            'status': status,
+            'error_type': error_type,
+            'latency': round(latency, 4) if latency is not None else None,
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'estimated': estimated,
+            'system_chars': system_chars,
+            'prompt_chars': prompt_chars,
+            'turn': turn,
+            'cost': round(cost, 8) if cost is not None else None
+        })
+
+    def record_chat(self, model, messages, result, endpoint=None, path='/chat/completions'):
+        """Record a chat_client result dict (cached answers are skipped)."""
+        if result.get('cached'):
+            return
+        self.record(model, messages, result.get('prompt_tokens'), result.get('completion_tokens'),
+                    result.get('latency'), result.get('status'), result.get('error_type'), endpoint, path)
+
+    def record_response(self, response, *args, **kwargs):
+        """
+        requests response hook (session.hooks['response']). Chat completion bodies are
+        read for their token usage unless the request streams; other calls are recorded
+        with their status and latency only.
+        """
+        try:
+            url = urlsplit(response.url)
+            body = json_object(response.request.body)
+            latency = response.elapsed.total_seconds()
+            usage = {}
+            if url.path.endswith('/chat/completions') and response.ok and not kwargs.get('stream'):
+                started = time.perf_counter()
+                usage = json_object(response.content).get('usage') or {}
+                latency += time.perf_counter() - started
+            self.record(
+                body.get('model'), body.get('messages'), usage.get('prompt_tokens'), usage.get('completion_tokens'),
+                latency, response.status_code, None if response.ok else f"http_{response.status_code}",
+                f"{url.scheme}://{url.netloc}", url.path
+            )
+        except (TypeError, AttributeError, OSError):
+            pass  # Accounting must never break the call it is recording
+        return response
+
+    def write(self, entry):
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        day = entry['ts'][:10]
+        with self.lock:
+            if day != self.day:
+                self.open(day)
+            self.file.write(line)
+
+    def open(self, day):
+        if self.file:
+            self.file.close()
+        else:
+            self.prune()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Line-buffered append: each call is one write(), which concurrent processes can share
+        self.file = open(self.directory / f"usage-{day}.jsonl", 'a', encoding='utf-8', buffering=1)
+        self.day = day
+
+    def prune(self):
+        cutoff = time.strftime('%Y-%m-%d', time.localtime(time.time() - self.keep_days * 86400))
+        for path in self.directory.glob('usage-*.jsonl') if self.directory.exists() else []:
+            if path.stem[len('usage-'):] < cutoff:
+                path.unlink(missing_ok=True)
+
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+                self.day = None
+
+_active = None
+_active_lock = threading.Lock()
+
+def active_usage_log():
+    """
+    The process-wide UsageLog, or None when USAGE_ACCOUNTING is off or an
+    HTTP cassette is being replayed (replayed calls cost nothing).
+    """
+    global _active
+    if os.getenv(USAGE_ENV, 'on').lower() in ('off', '0', 'false', 'no'):
+        return None
+    cassette = active_cassette()
+    if cassette and cassette.mode == 'replay':
+        return None
+    with _active_lock:
+        if _active is None:
+            _active = UsageLog()
+        return _active
+
+def iter_entries(directory=USAGE_DIR, since=None, model=None):
+    """Recorded calls on or after `since` (YYYY-MM-DD), optionally for one model."""
+    for path in sorted(Path(directory).glob('usage-*.jsonl')):
+        if since and path.stem[len('usage-'):] < since:
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # A line cut short by a crash
+                if (not since or entry['ts'][:10] >= since) and (not model or entry.get('model') == model):
+                    yield entry
+
+def group_key(entry, by):
+    if by == 'day':
+        return entry['ts'][:10]
+    return entry.get(by) or '-'
+
+def summarize(entries, by='model', system_prompt_path=SYSTEM_PROMPT_FILE, prices=None):
+    """
+    Totals per group, plus what the system prompt costs.
+
+    Returns:
+        Dict of groups (key -> totals), total, and system_prompt
+    """
+    prices = prices if prices is not None else load_prices()
+    groups = defaultdict(lambda: defaultdict(float))
+    total = defaultdict(float)
+    models = defaultdict(int)
+    for entry in entries:
+        prompt_tokens = entry.get('prompt_tokens') or 0
+        system_tokens = 0.0
+        if entry.get('system_chars') and entry.get('prompt_chars') and prompt_tokens:
+            system_tokens = prompt_tokens * entry['system_chars'] / entry['prompt_chars']
+        input_price = (price_for(entry.get('model'), prices) or (0, 0))[0]
+        for totals in (groups[group_key(entry, by)], total):
+            totals['calls'] += 1
+            totals['errors'] += bool(entry.get('error_type'))
+            totals['prompt_tokens'] += prompt_tokens
+            totals['completion_tokens'] += entry.get('completion_tokens') or 0
+            totals['estimated'] += bool(entry.get('estimated'))
+            totals['cost'] += entry.get('cost') or 0
+            totals['unpriced'] += bool(entry.get('prompt_tokens') and entry.get('cost') is None)
+            totals['latency'] += entry.get('latency') or 0
+            totals['timed'] += entry.get('latency') is not None
+            totals['system_calls'] += bool(entry.get('system_chars'))
+            totals['system_tokens'] += system_tokens
+            totals['system_cost'] += system_tokens * input_price / 1e6
+            totals['measured_tokens'] += prompt_tokens if not entry.get('estimated') else 0
+            totals['measured_chars'] += (entry.get('prompt_chars') or 0) if not entry.get('estimated') else 0
+            # A conversation starts with the first user turn; later turns resend the system prompt
+            totals['conversations'] += bool(entry.get('system_chars') and entry.get('turn') == 1)
+        if entry.get('model') and entry.get('prompt_tokens'):
+            models[entry['model']] += 1
+
+    system_prompt = None
+    if Path(system_prompt_path).exists():
+        chars = len(Path(system_prompt_path).read_text(encoding='utf-8'))
+        chars_per_token = (total['measured_chars'] / total['measured_tokens'] if total['measured_tokens']
+                           else CHARS_PER_TOKEN)
+        model = max(models, key=models.get) if models else os.getenv('MODEL_NAME', 'llama3.1-8b')
+        tokens = chars / chars_per_token
+        price = price_for(model, prices)
+        turns = (total['system_calls'] / total['conversations']) if total['conversations'] else None
+        system_prompt = {
+            'file': str(system_prompt_path),
+            'chars': chars,
+            'tokens': round(tokens),
+            'chars_per_token': round(chars_per_token, 2),
+            'measured': bool(total['measured_tokens']),
+            'model': model,
+            'cost_per_call': tokens * price[0] / 1e6 if price else None,
+            'turns_per_conversation': round(turns, 2) if turns else None,
+            'cost_per_conversation': tokens * price[0] / 1e6 * (turns or 1) if price else None
+        }
+    return {
+        'groups': {key: dict(totals) for key, totals in sorted(groups.items(), key=lambda item: -item[1]['calls'])},
+        'total': dict(total),
+        'system_prompt': system_prompt
+    }
+
+def format_cost(cost):
+    return f"${cost:,.4f}" if cost < 100 else f"${cost:,.0f}"
+
+def print_summary(summary, by, since):
+    total = summary['total']
+    if not total:
+        print(f"No API calls recorded since {since}")
+        return
+    print("\n" + "=" * 100)
+    print(f"API usage since {since}")
+    print("=" * 100)
+    print(f"{by.capitalize():<40}{'Calls':>9}{'Errors':>8}{'Prompt tok':>13}{'Compl. tok':>12}"
+          f"{'Cost':>11}{'Latency':>9}")
+    print("-" * 102)
+    for key, totals in list(summary['groups'].items()) + [('TOTAL', total)]:
+        if key == 'TOTAL':
+            print("-" * 102)
+        latency = f"{totals['latency'] / totals['timed']:.2f}s" if totals['timed'] else '-'
+        print(f"{key[-39:]:<40}{totals['calls']:>9,.0f}{totals['errors']:>8,.0f}{totals['prompt_tokens']:>13,.0f}"
+              f"{totals['completion_tokens']:>12,.0f}{format_cost(totals['cost']):>11}{latency:>9}")
+    if total['estimated']:
+        print(f"\n⚠️  {total['estimated']:,.0f} call(s) reported no token usage; their prompt tokens are estimated")
+    if total['unpriced']:
+        print(f"⚠️  {total['unpriced']:,.0f} call(s) are for models without a price (see: python usage_accounting.py "
+              f"prices)")
+
+    if total['system_calls']:
+        share = total['system_tokens'] / total['prompt_tokens'] if total['prompt_tokens'] else 0
+        print(f"\nSystem prompts: sent with {total['system_calls']:,.0f} calls, {share:.0%} of all prompt tokens "
+              f"(~{total['system_tokens'] / total['system_calls']:,.0f} tokens per call), "
+              f"{format_cost(total['system_cost'])}")
+        if total['conversations']:
+            print(f"  {total['conversations']:,.0f} conversations, "
+                  f"{total['system_calls'] / total['conversations']:.1f} calls each: "
+                  f"{format_cost(total['system_cost'] / total['conversations'])} of system prompt per conversation")
+
+    prompt = summary['system_prompt']
+    if prompt:
+        print(f"\n{Path(prompt['file']).name}: {prompt['chars']:,} chars ≈ {prompt['tokens']:,} tokens "
+              f"({prompt['chars_per_token']} chars/token{' measured' if prompt['measured'] else ', estimated'})")
+        if prompt['cost_per_call'] is not None:
+            turns = prompt['turns_per_conversation']
+            print(f"  On {prompt['model']}: {format_cost(prompt['cost_per_call'])} per call, "
+                  f"{format_cost(prompt['cost_per_conversation'])} per conversation "
+                  f"({f'{turns} turns' if turns else '1 turn'}), "
+                  f"{format_cost(prompt['cost_per_conversation'] * 1000)} per 1,000 conversations")
+        else:
+            print(f"  No price for {prompt['model']}")
+
+def print_prices(prices):
+    print(f"{'Model':<28}{'Input $/M':>12}{'Output $/M':>12}")
+    print("-" * 52)
+    for _, model, input_price, output_price in sorted(prices, key=lambda p: p[1]):
+        print(f"{model:<28}{input_price:>12.2f}{output_price:>12.2f}")
+    print(f"\nEstimates; set {PRICES_ENV} to a JSON file of {{\"model\": [input, output]}} for real prices")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize the tokens and estimated cost of recorded API calls")
+    parser.add_argument('command', nargs='?', choices=('summary', 'prices'), default='summary')
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS, help="Calls from the last N days")
+    parser.add_argument('--since', help="Calls on or after this date (YYYY-MM-DD); overrides --days")
+    parser.add_argument('--by', choices=GROUPINGS, default='model')
+    parser.add_argument('--model', help="Only calls to this model")
+    parser.add_argument('--system-prompt', default=str(SYSTEM_PROMPT_FILE),
+                        help="System prompt file to project the cost of")
+    parser.add_argument('--prices', help=f"JSON price file (default: {PRICES_ENV})")
+    parser.add_argument('--json', action='store_true', help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    prices = load_prices(args.prices)
+    if args.command == 'prices':
+        print_prices(prices)
+        exit(0)
+
+    since = args.since or time.strftime('%Y-%m-%d', time.localtime(time.time() - (args.days - 1) * 86400))
+    summary = summarize(iter_entries(USAGE_DIR, since, args.model), args.by, args.system_prompt, prices)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary, args.by, since)
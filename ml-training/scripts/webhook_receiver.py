@@ -0,0 +1,308 @@
+"""
+Receive fine-tuning job status callbacks instead of polling for them.
+
+Runs a small local endpoint the provider (or a tunnel such as ngrok) posts job
+events to. Each callback is verified with an HMAC-SHA256 signature over the
+timestamp and body, checked for freshness and deduplicated by event id. It
+then updates outputs/job_registry.json and outputs/fine_tuning_job.json right
+away. Polling keeps running as a fallback, on a long interval, for events that
+never arrive. A succeeded job's model is evaluated against the previous best
+in the background (auto_evaluate.py) unless --no-eval is given.
+
+Expected request:
+    POST /webhooks/fine-tuning
+    X-Webhook-Signature: t=<unix time>,v1=<hex HMAC-SHA256(secret, "<t>.<body>")>
+
+    {"id": "evt_123", "type": "fine_tuning.job.succeeded",
+     "data": {"id": "ftjob-abc", "status": "succeeded", "fine_tuned_model": "..."}}
+
+Usage:
+    python webhook_receiver.py                   # needs WEBHOOK_SECRET in .env
+    python webhook_receiver.py --no-poll --no-eval
+    python webhook_receiver.py --send-test ftjob-abc succeeded   # post a signed test event
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import signal
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import requests
+from dotenv import load_dotenv
+
+from auto_evaluate import AutoEvaluator
+from job_monitor import JobMonitor
+from job_registry import TERMINAL_STATUSES, JobRegistry
+from local_http import HTTPError, json_response, start_server
+
+load_dotenv(Path(__file__).parent.parent / '.env')
+
+DEFAULT_PORT = 8767
+WEBHOOK_PATH = '/webhooks/fine-tuning'
+SIGNATURE_HEADER = 'x-webhook-signature'
+TOLERANCE_SECONDS = 300      # Reject callbacks signed longer ago than this (replay protection)
+FALLBACK_INTERVAL = 1800     # Poll active jobs every 30 minutes in case a callback is lost
+SEEN_EVENTS_LIMIT = 10000
+DRAIN_TIMEOUT = 300          # Seconds running evaluations get to finish on shutdown
+
+def sign_payload(secret, body, timestamp=None):
+    """Build the signature header value for a body."""
+    timestamp = int(timestamp if timestamp is not None else time.time())
+    message = f"{timestamp}.".encode('utf-8') + body
+    digest = hmac.new(secret.encode('utf-8'), message, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+def verify_signature(secret, body, header, tolerance=TOLERANCE_SECONDS, now=None):
+    """
+    Check a signature header against the body.
+
+    Raises:
+        HTTPError 401 if the signature is missing or wrong, 400 if it is stale
+    """
+    if not header:
+        raise HTTPError(401, "Missing signature")
+
+    items = [[part.strip() for part in item.split('=', 1)] for item in header.split(',') if '=' in item]
+    try:
+        timestamp = int(dict(items)['t'])
+    except (KeyError, ValueError):
+        raise HTTPError(401, "Malformed signature")
+
+    now = time.time() if now is None else now
+    if abs(now - timestamp) > tolerance:
+        raise HTTPError(400, "Stale signature timestamp")
+
+    expected = sign_payload(secret, body, timestamp).split('v1=', 1)[1]
+    # Several v1 values may be sent while a secret is being rotated
+    candidates = [value for key, value in items if key == 'v1']
+    if not any(hmac.compare_digest(expected, candidate) for candidate in candidates):
+        raise HTTPError(401, "Invalid signature")
+
+def parse_event(payload):
+    """
+    Pull (event_id, job_id, fields) out of a callback payload.
+
+    The status comes from data.status, or from the event type suffix
+    (fine_tuning.job.succeeded -> succeeded).
+    """
+    if not isinstance(payload, dict):
+        raise HTTPError(400, "Expected a JSON object")
+    data = payload.get('data') or {}
+    job_id = data.get('id') or data.get('job_id') or payload.get('job_id')
+    if not job_id:
+        raise HTTPError(400, "Event has no job id")
+
+    status = data.get('status') or payload.get('status')
+    if not status and payload.get('type', '').startswith('fine_tuning.job.'):
+        status = payload['type'].rsplit('.', 1)[1]
+    if not status:
+        raise HTTPError(400, "Event has no status")
+
+    fields = {
+        'status': status,
+        'fine_tuned_model': data.get('fine_tuned_model'),
+        'trained_tokens': data.get('trained_tokens'),
+        'metrics': data.get('metrics') or data.get('result_metrics'),
+        'error': data.get('error')
+    }
+    return payload.get('id'), job_id, fields
+
+class WebhookReceiver:
+    def __init__(self, secret, registry=None, monitor=None, poll=True):
+        """
+        Args:
+            secret: Shared HMAC secret
+            registry: JobRegistry to update
+            monitor: JobMonitor used for the polling fallback; its on_change and
+                     on_complete hooks also fire for webhook events
+            poll: Run the polling fallback for active jobs
+        """
+        self.secret = secret
+        self.registry = registry or JobRegistry()
+        self.monitor = monitor or JobMonitor(
+            registry=self.registry, min_interval=FALLBACK_INTERVAL, max_interval=FALLBACK_INTERVAL * 2
+        )
+        self.poll = poll
+        self.seen_events = OrderedDict()
+        self.pollers = {}
+        self.stats = {'received': 0, 'applied': 0, 'duplicates': 0, 'stale': 0, 'rejected': 0}
+
+    def seen(self, event_id):
+        """Remember event ids so redelivered callbacks are applied only once."""
+        if not event_id:
+            return False
+        if event_id in self.seen_events:
+            return True
+        self.seen_events[event_id] = True
+        if len(self.seen_events) > SEEN_EVENTS_LIMIT:
+            self.seen_events.popitem(last=False)
+        return False
+
+    async def apply(self, job_id, fields):
+        """
+        Record an event and fire hooks, the same way a poll result would.
+
+        Returns the updated record, or None if the job had already finished: a late or
+        out-of-order event must not reopen it and fire the completion hooks a second time.
+        """
+        status = fields.pop('status')
+        current = self.registry.get(job_id)
+        if current and current['status'] in TERMINAL_STATUSES:
+            if status != current['status']:
+                print(f"[{time.strftime('%H:%M:%S')}] ⚠️  Ignored '{status}' event for {job_id}, "
+                      f"already {current['status']}")
+            return None
+        if current and current.get('monitor_error'):
+            fields['monitor_error'] = ''  # The job is reachable again, so polling may resume
+        record, changed = self.registry.update(job_id, status=status, **fields)
+        if not changed:
+            return record
+
+        self.registry.update_job_file(record)
+        print(f"[{time.strftime('%H:%M:%S')}] 🔔 {job_id}: {status}")
+        await self.monitor.call_hooks(self.monitor.change_hooks, record)
+        if status in TERMINAL_STATUSES:
+            await self.monitor.call_hooks(self.monitor.completion_hooks, record)
+            poller = self.pollers.pop(job_id, None)
+            if poller:
+                poller.cancel()
+        elif self.poll:
+            self.start_poller(job_id)
+        return record
+
+    def start_poller(self, job_id):
+        if job_id not in self.pollers:
+            self.pollers[job_id] = asyncio.create_task(self.monitor.watch(job_id))
+
+    async def watch_active_jobs(self):
+        """
+        Fallback: keep a slow poller on every active job, picking up newly started ones.
+        Jobs the monitor gave up on (monitor_error) are left alone until an event arrives for them.
+        """
+        while True:
+            for job in self.registry.active_jobs():
+                if not job.get('monitor_error'):
+                    self.start_poller(job['job_id'])
+            for job_id in [job_id for job_id, task in self.pollers.items() if task.done()]:
+                del self.pollers[job_id]
+            await asyncio.sleep(60)
+
+    async def handle(self, request):
+        if request.method == 'GET' and request.path == '/status':
+            return json_response(dict(self.stats, polling=sorted(self.pollers)))
+
+        if request.method != 'POST' or request.path != WEBHOOK_PATH:
+            raise HTTPError(404)
+
+        self.stats['received'] += 1
+        try:
+            verify_signature(self.secret, request.body, request.headers.get(SIGNATURE_HEADER))
+        except HTTPError as e:
+            self.stats['rejected'] += 1
+            print(f"[{time.strftime('%H:%M:%S')}] ⚠️  Rejected callback: {e.message}")
+            raise
+
+        event_id, job_id, fields = parse_event(request.json())
+        if self.seen(event_id):
+            self.stats['duplicates'] += 1
+            return json_response({'received': True, 'duplicate': True})
+
+        if await self.apply(job_id, fields) is None:
+            self.stats['stale'] += 1
+            return json_response({'received': True, 'stale': True})
+        self.stats['applied'] += 1
+        return json_response({'received': True})
+
+async def serve(receiver, host, port, evaluator=None):
+    """Run until SIGINT/SIGTERM; evaluations still running then get up to DRAIN_TIMEOUT to finish."""
+    server, port = await start_server(receiver.handle, host, port)
+    fallback = asyncio.create_task(receiver.watch_active_jobs()) if receiver.poll else None
+
+    print("=" * 70)
+    print("Fine-tuning webhook receiver running")
+    print("=" * 70)
+    print(f"  POST http://{host}:{port}{WEBHOOK_PATH}")
+    print(f"  GET  http://{host}:{port}/status")
+    if receiver.poll:
+        print(f"  Fallback polling every {FALLBACK_INTERVAL // 60} min for active jobs")
+    print("\nPress Ctrl+C to stop.\n")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    try:
+        await stop.wait()
+    finally:
+        await server.stop()
+        for task in [fallback, *receiver.pollers.values()]:
+            if task:
+                task.cancel()
+        running = [task for task in evaluator.tasks.values() if not task.done()] if evaluator else []
+        if running:
+            print(f"\nWaiting up to {DRAIN_TIMEOUT}s for {len(running)} evaluation(s) to finish...")
+            try:
+                await asyncio.wait_for(evaluator.drain(), DRAIN_TIMEOUT)
+            except asyncio.TimeoutError:
+                print("⚠️  Evaluations cut short; run auto_evaluate.py --job <job_id> to redo them")
+
+    stats = receiver.stats
+    print(f"\n✓ Stopped. Received: {stats['received']}, applied: {stats['applied']}, "
+          f"duplicates: {stats['duplicates']}, stale: {stats['stale']}, rejected: {stats['rejected']}")
+
+def send_test_event(url, secret, job_id, status):
+    """Post a signed event, e.g. to check the receiver or a tunnel end to end."""
+    body = json.dumps({
+        'id': f"evt_test_{int(time.time() * 1000)}",
+        'type': f"fine_tuning.job.{status}",
+        'data': {'id': job_id, 'status': status}
+    }).encode('utf-8')
+    response = requests.post(url, data=body, timeout=10, headers={
+        'Content-Type': 'application/json',
+        'X-Webhook-Signature': sign_payload(secret, body)
+    })
+    print(f"{response.status_code}: {response.text}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Receive fine-tuning job status webhooks")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--no-poll', action='store_true', help="Disable the polling fallback")
+    parser.add_argument('--no-eval', action='store_true', help="Don't evaluate models when their jobs succeed")
+    parser.add_argument('--send-test', nargs=2, metavar=('JOB_ID', 'STATUS'), help="Send a signed test event")
+    args = parser.parse_args()
+
+    secret = os.getenv('WEBHOOK_SECRET')
+    if not secret:
+        print("❌ WEBHOOK_SECRET is not set in .env")
+        exit(1)
+
+    if args.send_test:
+        send_test_event(f"http://{args.host}:{args.port}{WEBHOOK_PATH}", secret, *args.send_test)
+        exit(0)
+
+    receiver = WebhookReceiver(secret, poll=not args.no_poll)
+
+    @receiver.monitor.on_complete
+    def announce(record):
+        if record['status'] == 'succeeded':
+            print(f"\n🎉 {record['job_id']} finished: {record.get('fine_tuned_model')}")
+        else:
+            print(f"\n❌ {record['job_id']} ended with status {record['status']}: {record.get('error', '')}")
+
+    evaluator = None
+    if not args.no_eval:
+        evaluator = AutoEvaluator(receiver.registry)
+        receiver.monitor.on_complete(evaluator.on_complete)
+
+    asyncio.run(serve(receiver, args.host, args.port, evaluator))